@@ -1,4 +1,6 @@
 from __future__ import annotations
+import asyncio
+import collections
 import contextlib
 from dataclasses import dataclass, field
 import errno
@@ -7,7 +9,17 @@ import os.path
 from pathlib import Path
 import shutil
 import threading
-from typing import Callable, ContextManager, Iterator, List, Tuple
+from typing import (
+    AsyncContextManager,
+    Callable,
+    ContextManager,
+    Deque,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+import pyspawner
 from cjwkernel.util import tempdir_context, tempfile_context
 from cjwkernel.errors import ModuleExitedError
 
@@ -101,6 +113,17 @@ class Chroot:
     learn what the upper layer is.
     """
 
+    network_config: pyspawner.NetworkConfig = field(
+        default_factory=pyspawner.NetworkConfig
+    )
+    """
+    Network interfaces and addresses for modules that run in this chroot.
+
+    Two children running at once must not share interface names or IP
+    addresses. `setup-sandboxes.sh` writes iptables rules for each chroot's
+    addresses.
+    """
+
     lock: threading.Lock = field(default_factory=threading.Lock)
     """
     Sanity check.
@@ -110,12 +133,132 @@ class Chroot:
     one module could read another module's data.)
     """
 
-    def acquire_context(self) -> ContextManager[ChrootContext]:
-        self.lock.acquire(timeout=0.01)
+
+class ChrootPool:
+    """
+    Editable chroots, each of which may run one module at a time.
+
+    A module in a chroot can see everything in that chroot; and when it exits,
+    the caller deletes all the files it wrote. So two modules must never share
+    a chroot. Callers lease a chroot, use it and return it:
+
+        with EDITABLE_CHROOT_POOL.acquire_context() as chroot_context:
+            ...
+
+    ... or, in asyncio code:
+
+        async with EDITABLE_CHROOT_POOL.acquire_context_async() as chroot_context:
+            ...
+
+    Both wait until a chroot is free. Waiters are served first-come,
+    first-served. This is thread-safe.
+    """
+
+    def __init__(self, chroots: List[Chroot]):
+        self.chroots = chroots
+        self._lock = threading.Lock()
+        self._available: List[Chroot] = list(chroots)
+        self._waiters: Deque[Callable[[Chroot], None]] = collections.deque()
+
+    def __len__(self) -> int:
+        return len(self.chroots)
+
+    def _acquire_or_enqueue(self, waiter: Callable[[Chroot], None]) -> Optional[Chroot]:
+        """
+        Return a free chroot; or if there is none, enqueue `waiter`.
+
+        Later, `_release()` will call `waiter(chroot)` from some other thread.
+        """
+        with self._lock:
+            if self._available:
+                return self._available.pop()
+            else:
+                self._waiters.append(waiter)
+                return None
+
+    def _dequeue(self, waiter: Callable[[Chroot], None]) -> bool:
+        """
+        Remove `waiter` from the queue; return False if it was already called.
+        """
+        with self._lock:
+            try:
+                self._waiters.remove(waiter)
+                return True
+            except ValueError:
+                return False
+
+    def _release(self, chroot: Chroot) -> None:
+        with self._lock:
+            if not self._waiters:
+                self._available.append(chroot)
+                return
+            waiter = self._waiters.popleft()
+        waiter(chroot)  # hand over the chroot without making it "available"
+
+    @contextlib.contextmanager
+    def _lease(self, chroot: Chroot) -> ContextManager[ChrootContext]:
         try:
-            return ChrootContext(self)
+            assert chroot.lock.acquire(blocking=False), "chroot is already in use"
+            try:
+                with ChrootContext(chroot) as chroot_context:
+                    yield chroot_context
+            finally:
+                chroot.lock.release()
         finally:
-            self.lock.release()
+            self._release(chroot)
+
+    @contextlib.contextmanager
+    def acquire_context(self) -> ContextManager[ChrootContext]:
+        """
+        Wait for a chroot to be free; yield a ChrootContext; then release.
+        """
+        event = threading.Event()
+        handed_over: List[Chroot] = []
+
+        def waiter(chroot: Chroot) -> None:
+            handed_over.append(chroot)
+            event.set()
+
+        chroot = self._acquire_or_enqueue(waiter)
+        if chroot is None:
+            event.wait()
+            chroot = handed_over[0]
+
+        with self._lease(chroot) as chroot_context:
+            yield chroot_context
+
+    @contextlib.asynccontextmanager
+    async def acquire_context_async(self) -> AsyncContextManager[ChrootContext]:
+        """
+        Wait for a chroot to be free, without blocking the event loop.
+
+        Yield a ChrootContext; then release.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def hand_over(chroot: Chroot) -> None:
+            # on the event loop
+            if future.cancelled():
+                self._release(chroot)  # nobody wants it any more
+            else:
+                future.set_result(chroot)
+
+        def waiter(chroot: Chroot) -> None:
+            # on any thread
+            loop.call_soon_threadsafe(hand_over, chroot)
+
+        chroot = self._acquire_or_enqueue(waiter)
+        if chroot is None:
+            try:
+                chroot = await future
+            except asyncio.CancelledError:
+                # If `waiter` was already called, `hand_over` will release.
+                self._dequeue(waiter)
+                raise
+
+        with self._lease(chroot) as chroot_context:
+            yield chroot_context
 
 
 class ChrootContext:
@@ -131,7 +274,7 @@ class ChrootContext:
 
     Division of responsibilities:
 
-        Caller calls `with chroot.acquire_context() as ctx` and
+        Caller calls `with EDITABLE_CHROOT_POOL.acquire_context() as ctx` and
         `with ctx.tempdir_context(...) as path:`.
 
         Caller passes `ctx` to kernel methods such as `kernel.render()`. The
@@ -298,7 +441,37 @@ _chroots = Path("/var/lib/cjwkernel/chroot")
 _base = Path("/var/lib/cjwkernel/chroot-layers/base")
 
 
-EDITABLE_CHROOT = Chroot(
-    _chroots / "editable" / "root", _base, _chroots / "editable" / "upperfs" / "upper"
+N_EDITABLE_CHROOTS = int(os.environ.get("CJW_N_EDITABLE_CHROOTS", "1"))
+"""
+Number of editable chroots -- that is, how many modules may render or fetch
+at once in this process.
+
+`setup-sandboxes.sh` reads the same environment variable to decide how many
+chroots to create.
+"""
+
+
+def _editable_chroot(index: int) -> Chroot:
+    """
+    Describe the `index`th chroot built by `setup-sandboxes.sh`.
+
+    Chroot 0 uses pyspawner's default network config. Others use their own
+    interfaces and /24 blocks. Keep this in sync with `setup-sandboxes.sh`.
+    """
+    if index == 0:
+        network_config = pyspawner.NetworkConfig()
+    else:
+        network_config = pyspawner.NetworkConfig(
+            kernel_veth_name="veth-pys-%d" % index,
+            child_veth_name="veth-pys-%d-c" % index,
+            kernel_ipv4_address="192.168.%d.1" % (123 + index),
+            child_ipv4_address="192.168.%d.2" % (123 + index),
+        )
+    path = _chroots / "editable" / str(index)
+    return Chroot(path / "root", _base, path / "upperfs" / "upper", network_config)
+
+
+EDITABLE_CHROOT_POOL = ChrootPool(
+    [_editable_chroot(i) for i in range(N_EDITABLE_CHROOTS)]
 )
 READONLY_CHROOT_DIR = _chroots / "readonly" / "root"
@@ -1,6 +1,17 @@
 import signal
 
 
+EXIT_CODE_MEMORY_EXCEEDED = 86
+"""
+Exit code of a module child that raised MemoryError.
+
+The child sets its own memory limit before running module code (see
+`cjwkernel.pandas.main`). When an allocation fails, Python raises MemoryError;
+the child exits with this code so the kernel can raise
+ModuleMemoryExceededError.
+"""
+
+
 class ModuleError(Exception):
     """The module has a bug."""
 
@@ -12,6 +23,14 @@ class ModuleTimeoutError(ModuleError):
         return "Module timed out"
 
 
+class ModuleMemoryExceededError(ModuleError):
+    """The module tried to use more memory than we allow."""
+
+    def __init__(self, max_memory_bytes: int):
+        super().__init__("Module exceeded memory limit of %d bytes" % max_memory_bytes)
+        self.max_memory_bytes = max_memory_bytes
+
+
 class ModuleExitedError(ModuleError):
     """
     The module exited at the wrong time.
@@ -39,6 +58,8 @@ def format_for_user_debugging(err: ModuleError) -> str:
     """
     if isinstance(err, ModuleTimeoutError):
         return "timed out"
+    elif isinstance(err, ModuleMemoryExceededError):
+        return "out of memory (limit %dMB)" % (err.max_memory_bytes // 1024 // 1024)
     elif isinstance(err, ModuleExitedError):
         try:
             # If the exit code is -9, for instance, return 'SIGTERM'
@@ -1,18 +1,33 @@
+import asyncio
+import contextlib
+import ctypes
+import dataclasses
 import io
+import json
 import logging
 import os
 import os.path
+import select
 import selectors
+import signal
+import stat
 import time
 from dataclasses import dataclass, field
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, ContextManager, Dict, List, Optional, Tuple, Union
 
 import pyspawner
 import thrift.protocol.TBinaryProtocol
 import thrift.transport.TTransport
 from cjwkernel.chroot import READONLY_CHROOT_DIR, ChrootContext
-from cjwkernel.errors import ModuleExitedError, ModuleTimeoutError
+from cjwkernel.errors import (
+    EXIT_CODE_MEMORY_EXCEEDED,
+    ModuleError,
+    ModuleExitedError,
+    ModuleMemoryExceededError,
+    ModuleTimeoutError,
+)
 from cjwkernel.thrift import ttypes
 from cjwkernel.types import (
     ArrowTable,
@@ -31,7 +46,9 @@ from cjwkernel.types import (
     thrift_raw_params_to_arrow,
     thrift_render_result_to_arrow,
 )
+from cjwkernel.util import json_encode, write_thrift_file
 from cjwkernel.validate import ValidateError
+from cjwkernel.zygote import ZygotePool, find_preloadable_imports
 
 logger = logging.getLogger(__name__)
 
@@ -39,10 +56,15 @@ logger = logging.getLogger(__name__)
 TIMEOUT = 600  # seconds
 DEAD_PROCESS_N_WAITS = 50  # number of waitpid() calls after process exits
 DEAD_PROCESS_WAIT_POLL_INTERVAL = 0.02  # seconds between waitpid() calls
+DEAD_PROCESS_TIMEOUT = (
+    DEAD_PROCESS_N_WAITS * DEAD_PROCESS_WAIT_POLL_INTERVAL
+)  # seconds to wait for exit after process closes its fds
+SYS_pidfd_open = 434  # same number on x86_64 and aarch64
 LOG_BUFFER_MAX_BYTES = 100 * 1024  # waaaay too much log output
 OUTPUT_BUFFER_MAX_BYTES = (
     2 * 1024 * 1024
 )  # a huge migrate_params() return value, perhaps?
+RESPONSE_FILE_MAX_BYTES = 256 * 1024 * 1024  # render()/fetch() response, on disk
 
 # Import all encodings. Some modules (e.g., loadurl) encounter weird stuff
 ENCODING_IMPORTS = [
@@ -52,6 +74,191 @@ ENCODING_IMPORTS = [
 ]
 
 
+PYSPAWNER_ENVIRONMENT = {
+    # SECURITY: children inherit these values
+    "LANG": "C.UTF-8",
+    "HOME": "/",
+    # [adamhooper, 2019-10-19] rrrgh, OpenBLAS....
+    #
+    # If we preload numpy, we're in trouble. Numpy loads OpenBLAS,
+    # and OpenBLAS starts a whole threading subsystem ... which
+    # breaks fork() in our modules. (We use fork() to open Parquet
+    # files....) OPENBLAS_NUM_THREADS=1 disables the thread pool.
+    #
+    # I'm frustrated.
+    "OPENBLAS_NUM_THREADS": "1",
+}
+
+
+PRELOAD_IMPORTS = [
+    "_strptime",
+    "abc",
+    "asyncio",
+    "base64",
+    "collections",
+    "concurrent",
+    "concurrent.futures",
+    "concurrent.futures.thread",
+    "dataclasses",
+    "datetime",
+    "enum",
+    "functools",
+    "inspect",
+    "itertools",
+    "json",
+    "math",
+    "multiprocessing",
+    "multiprocessing.connection",
+    "multiprocessing.popen_fork",
+    "os.path",
+    "re",
+    "sqlite3",
+    "ssl",
+    "string",
+    "typing",
+    "urllib.parse",
+    "warnings",
+    "aiohttp",
+    "bs4",
+    "formulas",
+    "formulas.functions.operators",
+    "formulas.parser",
+    "html5lib",
+    "html5lib.constants",
+    "html5lib.filters",
+    "html5lib.filters.whitespace",
+    "html5lib.treewalkers.etree",
+    "idna.uts46data",
+    "lxml",
+    "lxml.etree",
+    "lxml.html",
+    "lxml.html.html5parser",
+    "numpy",
+    "nltk",
+    "nltk.corpus",
+    "nltk.sentiment.vader",
+    "oauthlib",
+    "oauthlib.oauth1",
+    "oauthlib.oauth2",
+    "pandas",
+    "pandas.core",
+    "pandas.core.apply",
+    "pandas.core.computation.expressions",
+    "pandas.core.groupby.categorical",
+    "pyarrow",
+    "pyarrow.pandas_compat",
+    "pyarrow.parquet",
+    "re2",
+    "requests",
+    "schedula.dispatcher",
+    "schedula.utils.blue",
+    "schedula.utils.sol",
+    "thrift.protocol.TBinaryProtocol",
+    "thrift.transport.TTransport",
+    "xlrd",
+    *ENCODING_IMPORTS,
+    "cjwkernel.pandas.main",
+    "cjwkernel.pandas.module",
+    "cjwmodule",
+    "cjwmodule.i18n",
+    "cjwmodule.http.client",
+    "cjwmodule.http.httpfile",
+    "cjwmodule.util",
+    "cjwparquet",
+    "cjwparse.api",
+]
+PRELOADED_MODULE_NAMES = frozenset(PRELOAD_IMPORTS)
+TRUSTED_PACKAGES = frozenset(name.split(".")[0] for name in PRELOAD_IMPORTS) - {
+    "cjwkernel"
+}
+"""
+Top-level packages whose submodules a zygote may preload.
+
+`find_preloadable_imports()` only picks public, non-test, non-`__main__`
+submodules of these packages: the kind of library code PRELOAD_IMPORTS
+already loads.
+"""
+
+
+@dataclass
+class KernelTiming:
+    """
+    Where the time went during one kernel call (render, fetch, ...).
+
+    Pass an instance to a Kernel method; the Kernel fills it in as it goes,
+    so it's meaningful even when the method raises. All times are seconds of
+    wall-clock time, except `child_*_cpu_seconds`.
+    """
+
+    spawn_seconds: float = 0.0
+    """
+    Time to fork the child (from a pyspawner or zygote) and send it args.
+    """
+
+    child_output_seconds: float = 0.0
+    """
+    Time from spawn until the child closed stdout and stderr.
+
+    This is the module's own run time (imports, user code, writing output).
+    """
+
+    blocked_on_output_seconds: float = 0.0
+    """
+    Part of `child_output_seconds` we spent idle, waiting for child output.
+    """
+
+    reap_seconds: float = 0.0
+    """
+    Time from the child closing its fds until waitpid() reaped it.
+    """
+
+    n_reap_polls: int = 0
+    """
+    Number of waitpid() calls we made (see `DEAD_PROCESS_N_WAITS`).
+
+    With a pidfd, this is 1 unless we had to kill the child.
+    """
+
+    decode_seconds: float = 0.0
+    """
+    Time to decode the child's Thrift response.
+    """
+
+    validate_seconds: float = 0.0
+    """
+    Time to read and validate the child's output (e.g., its Arrow file).
+    """
+
+    child_max_rss_bytes: int = 0
+    """
+    Child's peak resident set size, from wait4() rusage.
+    """
+
+    child_user_cpu_seconds: float = 0.0
+    child_system_cpu_seconds: float = 0.0
+
+    def as_metrics(self) -> Dict[str, Any]:
+        return dataclasses.asdict(self)
+
+    def __str__(self) -> str:
+        return (
+            "spawn %dms, child %dms (%dms idle), reap %dms (%d polls), "
+            "decode %dms, validate %dms; child cpu %dms user + %dms sys, "
+            "peak RSS %0.1fMB"
+        ) % (
+            self.spawn_seconds * 1000,
+            self.child_output_seconds * 1000,
+            self.blocked_on_output_seconds * 1000,
+            self.reap_seconds * 1000,
+            self.n_reap_polls,
+            self.decode_seconds * 1000,
+            self.validate_seconds * 1000,
+            self.child_user_cpu_seconds * 1000,
+            self.child_system_cpu_seconds * 1000,
+            self.child_max_rss_bytes / 1024 / 1024,
+        )
+
+
 @dataclass
 class ChildReader:
     fileno: int
@@ -114,6 +321,148 @@ class ChildReader:
         return str(self.buffer, encoding="utf-8", errors="replace")
 
 
+def _pidfd_open(pid: int) -> Optional[int]:
+    """
+    Open a file descriptor that becomes readable when process `pid` exits.
+
+    Return `None` if the kernel (Linux < 5.3) does not support pidfds. Callers
+    must then poll waitpid().
+
+    Python 3.7 has no `os.pidfd_open()`, so we call the syscall through libc.
+    """
+    if hasattr(os, "pidfd_open"):
+        try:
+            return os.pidfd_open(pid)
+        except OSError:
+            return None
+
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        syscall = libc.syscall
+    except (OSError, AttributeError):
+        return None
+    syscall.restype = ctypes.c_long
+    fd = syscall(SYS_pidfd_open, ctypes.c_int(pid), ctypes.c_uint(0))
+    if fd < 0:
+        return None  # ENOSYS (old kernel) or EPERM (seccomp)
+    return fd
+
+
+def _reap_child(
+    module_process: pyspawner.ChildProcess,
+    pidfd: Optional[int],
+    timing: KernelTiming,
+) -> Tuple[bool, int, Any]:
+    """
+    Wait for a child that closed its fds to die; kill it if it takes too long.
+
+    With a `pidfd`, we wake up the moment the child dies. Without one, we spin
+    on waitpid().
+
+    Return `(killed, exit_status, rusage)`.
+    """
+    if pidfd is not None:
+        select.select([pidfd], [], [], DEAD_PROCESS_TIMEOUT)
+        n_polls = 1
+    else:
+        n_polls = DEAD_PROCESS_N_WAITS
+
+    # We call wait4() (rather than module_process.wait()) for its rusage.
+    for _ in range(n_polls):
+        timing.n_reap_polls += 1
+        pid, exit_status, rusage = os.wait4(module_process.pid, os.WNOHANG)
+        if pid != 0:  # pid==0 means process is still running
+            return False, exit_status, rusage
+        if pidfd is None:
+            time.sleep(DEAD_PROCESS_WAIT_POLL_INTERVAL)
+
+    # we waited and waited. No luck. Dead module. Kill it.
+    module_process.kill()
+    timing.n_reap_polls += 1
+    _, exit_status, rusage = os.wait4(module_process.pid, 0)
+    return True, exit_status, rusage
+
+
+def _kill_and_reap_child(module_process: pyspawner.ChildProcess) -> None:
+    """
+    SIGKILL a child we won't wait for any more, and wait for it to die.
+
+    Nobody can ignore SIGKILL, so the wait is short. Call this before releasing
+    the child's chroot: otherwise, the child could keep writing to a chroot we
+    have handed to another module.
+    """
+    module_process.kill()
+    os.wait4(module_process.pid, 0)
+
+
+async def _reap_child_async(
+    module_process: pyspawner.ChildProcess,
+    pidfd: Optional[int],
+    timing: KernelTiming,
+) -> Tuple[bool, int, Any]:
+    """
+    Like `_reap_child()`, but wait on the event loop instead of blocking.
+    """
+    if pidfd is None:
+        # Polling is quick; we only block for DEAD_PROCESS_WAIT_POLL_INTERVAL
+        # at a time. Still, don't block the event loop while we do it.
+        return await asyncio.get_event_loop().run_in_executor(
+            None, _reap_child, module_process, pidfd, timing
+        )
+
+    loop = asyncio.get_event_loop()
+    exited = loop.create_future()
+
+    def on_exit():
+        if not exited.done():
+            exited.set_result(None)
+
+    loop.add_reader(pidfd, on_exit)
+    try:
+        await asyncio.wait_for(exited, DEAD_PROCESS_TIMEOUT)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        loop.remove_reader(pidfd)
+
+    timing.n_reap_polls += 1
+    pid, exit_status, rusage = os.wait4(module_process.pid, os.WNOHANG)
+    if pid != 0:
+        return False, exit_status, rusage
+
+    # The child lingered. SIGKILL makes it exit right away.
+    module_process.kill()
+    timing.n_reap_polls += 1
+    _, exit_status, rusage = os.wait4(module_process.pid, 0)
+    return True, exit_status, rusage
+
+
+@contextlib.contextmanager
+def _thrift_files(
+    chroot_context: ChrootContext, basedir: Path, request: Any
+) -> ContextManager[Tuple[Path, Path]]:
+    """
+    Yield `(request_path, response_path)`: files in `basedir` for one child.
+
+    `request_path` holds Thrift `request`; the child may only read it. The child
+    may write its Thrift response to `response_path`.
+
+    Big requests (say, refine params with 50,000 groups) and responses (say,
+    chart JSON) would be costly to send through pyspawner args and stdout.
+    Through files, neither process buffers a copy in a pipe, and responses
+    aren't limited to `OUTPUT_BUFFER_MAX_BYTES`.
+    """
+    with chroot_context.tempfile_context(
+        prefix="request-", suffix=".thrift", dir=basedir
+    ) as request_path:
+        with chroot_context.tempfile_context(
+            prefix="response-", suffix=".thrift", dir=basedir
+        ) as response_path:
+            write_thrift_file(request_path, request)
+            with chroot_context.writable_file(response_path):
+                yield request_path, response_path
+
+
 class Kernel:
     """
     Compiles and runs user-supplied module code.
@@ -129,6 +478,22 @@ class Kernel:
     "migrate_params", "render" and "fetch" methods fork, evaluate the user's
     module, then invoke that user's `migrate_params()`, `render()` or `fetch`.
 
+    With `max_module_zygotes > 0`, modules that import trusted library
+    submodules we don't preload (say, `nltk.tokenize`) fork from a second,
+    module-specific pyspawner that preloads those too. We never run the
+    module's own top-level code outside the sandbox: that would be unsafe.
+
+    With `validate_arrow_threads > 0`, we validate render() output in this
+    process rather than spawning `arrow-validate`; see
+    `ArrowTable.from_untrusted_file()`.
+
+    Each child has a wall-clock timeout. `*_max_memory_bytes` and
+    `*_max_cpu_seconds` (0 means unlimited) also cap its heap and CPU time, so
+    one greedy module can't get the whole process OOM-killed. `validate()`
+    uses the migrate_params limits. A module that runs out of memory raises
+    ModuleMemoryExceededError; one that runs out of CPU time raises
+    ModuleTimeoutError.
+
     Child processes cannot be trusted to return sane values. So we communicate
     via Thrift (which errors on unexpected data) rather than Python pickle
     (which executes code on unexpected data).
@@ -140,108 +505,84 @@ class Kernel:
         migrate_params_timeout: float = TIMEOUT,
         fetch_timeout: float = TIMEOUT,
         render_timeout: float = TIMEOUT,
+        max_module_zygotes: int = 0,
+        validate_arrow_threads: int = 0,
+        migrate_params_max_memory_bytes: int = 0,
+        migrate_params_max_cpu_seconds: int = 0,
+        fetch_max_memory_bytes: int = 0,
+        fetch_max_cpu_seconds: int = 0,
+        render_max_memory_bytes: int = 0,
+        render_max_cpu_seconds: int = 0,
     ):
         self.validate_timeout = validate_timeout
         self.migrate_params_timeout = migrate_params_timeout
         self.fetch_timeout = fetch_timeout
         self.render_timeout = render_timeout
+        self.migrate_params_max_memory_bytes = migrate_params_max_memory_bytes
+        self.migrate_params_max_cpu_seconds = migrate_params_max_cpu_seconds
+        self.fetch_max_memory_bytes = fetch_max_memory_bytes
+        self.fetch_max_cpu_seconds = fetch_max_cpu_seconds
+        self.render_max_memory_bytes = render_max_memory_bytes
+        self.render_max_cpu_seconds = render_max_cpu_seconds
+        self.validate_arrow_threads = validate_arrow_threads
         self._pyspawner = pyspawner.Client(
             child_main="cjwkernel.pandas.main.main",
-            environment={
-                # SECURITY: children inherit these values
-                "LANG": "C.UTF-8",
-                "HOME": "/",
-                # [adamhooper, 2019-10-19] rrrgh, OpenBLAS....
-                #
-                # If we preload numpy, we're in trouble. Numpy loads OpenBLAS,
-                # and OpenBLAS starts a whole threading subsystem ... which
-                # breaks fork() in our modules. (We use fork() to open Parquet
-                # files....) OPENBLAS_NUM_THREADS=1 disables the thread pool.
-                #
-                # I'm frustrated.
-                "OPENBLAS_NUM_THREADS": "1",
-            },
-            preload_imports=[
-                "_strptime",
-                "abc",
-                "asyncio",
-                "base64",
-                "collections",
-                "concurrent",
-                "concurrent.futures",
-                "concurrent.futures.thread",
-                "dataclasses",
-                "datetime",
-                "enum",
-                "functools",
-                "inspect",
-                "itertools",
-                "json",
-                "math",
-                "multiprocessing",
-                "multiprocessing.connection",
-                "multiprocessing.popen_fork",
-                "os.path",
-                "re",
-                "sqlite3",
-                "ssl",
-                "string",
-                "typing",
-                "urllib.parse",
-                "warnings",
-                "aiohttp",
-                "bs4",
-                "formulas",
-                "formulas.functions.operators",
-                "formulas.parser",
-                "html5lib",
-                "html5lib.constants",
-                "html5lib.filters",
-                "html5lib.filters.whitespace",
-                "html5lib.treewalkers.etree",
-                "idna.uts46data",
-                "lxml",
-                "lxml.etree",
-                "lxml.html",
-                "lxml.html.html5parser",
-                "numpy",
-                "nltk",
-                "nltk.corpus",
-                "nltk.sentiment.vader",
-                "oauthlib",
-                "oauthlib.oauth1",
-                "oauthlib.oauth2",
-                "pandas",
-                "pandas.core",
-                "pandas.core.apply",
-                "pandas.core.computation.expressions",
-                "pandas.core.groupby.categorical",
-                "pyarrow",
-                "pyarrow.pandas_compat",
-                "pyarrow.parquet",
-                "re2",
-                "requests",
-                "schedula.dispatcher",
-                "schedula.utils.blue",
-                "schedula.utils.sol",
-                "thrift.protocol.TBinaryProtocol",
-                "thrift.transport.TTransport",
-                "xlrd",
-                *ENCODING_IMPORTS,
-                "cjwkernel.pandas.main",
-                "cjwkernel.pandas.module",
-                "cjwmodule",
-                "cjwmodule.i18n",
-                "cjwmodule.http.client",
-                "cjwmodule.http.httpfile",
-                "cjwmodule.util",
-                "cjwparquet",
-                "cjwparse.api",
-            ],
+            environment=PYSPAWNER_ENVIRONMENT,
+            preload_imports=PRELOAD_IMPORTS,
         )
+        self._zygotes = ZygotePool(max_module_zygotes, self._create_zygote)
 
     def __del__(self):
         self._pyspawner.close()
+        self._zygotes.close()
+
+    def _create_zygote(self, extra_imports: Tuple[str, ...]) -> pyspawner.Client:
+        return pyspawner.Client(
+            child_main="cjwkernel.pandas.main.main",
+            environment=PYSPAWNER_ENVIRONMENT,
+            preload_imports=[*PRELOAD_IMPORTS, *extra_imports],
+        )
+
+    def _spawn_child(
+        self,
+        compiled_module: CompiledModule,
+        args: List[Any],
+        sandbox_config: pyspawner.SandboxConfig,
+    ) -> pyspawner.ChildProcess:
+        """
+        Spawn a child from a zygote that preloads the module's imports.
+
+        Fall back to our main pyspawner if zygotes are disabled, if the module
+        imports nothing special, or if the zygote is broken.
+        """
+        extra_imports = find_preloadable_imports(
+            compiled_module.marshalled_code_object,
+            TRUSTED_PACKAGES,
+            PRELOADED_MODULE_NAMES,
+        )
+        if extra_imports:
+            zygote = None
+            try:
+                zygote = self._zygotes.get(extra_imports)  # may start a zygote
+                if zygote is not None:
+                    return zygote.spawn_child(
+                        args=args,
+                        process_name=compiled_module.module_slug,
+                        sandbox_config=sandbox_config,
+                    )
+            except (OSError, EOFError):
+                # The zygote failed to start, a preload failed and the zygote
+                # died, or it's dying because we evicted it. Either way, don't
+                # reuse it.
+                logger.exception("Zygote %r failed; falling back", extra_imports)
+                if zygote is not None:
+                    self._zygotes.discard(extra_imports, zygote)
+
+        return self._pyspawner.spawn_child(
+            args=args,
+            process_name=compiled_module.module_slug,
+            sandbox_config=sandbox_config,
+        )
 
     def validate(self, compiled_module: CompiledModule) -> None:
         """
@@ -254,6 +595,8 @@ class Kernel:
             network_config=None,
             compiled_module=compiled_module,
             timeout=self.validate_timeout,
+            max_memory_bytes=self.migrate_params_max_memory_bytes,
+            max_cpu_seconds=self.migrate_params_max_cpu_seconds,
             result=ttypes.ValidateModuleResult(),
             function="validate_thrift",
             args=[],
@@ -271,15 +614,62 @@ class Kernel:
             network_config=None,
             compiled_module=compiled_module,
             timeout=self.migrate_params_timeout,
+            max_memory_bytes=self.migrate_params_max_memory_bytes,
+            max_cpu_seconds=self.migrate_params_max_cpu_seconds,
             result=ttypes.RawParams(),
             function="migrate_params_thrift",
             args=[request],
         )
         return thrift_raw_params_to_arrow(response).params
 
-    def render(
+    def migrate_params_many(
+        self, compiled_module: CompiledModule, params_list: List[Dict[str, Any]]
+    ) -> List[Union[Dict[str, Any], ModuleError]]:
+        """
+        Call a module's migrate_params() on each of `params_list`, in one child.
+
+        Return one entry per params: the migrated params, or -- if that call
+        raised -- a ModuleExitedError like the one `migrate_params()` would
+        raise.
+
+        Raise ModuleError if the child itself fails (for instance, it times
+        out or the module doesn't compile). Then we can't tell which params
+        are to blame.
+        """
+        request = ttypes.RawParams(json_encode(params_list))
+        response = self._run_in_child(
+            chroot_dir=READONLY_CHROOT_DIR,
+            network_config=None,
+            compiled_module=compiled_module,
+            timeout=self.migrate_params_timeout,
+            max_memory_bytes=self.migrate_params_max_memory_bytes,
+            max_cpu_seconds=self.migrate_params_max_cpu_seconds,
+            result=ttypes.RawParams(),
+            function="migrate_params_many_thrift",
+            args=[request],
+        )
+        try:
+            results = json.loads(response.json)
+        except ValueError:
+            results = None
+        if (
+            not isinstance(results, list)
+            or len(results) != len(params_list)
+            or not all(
+                isinstance(result, dict) and ("params" in result or "error" in result)
+                for result in results
+            )
+        ):
+            raise ModuleExitedError(0, "Module returned invalid migrated params")
+        return [
+            result["params"]
+            if "params" in result
+            else ModuleExitedError(1, str(result["error"]))
+            for result in results
+        ]
+
+    def _render_request(
         self,
-        compiled_module: CompiledModule,
         chroot_context: ChrootContext,
         basedir: Path,
         input_table: ArrowTable,
@@ -287,15 +677,11 @@ class Kernel:
         tab: Tab,
         fetch_result: Optional[FetchResult],
         output_filename: str,
-    ) -> RenderResult:
-        """
-        Run the module's `render_thrift()` function and return its result.
-
-        Raise ModuleError if the module has a bug.
-        """
-        chroot_dir = chroot_context.chroot.root
-        basedir_seen_by_module = Path("/") / basedir.relative_to(chroot_dir)
-        request = ttypes.RenderRequest(
+    ) -> ttypes.RenderRequest:
+        basedir_seen_by_module = Path("/") / basedir.relative_to(
+            chroot_context.chroot.root
+        )
+        return ttypes.RenderRequest(
             str(basedir_seen_by_module),
             arrow_arrow_table_to_thrift(input_table),
             arrow_params_to_thrift(params),
@@ -307,32 +693,158 @@ class Kernel:
             ),
             output_filename,
         )
-        try:
-            with chroot_context.writable_file(basedir / output_filename):
-                result = self._run_in_child(
-                    chroot_dir=chroot_dir,
-                    network_config=pyspawner.NetworkConfig(),  # TODO disallow networking
-                    compiled_module=compiled_module,
-                    timeout=self.render_timeout,
-                    result=ttypes.RenderResult(),
-                    function="render_thrift",
-                    args=[request],
-                )
-        finally:
-            chroot_context.clear_unowned_edits()
 
+    def _render_result_to_arrow(
+        self,
+        result: ttypes.RenderResult,
+        basedir: Path,
+        input_table: ArrowTable,
+        output_filename: str,
+        timing: KernelTiming,
+    ) -> RenderResult:
         if result.table.filename and result.table.filename != output_filename:
             raise ModuleExitedError(0, "Module wrote to wrong output file")
 
+        time1 = time.monotonic()
         try:
             # thrift_render_result_to_arrow() verifies all filenames passed by
             # the module are in the directory the module has access to. It
             # assumes the Arrow file (if there is one) is untrusted, so it can
             # raise ValidateError
-            render_result = thrift_render_result_to_arrow(result, basedir)
+            return thrift_render_result_to_arrow(
+                result,
+                basedir,
+                validate_threads=self.validate_arrow_threads,
+                # The module usually passes most input columns through
+                validated_input=input_table,
+            )
         except ValidateError as err:
             raise ModuleExitedError(0, "Module produced invalid data: %s" % str(err))
-        return render_result
+        finally:
+            timing.validate_seconds = time.monotonic() - time1
+
+    def render(
+        self,
+        compiled_module: CompiledModule,
+        chroot_context: ChrootContext,
+        basedir: Path,
+        input_table: ArrowTable,
+        params: Params,
+        tab: Tab,
+        fetch_result: Optional[FetchResult],
+        output_filename: str,
+        timing: Optional[KernelTiming] = None,
+    ) -> RenderResult:
+        """
+        Run the module's `render_thrift()` function and return its result.
+
+        Raise ModuleError if the module has a bug.
+
+        If `timing` is set, record where the time went in it.
+
+        This blocks until the module finishes. From asyncio code, prefer
+        `render_async()`.
+        """
+        if timing is None:
+            timing = KernelTiming()
+        request = self._render_request(
+            chroot_context,
+            basedir,
+            input_table,
+            params,
+            tab,
+            fetch_result,
+            output_filename,
+        )
+        try:
+            thrift_files = _thrift_files(chroot_context, basedir, request)
+            with thrift_files as (request_path, response_path):
+                with chroot_context.writable_file(basedir / output_filename):
+                    result = self._run_in_child(
+                        chroot_dir=chroot_context.chroot.root,
+                        # TODO disallow networking
+                        network_config=chroot_context.chroot.network_config,
+                        compiled_module=compiled_module,
+                        timeout=self.render_timeout,
+                        max_memory_bytes=self.render_max_memory_bytes,
+                        max_cpu_seconds=self.render_max_cpu_seconds,
+                        result=ttypes.RenderResult(),
+                        function="render_thrift",
+                        args=[],
+                        request_path=request_path,
+                        response_path=response_path,
+                        timing=timing,
+                    )
+        finally:
+            chroot_context.clear_unowned_edits()
+
+        return self._render_result_to_arrow(
+            result, basedir, input_table, output_filename, timing
+        )
+
+    async def render_async(
+        self,
+        compiled_module: CompiledModule,
+        chroot_context: ChrootContext,
+        basedir: Path,
+        input_table: ArrowTable,
+        params: Params,
+        tab: Tab,
+        fetch_result: Optional[FetchResult],
+        output_filename: str,
+        timing: Optional[KernelTiming] = None,
+    ) -> RenderResult:
+        """
+        Like `render()`, but wait for the module on the event loop.
+
+        We only use executor threads for filesystem work (cleaning the chroot,
+        reading and validating the output file) -- not while the module runs.
+        """
+        if timing is None:
+            timing = KernelTiming()
+        loop = asyncio.get_event_loop()
+        request = self._render_request(
+            chroot_context,
+            basedir,
+            input_table,
+            params,
+            tab,
+            fetch_result,
+            output_filename,
+        )
+        try:
+            thrift_files = _thrift_files(chroot_context, basedir, request)
+            with thrift_files as (request_path, response_path):
+                with chroot_context.writable_file(basedir / output_filename):
+                    result = await self._run_in_child_async(
+                        chroot_dir=chroot_context.chroot.root,
+                        # TODO disallow networking
+                        network_config=chroot_context.chroot.network_config,
+                        compiled_module=compiled_module,
+                        timeout=self.render_timeout,
+                        max_memory_bytes=self.render_max_memory_bytes,
+                        max_cpu_seconds=self.render_max_cpu_seconds,
+                        result=ttypes.RenderResult(),
+                        function="render_thrift",
+                        args=[],
+                        request_path=request_path,
+                        response_path=response_path,
+                        timing=timing,
+                    )
+        finally:
+            await loop.run_in_executor(None, chroot_context.clear_unowned_edits)
+
+        return await loop.run_in_executor(
+            None,
+            partial(
+                self._render_result_to_arrow,
+                result,
+                basedir,
+                input_table,
+                output_filename,
+                timing,
+            ),
+        )
 
     def fetch(
         self,
@@ -344,11 +856,14 @@ class Kernel:
         last_fetch_result: Optional[FetchResult],
         input_parquet_filename: Optional[str],
         output_filename: str,
+        timing: Optional[KernelTiming] = None,
     ) -> FetchResult:
         """
         Run the module's `fetch_thrift()` function and return its result.
 
         Raise ModuleError if the module has a bug.
+
+        If `timing` is set, record where the time went in it.
         """
         chroot_dir = chroot_context.chroot.root
         basedir_seen_by_module = Path("/") / basedir.relative_to(chroot_dir)
@@ -365,16 +880,23 @@ class Kernel:
             output_filename,
         )
         try:
-            with chroot_context.writable_file(basedir / output_filename):
-                result = self._run_in_child(
-                    chroot_dir=chroot_dir,
-                    network_config=pyspawner.NetworkConfig(),
-                    compiled_module=compiled_module,
-                    timeout=self.fetch_timeout,
-                    result=ttypes.FetchResult(),
-                    function="fetch_thrift",
-                    args=[request],
-                )
+            thrift_files = _thrift_files(chroot_context, basedir, request)
+            with thrift_files as (request_path, response_path):
+                with chroot_context.writable_file(basedir / output_filename):
+                    result = self._run_in_child(
+                        chroot_dir=chroot_dir,
+                        network_config=chroot_context.chroot.network_config,
+                        compiled_module=compiled_module,
+                        timeout=self.fetch_timeout,
+                        max_memory_bytes=self.fetch_max_memory_bytes,
+                        max_cpu_seconds=self.fetch_max_cpu_seconds,
+                        result=ttypes.FetchResult(),
+                        function="fetch_thrift",
+                        args=[],
+                        request_path=request_path,
+                        response_path=response_path,
+                        timing=timing,
+                    )
         finally:
             chroot_context.clear_unowned_edits()
 
@@ -387,6 +909,55 @@ class Kernel:
         # maximum file size.
         return thrift_fetch_result_to_arrow(result, basedir)
 
+    def _spawn_timed(
+        self,
+        *,
+        chroot_dir: Path,
+        network_config: Optional[pyspawner.NetworkConfig],
+        compiled_module: CompiledModule,
+        function: str,
+        args: List[Any],
+        max_memory_bytes: int,
+        max_cpu_seconds: int,
+        request_path: Optional[Path],
+        response_path: Optional[Path],
+        timing: KernelTiming,
+    ) -> Tuple[pyspawner.ChildProcess, ChildReader, ChildReader]:
+        """
+        Spawn a child to run `function` with `args`.
+
+        Return the child and (output, log) readers for its stdout and stderr.
+        """
+
+        def path_seen_by_module(path: Optional[Path]) -> Optional[str]:
+            if path is None:
+                return None
+            else:
+                return str(Path("/") / path.relative_to(chroot_dir))
+
+        time1 = time.monotonic()
+        module_process = self._spawn_child(
+            compiled_module,
+            [
+                compiled_module,
+                function,
+                args,
+                max_memory_bytes,
+                max_cpu_seconds,
+                path_seen_by_module(request_path),
+                path_seen_by_module(response_path),
+            ],
+            pyspawner.SandboxConfig(chroot_dir=chroot_dir, network=network_config),
+        )
+        timing.spawn_seconds = time.monotonic() - time1
+
+        # stdout is Thrift package; stderr is logs
+        output_reader = ChildReader(
+            module_process.stdout.fileno(), OUTPUT_BUFFER_MAX_BYTES
+        )
+        log_reader = ChildReader(module_process.stderr.fileno(), LOG_BUFFER_MAX_BYTES)
+        return module_process, output_reader, log_reader
+
     def _run_in_child(
         self,
         *,
@@ -397,6 +968,11 @@ class Kernel:
         result: Any,
         function: str,
         args: List[Any],
+        max_memory_bytes: int = 0,
+        max_cpu_seconds: int = 0,
+        request_path: Optional[Path] = None,
+        response_path: Optional[Path] = None,
+        timing: Optional[KernelTiming] = None,
     ) -> None:
         """
         Fork a child process to run `function` with `args`.
@@ -409,64 +985,241 @@ class Kernel:
 
         Raise ModuleTimeoutError if it did not exit after a delay -- or if it
         closed its file descriptors long before it exited.
+
+        Record timing and the child's resource usage in `timing`, if set.
+
+        If `request_path` is set, the child reads its request from that file
+        instead of `args`. If `response_path` is set, it writes `result` there
+        instead of to stdout. See `_thrift_files()`.
+
+        This blocks the calling thread until the child dies. From asyncio code,
+        use `_run_in_child_async()`.
         """
+        if timing is None:
+            timing = KernelTiming()
         limit_time = time.time() + timeout
 
-        module_process = self._pyspawner.spawn_child(
-            args=[compiled_module, function, args],
-            process_name=compiled_module.module_slug,
-            sandbox_config=pyspawner.SandboxConfig(
-                chroot_dir=chroot_dir, network=network_config
+        module_process, output_reader, log_reader = self._spawn_timed(
+            chroot_dir=chroot_dir,
+            network_config=network_config,
+            compiled_module=compiled_module,
+            function=function,
+            args=args,
+            max_memory_bytes=max_memory_bytes,
+            max_cpu_seconds=max_cpu_seconds,
+            request_path=request_path,
+            response_path=response_path,
+            timing=timing,
+        )
+        time2 = time.monotonic()
+        pidfd = _pidfd_open(module_process.pid)
+        try:
+            # Read until the child closes its stdout and stderr
+            with selectors.DefaultSelector() as selector:
+                selector.register(output_reader.fileno, selectors.EVENT_READ)
+                selector.register(log_reader.fileno, selectors.EVENT_READ)
+
+                timed_out = False
+                while selector.get_map():
+                    remaining = limit_time - time.time()
+                    if remaining <= 0:
+                        if not timed_out:
+                            timed_out = True
+                            module_process.kill()  # untrusted code could ignore SIGTERM
+                        timeout = None  # wait as long as it takes for everything to die
+                        # Fall through. After SIGKILL the child will close each fd,
+                        # sending EOF to us. That means the selector _must_ return.
+                    else:
+                        timeout = remaining  # wait until we reach our timeout
+
+                    select_time = time.monotonic()
+                    events = selector.select(timeout=timeout)
+                    timing.blocked_on_output_seconds += time.monotonic() - select_time
+                    ready = frozenset(key.fd for key, _ in events)
+                    for reader in (output_reader, log_reader):
+                        if reader.fileno in ready:
+                            reader.ingest()
+                            if reader.eof:
+                                selector.unregister(reader.fileno)
+
+            time3 = time.monotonic()
+            timing.child_output_seconds = time3 - time2
+
+            # The child closed its fds, so it should die soon. If it doesn't,
+            # that's a bug -- so kill -9 it!
+            killed, exit_status, rusage = _reap_child(module_process, pidfd, timing)
+            timing.reap_seconds = time.monotonic() - time3
+        finally:
+            if pidfd is not None:
+                os.close(pidfd)
+
+        return self._read_child_result(
+            result,
+            output_reader,
+            log_reader,
+            timed_out=timed_out or killed,
+            exit_status=exit_status,
+            max_memory_bytes=max_memory_bytes,
+            max_cpu_seconds=max_cpu_seconds,
+            response_path=response_path,
+            rusage=rusage,
+            timing=timing,
+        )
+
+    async def _run_in_child_async(
+        self,
+        *,
+        chroot_dir: Path,
+        network_config: Optional[pyspawner.NetworkConfig],
+        compiled_module: CompiledModule,
+        timeout: float,
+        result: Any,
+        function: str,
+        args: List[Any],
+        max_memory_bytes: int = 0,
+        max_cpu_seconds: int = 0,
+        request_path: Optional[Path] = None,
+        response_path: Optional[Path] = None,
+        timing: Optional[KernelTiming] = None,
+    ) -> None:
+        """
+        Like `_run_in_child()`, but read output and reap on the event loop.
+
+        We don't tie up a thread while the child runs: we read its stdout and
+        stderr with `loop.add_reader()`, and we learn it died through its
+        pidfd. (We only use an executor to spawn the child, because spawning
+        may mean starting a new zygote.)
+
+        If we're cancelled, we SIGKILL and reap the child before raising, so
+        the caller can release the chroot right away.
+        """
+        if timing is None:
+            timing = KernelTiming()
+        loop = asyncio.get_event_loop()
+        limit_time = time.time() + timeout
+
+        spawn = loop.run_in_executor(
+            None,
+            partial(
+                self._spawn_timed,
+                chroot_dir=chroot_dir,
+                network_config=network_config,
+                compiled_module=compiled_module,
+                function=function,
+                args=args,
+                max_memory_bytes=max_memory_bytes,
+                max_cpu_seconds=max_cpu_seconds,
+                request_path=request_path,
+                response_path=response_path,
+                timing=timing,
             ),
         )
+        try:
+            module_process, output_reader, log_reader = await asyncio.shield(spawn)
+        except asyncio.CancelledError:
+            # The executor spawns the child anyway. Kill it before our caller
+            # releases the chroot.
+            with contextlib.suppress(Exception):
+                module_process, _, _ = await spawn
+                _kill_and_reap_child(module_process)
+            raise
+        time2 = time.monotonic()
+        pidfd = _pidfd_open(module_process.pid)
+        reaped = False
+        try:
+            # Read until the child closes its stdout and stderr
+            readers = (output_reader, log_reader)
+            all_eof = loop.create_future()
+            ingest_seconds = 0.0
 
-        # stdout is Thrift package; stderr is logs
-        output_reader = ChildReader(
-            module_process.stdout.fileno(), OUTPUT_BUFFER_MAX_BYTES
+            def on_readable(reader: ChildReader) -> None:
+                nonlocal ingest_seconds
+                ingest_time = time.monotonic()
+                reader.ingest()
+                ingest_seconds += time.monotonic() - ingest_time
+                if reader.eof:
+                    loop.remove_reader(reader.fileno)
+                    if all(r.eof for r in readers) and not all_eof.done():
+                        all_eof.set_result(None)
+
+            for reader in readers:
+                loop.add_reader(reader.fileno, on_readable, reader)
+            try:
+                timed_out = False
+                try:
+                    await asyncio.wait_for(
+                        asyncio.shield(all_eof), max(0.0, limit_time - time.time())
+                    )
+                except asyncio.TimeoutError:
+                    timed_out = True
+                    module_process.kill()  # untrusted code could ignore SIGTERM
+                    # After SIGKILL the child will close each fd, sending EOF
+                    # to us. Wait as long as it takes for everything to die.
+                    await all_eof
+            finally:
+                for reader in readers:
+                    if not reader.eof:
+                        loop.remove_reader(reader.fileno)
+
+            time3 = time.monotonic()
+            timing.child_output_seconds = time3 - time2
+            timing.blocked_on_output_seconds += (
+                timing.child_output_seconds - ingest_seconds
+            )
+
+            # The child closed its fds, so it should die soon. If it doesn't,
+            # that's a bug -- so kill -9 it!
+            killed, exit_status, rusage = await _reap_child_async(
+                module_process, pidfd, timing
+            )
+            reaped = True
+            timing.reap_seconds = time.monotonic() - time3
+        finally:
+            if not reaped:
+                # We were cancelled (or crashed) while the child ran. Our
+                # caller is about to release its chroot: the child must die.
+                _kill_and_reap_child(module_process)
+            if pidfd is not None:
+                os.close(pidfd)
+
+        return self._read_child_result(
+            result,
+            output_reader,
+            log_reader,
+            timed_out=timed_out or killed,
+            exit_status=exit_status,
+            max_memory_bytes=max_memory_bytes,
+            max_cpu_seconds=max_cpu_seconds,
+            response_path=response_path,
+            rusage=rusage,
+            timing=timing,
         )
-        log_reader = ChildReader(module_process.stderr.fileno(), LOG_BUFFER_MAX_BYTES)
-        # Read until the child closes its stdout and stderr
-        with selectors.DefaultSelector() as selector:
-            selector.register(output_reader.fileno, selectors.EVENT_READ)
-            selector.register(log_reader.fileno, selectors.EVENT_READ)
-
-            timed_out = False
-            while selector.get_map():
-                remaining = limit_time - time.time()
-                if remaining <= 0:
-                    if not timed_out:
-                        timed_out = True
-                        module_process.kill()  # untrusted code could ignore SIGTERM
-                    timeout = None  # wait as long as it takes for everything to die
-                    # Fall through. After SIGKILL the child will close each fd,
-                    # sending EOF to us. That means the selector _must_ return.
-                else:
-                    timeout = remaining  # wait until we reach our timeout
-
-                events = selector.select(timeout=timeout)
-                ready = frozenset(key.fd for key, _ in events)
-                for reader in (output_reader, log_reader):
-                    if reader.fileno in ready:
-                        reader.ingest()
-                        if reader.eof:
-                            selector.unregister(reader.fileno)
-
-        # The child closed its fds, so it should die soon. If it doesn't, that's
-        # a bug -- so kill -9 it!
-        #
-        # os.wait() has no timeout option, and asyncio messes with signals so
-        # we won't use those. Spin until the process dies, and force-kill if we
-        # spin too long.
-        for _ in range(DEAD_PROCESS_N_WAITS):
-            pid, exit_status = module_process.wait(os.WNOHANG)
-            if pid != 0:  # pid==0 means process is still running
-                break
-            time.sleep(DEAD_PROCESS_WAIT_POLL_INTERVAL)
-        else:
-            # we waited and waited. No luck. Dead module. Kill it.
-            timed_out = True
-            module_process.kill()
-            _, exit_status = module_process.wait(0)
+
+    def _read_child_result(
+        self,
+        result: Any,
+        output_reader: ChildReader,
+        log_reader: ChildReader,
+        *,
+        timed_out: bool,
+        exit_status: int,
+        max_memory_bytes: int,
+        max_cpu_seconds: int,
+        response_path: Optional[Path],
+        rusage: Any,
+        timing: KernelTiming,
+    ) -> Any:
+        """
+        Decode a reaped child's Thrift output into `result`.
+
+        Read from `response_path` if set; otherwise, from the child's stdout.
+
+        Raise ModuleTimeoutError, ModuleMemoryExceededError or
+        ModuleExitedError if the child misbehaved.
+        """
+        timing.child_max_rss_bytes = rusage.ru_maxrss * 1024  # Linux: kilobytes
+        timing.child_user_cpu_seconds = rusage.ru_utime
+        timing.child_system_cpu_seconds = rusage.ru_stime
         if os.WIFEXITED(exit_status):
             exit_code = os.WEXITSTATUS(exit_status)
         elif os.WIFSIGNALED(exit_status):
@@ -477,22 +1230,71 @@ class Kernel:
         if timed_out:
             raise ModuleTimeoutError
 
+        if max_cpu_seconds and (
+            exit_code == -signal.SIGXCPU
+            or (
+                exit_code == -signal.SIGKILL
+                and rusage.ru_utime + rusage.ru_stime >= max_cpu_seconds
+            )
+        ):
+            raise ModuleTimeoutError  # RLIMIT_CPU soft limit, then hard limit
+
+        if max_memory_bytes and exit_code == EXIT_CODE_MEMORY_EXCEEDED:
+            raise ModuleMemoryExceededError(max_memory_bytes)
+
         if exit_code != 0:
             raise ModuleExitedError(exit_code, log_reader.to_str())
 
-        transport = thrift.transport.TTransport.TMemoryBuffer(output_reader.buffer)
-        protocol = thrift.protocol.TBinaryProtocol.TBinaryProtocol(transport)
-        try:
-            result.read(protocol)
-        except EOFError:  # TODO handle other errors Thrift may throw
-            raise ModuleExitedError(exit_code, log_reader.to_str()) from None
+        time1 = time.monotonic()
+        with contextlib.ExitStack() as ctx:
+            if response_path is None:
+                transport = thrift.transport.TTransport.TMemoryBuffer(
+                    output_reader.buffer
+                )
+            else:
+                response_file = ctx.enter_context(
+                    self._open_response_file(response_path)
+                )
+                transport = thrift.transport.TTransport.TFileObjectTransport(
+                    response_file
+                )
+            protocol = thrift.protocol.TBinaryProtocol.TBinaryProtocol(transport)
+            try:
+                result.read(protocol)
+            except EOFError:  # TODO handle other errors Thrift may throw
+                raise ModuleExitedError(exit_code, log_reader.to_str()) from None
+            finally:
+                timing.decode_seconds = time.monotonic() - time1
 
-        # We should be at the end of the output now. If we aren't, that means
-        # the child wrote too much.
-        if transport.read(1) != b"":
-            raise ModuleExitedError(exit_code, log_reader.to_str())
+            # We should be at the end of the output now. If we aren't, that
+            # means the child wrote too much.
+            if transport.read(1) != b"":
+                raise ModuleExitedError(exit_code, log_reader.to_str())
 
         if log_reader.buffer:
             logger.info("Output from module process: %s", log_reader.to_str())
 
         return result
+
+    def _open_response_file(self, path: Path) -> ContextManager[io.BufferedReader]:
+        """
+        Open a response file the child wrote, for reading.
+
+        The child may have replaced the file with a symlink (say, to one of
+        _our_ secrets) or a FIFO: don't follow or block on those. Raise
+        ModuleExitedError if the file isn't a sane-sized regular file.
+        """
+        try:
+            fd = os.open(path, os.O_RDONLY | os.O_NOFOLLOW | os.O_NONBLOCK)
+        except OSError:
+            raise ModuleExitedError(0, "Module bug: response file is not a file")
+        try:
+            st = os.fstat(fd)
+            if not stat.S_ISREG(st.st_mode):
+                raise ModuleExitedError(0, "Module bug: response file is not a file")
+            if st.st_size > RESPONSE_FILE_MAX_BYTES:
+                raise ModuleExitedError(0, "Module bug: response file is too large")
+        except BaseException:
+            os.close(fd)
+            raise
+        return os.fdopen(fd, "rb")
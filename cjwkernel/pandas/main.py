@@ -1,20 +1,49 @@
+import os
+from pathlib import Path
+import resource
 import sys
 import types
-from typing import Any, List
+from typing import Any, BinaryIO, List, Optional
 import thrift.protocol.TBinaryProtocol
 import thrift.transport.TTransport
+from cjwkernel.errors import EXIT_CODE_MEMORY_EXCEEDED
+from cjwkernel.thrift import ttypes
 from cjwkernel.types import CompiledModule
+from cjwkernel.util import read_thrift_file
 import cjwkernel.pandas.module
 
 
-def main(compiled_module: CompiledModule, function: str, args: List[Any]) -> None:
+REQUEST_TYPES = {
+    "render_thrift": ttypes.RenderRequest,
+    "fetch_thrift": ttypes.FetchRequest,
+}
+
+
+def main(
+    compiled_module: CompiledModule,
+    function: str,
+    args: List[Any],
+    max_memory_bytes: int = 0,
+    max_cpu_seconds: int = 0,
+    request_path: Optional[str] = None,
+    response_path: Optional[str] = None,
+) -> None:
     """
     Run `function` with `args`, and write the (Thrift) result to stdout.
+
+    If `max_memory_bytes` or `max_cpu_seconds` is nonzero, limit this process
+    before running any module code.
+
+    If `request_path` is set, ignore `args`: read the (Thrift) request from
+    that file instead. If `response_path` is set, write the result there
+    instead of to stdout. Requests and results can be many megabytes (say,
+    chart JSON); files spare us pickling them and buffering them in pipes.
     """
 
     assert function in (
         "render_thrift",
         "migrate_params_thrift",
+        "migrate_params_many_thrift",
         "fetch_thrift",
         "validate_thrift",
     )
@@ -23,14 +52,44 @@ def main(compiled_module: CompiledModule, function: str, args: List[Any]) -> Non
     # stdout; we can't have text interwoven.
     sys.stdout = sys.stderr
 
-    run_in_sandbox(compiled_module, function, args)
+    set_resource_limits(max_memory_bytes, max_cpu_seconds)
+
+    if request_path is not None:
+        args = [read_thrift_file(Path(request_path), REQUEST_TYPES[function]())]
+
+    try:
+        if response_path is None:
+            run_in_sandbox(compiled_module, function, args, sys.__stdout__.buffer)
+        else:
+            with open(response_path, "wb") as output:
+                run_in_sandbox(compiled_module, function, args, output)
+    except MemoryError:
+        # Don't clean up: that could allocate, too
+        os._exit(EXIT_CODE_MEMORY_EXCEEDED)
+
+
+def set_resource_limits(max_memory_bytes: int, max_cpu_seconds: int) -> None:
+    """
+    Cap this process's heap and CPU time. 0 means, "no limit".
+
+    We limit RLIMIT_DATA, not RLIMIT_AS: it counts heap and anonymous mmaps
+    (Linux >= 4.7) but not read-only file mmaps -- so memory-mapped input
+    tables don't count against it. It does count what we inherited from the
+    pyspawner (pandas, pyarrow, ...), so limits must leave room for that.
+
+    After `max_cpu_seconds`, Linux sends SIGXCPU; a second later, SIGKILL.
+    """
+    if max_memory_bytes:
+        resource.setrlimit(resource.RLIMIT_DATA, (max_memory_bytes, max_memory_bytes))
+    if max_cpu_seconds:
+        resource.setrlimit(resource.RLIMIT_CPU, (max_cpu_seconds, max_cpu_seconds + 1))
 
 
 def run_in_sandbox(
-    compiled_module: CompiledModule, function: str, args: List[Any]
+    compiled_module: CompiledModule, function: str, args: List[Any], output: BinaryIO
 ) -> None:
     """
-    Run `function` with `args`, and write the (Thrift) result to `sys.stdout`.
+    Run `function` with `args`, and write the (Thrift) result to `output`.
     """
     # TODO sandbox -- will need an OS `clone()` with namespace, cgroups, ....
 
@@ -71,6 +130,8 @@ def run_in_sandbox(
         result = module.render_thrift(*args)
     elif function == "migrate_params_thrift":
         result = module.migrate_params_thrift(*args)
+    elif function == "migrate_params_many_thrift":
+        result = module.migrate_params_many_thrift(*args)
     elif function == "validate_thrift":
         result = module.validate_thrift(*args)
     elif function == "fetch_thrift":
@@ -78,7 +139,7 @@ def run_in_sandbox(
     else:
         raise NotImplementedError
 
-    transport = thrift.transport.TTransport.TFileObjectTransport(sys.__stdout__.buffer)
+    transport = thrift.transport.TTransport.TFileObjectTransport(output)
     protocol = thrift.protocol.TBinaryProtocol.TBinaryProtocol(transport)
     if result is not None:
         result.write(protocol)
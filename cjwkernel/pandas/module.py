@@ -4,11 +4,14 @@
 
 import asyncio
 import inspect
+import json
 from pathlib import Path
+import traceback
 from typing import Any, Dict, List, Optional, Union
 
 import cjwparquet
 import pandas as pd
+import pyarrow
 from cjwkernel import settings, types
 from cjwkernel.pandas import types as ptypes
 from cjwkernel.thrift import ttypes
@@ -21,7 +24,7 @@ from cjwkernel.types import (
     thrift_params_to_arrow,
     thrift_raw_params_to_arrow,
 )
-from cjwkernel.util import tempfile_context
+from cjwkernel.util import json_encode, tempfile_context
 
 
 def render(table: pd.DataFrame, params: Dict[str, Any], **kwargs):
@@ -191,7 +194,11 @@ def __render_arrow(
 
     Write to `output_path`.
 
-    This will typically call `render()`.
+    This will typically call `render()`. `render()` may write `output_path`
+    itself and return errors (or `None`). Or it may return a `pyarrow.Table`
+    (or a `(pyarrow.Table, errors)` tuple) and we'll write the table. The
+    latter is the fast path for modules that only select, reorder or rename
+    columns or filter rows: they never convert the table to Pandas and back.
     """
     # call render()
     raw_result = render(
@@ -204,6 +211,16 @@ def __render_arrow(
         fetch_result=fetch_result,
     )
 
+    if isinstance(raw_result, pyarrow.Table):
+        raw_result = (raw_result, None)
+    if (
+        isinstance(raw_result, tuple)
+        and len(raw_result) == 2
+        and isinstance(raw_result[0], pyarrow.Table)
+    ):
+        output_table, raw_result = raw_result
+        __write_arrow_table(output_table, output_path)
+
     # coerce result
     # TODO let module output column types. (Currently, the lack of column types
     # means this is only useful for fetch modules that don't output number
@@ -225,6 +242,38 @@ def __render_arrow(
     return types.RenderResult(table, errors)
 
 
+def __compact_dictionaries(table: pyarrow.Table) -> pyarrow.Table:
+    """
+    Re-encode each dictionary column with one dictionary, all of it used.
+
+    `Table.filter()` and friends keep dictionaries as-is, so their output may
+    have unused dictionary values, which validation rejects. And an Arrow
+    file can only hold one dictionary per column, while `concat_tables()`
+    output may have one per chunk.
+    """
+    for i, field in enumerate(table.schema):
+        if pyarrow.types.is_dictionary(field.type):
+            # to_pandas() unifies chunks' dictionaries into one Categorical
+            series = pd.Series(table.column(i).to_pandas())
+            series = series.cat.remove_unused_categories()
+            table = table.set_column(
+                i, field.name, ptypes.series_to_arrow_array(series)
+            )
+    return table
+
+
+def __write_arrow_table(table: pyarrow.Table, path: Path) -> None:
+    """
+    Write `table` to `path`; write an empty file if `table` has no columns.
+    """
+    if table.num_columns == 0:
+        path.write_bytes(b"")
+    else:
+        table = __compact_dictionaries(table)
+        with pyarrow.RecordBatchFileWriter(str(path), table.schema) as writer:
+            writer.write_table(table, settings.MAX_ROWS_PER_RECORD_BATCH)
+
+
 def __render_by_signature(
     *,
     table: types.ArrowTable,
@@ -483,6 +532,26 @@ def migrate_params_thrift(params: ttypes.RawParams):
     return arrow_raw_params_to_thrift(types.RawParams(result_dict))
 
 
+def migrate_params_many_thrift(params_list: ttypes.RawParams) -> ttypes.RawParams:
+    """
+    Call `migrate_params_thrift()` on each params in a JSON Array.
+
+    This lets the kernel migrate many steps' params in a single child process.
+
+    Return a JSON Array with one entry per params: `{"params": migrated}` or,
+    if migrate_params() raised (or returned something we can't serialize),
+    `{"error": traceback}`. One buggy step shouldn't fail the whole batch.
+    """
+    results = []
+    for params in json.loads(params_list.json):
+        try:
+            result = migrate_params_thrift(ttypes.RawParams(json_encode(params)))
+            results.append({"params": json.loads(result.json)})
+        except Exception:
+            results.append({"error": traceback.format_exc()})
+    return ttypes.RawParams(json_encode(results))
+
+
 def validate_thrift() -> ttypes.ValidateModuleResult:
     """
     Crash with an error to stdout if something about this module seems amiss.
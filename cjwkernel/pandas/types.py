@@ -686,19 +686,43 @@ def dataframe_to_arrow_table(
     """
     Write `dataframe` to an Arrow file and return an ArrowTable backed by it.
 
+    We convert and write `settings.MAX_ROWS_PER_RECORD_BATCH` rows at a time,
+    so we never hold an Arrow copy of the entire table in RAM.
+
     The result will consume little RAM, because its data is stored in an
     mmapped file.
+
+    Categorical slices keep all their column's categories, so every batch
+    shares one dictionary (the only kind an Arrow file can hold). A batch may
+    use only some of it; validation requires that the _column_ uses all of it,
+    which `validate_dataframe()` has already ensured.
     """
-    arrow_columns = []
+    arrow_columns = [pandas_column.to_arrow() for pandas_column in columns]
     if columns:
-        arrays = []
-        for pandas_column in columns:
-            arrays.append(series_to_arrow_array(dataframe[pandas_column.name]))
-            arrow_columns.append(pandas_column.to_arrow())
-
-        arrow_table = pyarrow.Table.from_arrays(arrays, names=[c.name for c in columns])
-        with pyarrow.RecordBatchFileWriter(str(path), arrow_table.schema) as writer:
-            writer.write_table(arrow_table)
+        names = [c.name for c in columns]
+        batch_size = settings.MAX_ROWS_PER_RECORD_BATCH
+        writer = None
+        try:
+            # Always write at least one batch, even if there are no rows
+            for start in range(0, max(len(dataframe), 1), batch_size):
+                batch = pyarrow.RecordBatch.from_arrays(
+                    [
+                        series_to_arrow_array(
+                            dataframe[name].iloc[start : start + batch_size]
+                        )
+                        for name in names
+                    ],
+                    names=names,
+                )
+                if writer is None:
+                    writer = pyarrow.RecordBatchFileWriter(str(path), batch.schema)
+                writer.write_batch(batch)
+        finally:
+            if writer is not None:
+                writer.close()
+
+        with pyarrow.ipc.open_file(str(path)) as reader:
+            arrow_table = reader.read_all()  # mmapped
     else:
         path = None
         arrow_table = None
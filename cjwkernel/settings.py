@@ -18,6 +18,15 @@ Modules should truncate their results to conform to the column-number limit. The
 default `render_pandas()` implementation does this.
 """
 
+MAX_ROWS_PER_RECORD_BATCH = 100_000
+"""
+How many rows do we write at a time when converting a table to Arrow?
+
+Arrow files may hold many record batches. Converting one batch at a time
+bounds the memory needed for conversion; readers mmap the file, so they
+don't care how many batches there are.
+"""
+
 MAX_BYTES_PER_VALUE = 32 * 1024
 """
 How long can a text value be?
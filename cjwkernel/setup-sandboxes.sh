@@ -11,8 +11,10 @@
 # is a source of frustration: integration-test runs privileged but staging
 # and production don't. If you're messing with sandboxes, test on staging.
 #
-# This is _one_ chroot environment, suitable for _one_ command. Assume
-# pyspawner never runs two commands at once.
+# Each editable chroot is suitable for _one_ command at a time. We build
+# $CJW_N_EDITABLE_CHROOTS of them (default 1), so a fetcher or renderer can
+# run that many modules at once. cjwkernel/chroot.py reads the same
+# environment variable.
 #
 # We use overlay mounts:
 #
@@ -35,12 +37,13 @@
 #       * var/tmp/ (empty folder)
 #       * ...
 #   * chroot/ (on a separate filesystem)
-#     * editable/ (a singleton)
-#       * upperfs.ext4 (a 20GB sparse file with ext4 filesystem)
-#       * upperfs/ (upperfs.ext4, loopback-mounted)
-#         * upper/ (empty: where mounts and edits from caller+module go)
-#         * work/ (for overlayfs -- do not read/modify)
-#       * root/ (overlay dev volumes + layers/base + upper)
+#     * editable/
+#       * 0/ (and 1/, 2/, ... -- one per $CJW_N_EDITABLE_CHROOTS)
+#         * upperfs.ext4 (a 20GB sparse file with ext4 filesystem)
+#         * upperfs/ (upperfs.ext4, loopback-mounted)
+#           * upper/ (empty: where mounts and edits from caller+module go)
+#           * work/ (for overlayfs -- do not read/modify)
+#         * root/ (overlay dev volumes + layers/base + upper)
 #     * readonly/
 #       * upper/ (do not modify -- contains mountpoints)
 #       * work/ (for overlayfs -- do not read/modify)
@@ -72,12 +75,19 @@ fi
 
 CHROOT=/var/lib/cjwkernel/chroot
 LAYERS=/var/lib/cjwkernel/chroot-layers
-EDITABLE_CHROOT_SIZE=20G  # max size of user edits in EDITABLE_CHROOT
+EDITABLE_CHROOT_SIZE=20G  # max size of user edits in each editable chroot
+N_EDITABLE_CHROOTS=${CJW_N_EDITABLE_CHROOTS:-1}
 VENV_PATH="/root/.local/share/virtualenvs" # only exits in dev
 
-# NetworkConfig mimics pyspawner/pyspawner/sandbox.py
-KERNEL_VETH=veth-pyspawn
-CHILD_VETH_IP4="192.168.123.2"
+# NetworkConfig mimics cjwkernel/chroot.py: chroot 0 uses pyspawner's
+# defaults (pyspawner/pyspawner/sandbox.py); chroot N uses its own veth and
+# 192.168.(123+N).0/24 block.
+kernel_veth() {
+  if [ "$1" = 0 ]; then echo veth-pyspawn; else echo "veth-pys-$1"; fi
+}
+child_veth_ip4() {
+  echo "192.168.$((123 + $1)).2"
+}
 
 
 # /app/cjwkernel (base layer)
@@ -112,7 +122,7 @@ if [ "$MODE" = "only-readonly" ]; then
 fi
 
 
-# EDITABLE_CHROOT
+# EDITABLE_CHROOT_POOL
 # Build upperfs.ext4 and mount it
 # What's upperfs.ext4? It's a space-limited filesystem. If users write data
 # larger than $EDITABLE_CHROOT_SIZE to the chroot filesystem, they'll get
@@ -120,31 +130,34 @@ fi
 # script super-fast on producion. (We don't care much about FS speed. The
 # intended use case is large tempfiles and no fsync. When files grow beyond
 # the Linux I/O cache size, users should expect slowdowns.)
-mkdir -p $CHROOT/editable/upperfs
-truncate --size=$EDITABLE_CHROOT_SIZE $CHROOT/editable/upperfs.ext4  # create sparse file
-mkfs.ext4 -q -O ^has_journal $CHROOT/editable/upperfs.ext4
-if ! mount -o loop $CHROOT/editable/upperfs.ext4 $CHROOT/editable/upperfs; then
-  # Docker without --privileged doesn't provide a loopback device. This affects
-  # dev mode (which we don't care about). But it should never happen on production.
-  echo "******* WARNING: failed to mount loopback filesystem $CHROOT/editable/upperfs *****" >&2
-  echo "Workbench will not constrain modules' disk usage. If a module writes" >&2
-  echo "too much to disk, Workbench will experience undefined behavior." >&2
-fi
-# Build overlay filesystem, with upper layer on upperfs
-mkdir -p $CHROOT/editable/upperfs/{upper,work}
-mkdir -p $CHROOT/editable/root
-mount -t overlay overlay -o dirsync,lowerdir=$LAYERS/base,upperdir=$CHROOT/editable/upperfs/upper,workdir=$CHROOT/editable/upperfs/work $CHROOT/editable/root
-# Bind-mount /root/.local/share/virtualenvs in dev mode. (On production, the
-# Python environment is different and packages are installed in
-# /usr/local/lib/python3.7/site-packages, baked into the Docker image, so this
-# step isn't needed.)
-#
-# We set up a mount per chroot.
-if test -d "$VENV_PATH"; then
-  mountpoint="$CHROOT/editable/root$VENV_PATH"
-  mkdir -p "$mountpoint"
-  mount --bind -o ro "$VENV_PATH" "$mountpoint"
-fi
+for i in $(seq 0 $((N_EDITABLE_CHROOTS - 1))); do
+  dir=$CHROOT/editable/$i
+  mkdir -p $dir/upperfs
+  truncate --size=$EDITABLE_CHROOT_SIZE $dir/upperfs.ext4  # create sparse file
+  mkfs.ext4 -q -O ^has_journal $dir/upperfs.ext4
+  if ! mount -o loop $dir/upperfs.ext4 $dir/upperfs; then
+    # Docker without --privileged doesn't provide a loopback device. This affects
+    # dev mode (which we don't care about). But it should never happen on production.
+    echo "******* WARNING: failed to mount loopback filesystem $dir/upperfs *****" >&2
+    echo "Workbench will not constrain modules' disk usage. If a module writes" >&2
+    echo "too much to disk, Workbench will experience undefined behavior." >&2
+  fi
+  # Build overlay filesystem, with upper layer on upperfs
+  mkdir -p $dir/upperfs/{upper,work}
+  mkdir -p $dir/root
+  mount -t overlay overlay -o dirsync,lowerdir=$LAYERS/base,upperdir=$dir/upperfs/upper,workdir=$dir/upperfs/work $dir/root
+  # Bind-mount /root/.local/share/virtualenvs in dev mode. (On production, the
+  # Python environment is different and packages are installed in
+  # /usr/local/lib/python3.7/site-packages, baked into the Docker image, so this
+  # step isn't needed.)
+  #
+  # We set up a mount per chroot.
+  if test -d "$VENV_PATH"; then
+    mountpoint="$dir/root$VENV_PATH"
+    mkdir -p "$mountpoint"
+    mount --bind -o ro "$VENV_PATH" "$mountpoint"
+  fi
+done
 
 
 # iptables
@@ -152,7 +165,10 @@ fi
 #     1.1.1.1 via 192.168.86.1 dev wlp2s0 src 192.168.86.70 uid 1000
 # Grep for the "src x.x.x.x" part and store the "x.x.x.x"
 ipv4_snat_source=$(ip route get 1.1.1.1 | grep -oe "src [^ ]\+" | cut -d' ' -f2)
-cat << EOF | iptables-legacy-restore --noflush
+for i in $(seq 0 $((N_EDITABLE_CHROOTS - 1))); do
+  KERNEL_VETH=$(kernel_veth $i)
+  CHILD_VETH_IP4=$(child_veth_ip4 $i)
+  cat << EOF | iptables-legacy-restore --noflush
 *filter
 :INPUT ACCEPT
 :FORWARD DROP
@@ -160,7 +176,14 @@ cat << EOF | iptables-legacy-restore --noflush
 -A INPUT -i $KERNEL_VETH -j REJECT
 # Allow forwarding response packets back to our module (even
 # though our module's IP is in UNSAFE_IPV4_ADDRESS_BLOCKS).
--A FORWARD -o $KERNEL_VETH -j ACCEPT
+#
+# Only allow _responses_. This loop appends each chroot's rules after
+# the previous chroot's, so chroot 0's rule comes before chroot N's
+# "-d 192.168.0.0/16 -j REJECT". Without --ctstate, a module in chroot
+# N could open new connections to a module running in chroot 0. With
+# it, a new connection from one veth to another hits chroot N's REJECT
+# rule: the veth pairs can't reach each other.
+-A FORWARD -o $KERNEL_VETH -m conntrack --ctstate ESTABLISHED,RELATED -j ACCEPT
 # Block unsafe destination addresses. Modules should not be
 # able to access internal services. (Not even our DNS server.)
 -A FORWARD -d 0.0.0.0/8          -i $KERNEL_VETH -j REJECT
@@ -191,3 +214,4 @@ COMMIT
 -A POSTROUTING -s $CHILD_VETH_IP4 -j SNAT --to-source $ipv4_snat_source
 COMMIT
 EOF
+done
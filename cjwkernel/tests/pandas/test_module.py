@@ -2,6 +2,7 @@ import shutil
 import unittest
 from contextlib import ExitStack  # workaround https://github.com/psf/black/issues/664
 from datetime import datetime
+import json
 from pathlib import Path
 from unittest.mock import patch
 
@@ -39,6 +40,7 @@ from cjwkernel.types import (
     thrift_render_result_to_arrow,
 )
 from cjwkernel.util import create_tempdir, tempfile_context
+from cjwkernel.validate import validate_arrow_table
 from pandas.testing import assert_frame_equal
 
 
@@ -79,6 +81,32 @@ class MigrateParamsTests(unittest.TestCase):
         with self.assertRaisesRegex(TypeError, "not JSON serializable"):
             self._test(migrate_params)
 
+    def test_many(self):
+        def migrate_params(params):
+            return {"y": params["x"]}
+
+        with patch.object(module, "migrate_params", migrate_params):
+            thrift_result = module.migrate_params_many_thrift(
+                ttypes.RawParams('[{"x":1},{"x":2}]')
+            )
+        self.assertEqual(
+            json.loads(thrift_result.json), [{"params": {"y": 1}}, {"params": {"y": 2}}]
+        )
+
+    def test_many_exception_returns_error_for_only_failed_params(self):
+        def migrate_params(params):
+            if params["x"] == 2:
+                raise RuntimeError("huh")
+            return {"y": params["x"]}
+
+        with patch.object(module, "migrate_params", migrate_params):
+            thrift_result = module.migrate_params_many_thrift(
+                ttypes.RawParams('[{"x":1},{"x":2}]')
+            )
+        result = json.loads(thrift_result.json)
+        self.assertEqual(result[0], {"params": {"y": 1}})
+        self.assertRegex(result[1]["error"], "RuntimeError: huh")
+
 
 class RenderTests(unittest.TestCase):
     def setUp(self):
@@ -236,6 +264,49 @@ class RenderTests(unittest.TestCase):
             result.errors, [RenderError(I18nMessage("x", {"a": "b"}, "cjwmodule"))]
         )
 
+    def test_render_arrow_table_return_table(self):
+        # The param name "arrow_table" is a special case
+        def render(arrow_table, params, output_path, **kwargs):
+            filtered = arrow_table.filter(pa.array([False, True, True]))
+            return pa.Table.from_arrays([filtered.column("B")], ["B"])
+
+        result = self._test_render(render, {"A": [1, 2, 3], "B": ["a", "b", "c"]})
+        assert_arrow_table_equals(result.table, {"B": ["b", "c"]})
+        self.assertEqual(result.errors, [])
+
+    def test_render_arrow_table_return_filtered_dictionary(self):
+        # Table.filter() keeps unused dictionary values. The kernel must drop
+        # them, or the output would fail validation.
+        def render(arrow_table, params, output_path, **kwargs):
+            return arrow_table.filter(pa.array([False, True, True]))
+
+        result = self._test_render(
+            render, {"A": pa.array(["a", "b", "c"]).dictionary_encode()}
+        )
+        column = result.table.table.column("A")
+        self.assertTrue(pa.types.is_dictionary(column.type))
+        self.assertEqual(column.to_pylist(), ["b", "c"])
+        self.assertEqual(column.chunk(0).dictionary.to_pylist(), ["b", "c"])
+        validate_arrow_table(result.table.table)  # do not raise
+
+    def test_render_arrow_table_return_table_and_errors(self):
+        # The param name "arrow_table" is a special case
+        def render(arrow_table, params, output_path, **kwargs):
+            return arrow_table, [("x", {})]
+
+        result = self._test_render(render, {"A": [1]})
+        assert_arrow_table_equals(result.table, {"A": [1]})
+        self.assertEqual(result.errors, [RenderError(I18nMessage("x", {}, None))])
+
+    def test_render_arrow_table_return_zero_column_table_is_empty(self):
+        # The param name "arrow_table" is a special case
+        def render(arrow_table, params, output_path, **kwargs):
+            return pa.table({})
+
+        result = self._test_render(render, {"A": [1]})
+        self.assertIsNone(result.table.path)
+        self.assertIsNone(result.table.table)
+
     @override_settings(MAX_ROWS_PER_TABLE=12)
     def test_render_arrow_table_settings(self):
         def render(arrow_table, params, output_path, *, settings, **kwargs):
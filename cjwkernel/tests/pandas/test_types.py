@@ -25,6 +25,7 @@ from cjwkernel.tests.util import (
     override_settings,
 )
 from cjwkernel.util import create_tempfile
+from cjwkernel.validate import validate_arrow_table
 from pandas.testing import assert_frame_equal, assert_series_equal
 
 
@@ -1592,6 +1593,23 @@ class ArrowConversionTests(unittest.TestCase):
             ),
         )
 
+    @override_settings(MAX_ROWS_PER_RECORD_BATCH=2)
+    def test_dataframe_many_record_batches(self):
+        table = dataframe_to_arrow_table(
+            pd.DataFrame(
+                {"A": [1, 2, 3], "B": pd.Series(["x", "y", "x"], dtype="category")}
+            ),
+            [Column("A", ColumnType.NUMBER("{:,d}")), Column("B", ColumnType.TEXT())],
+            self.path,
+        )
+        self.assertEqual(table.table.column(0).num_chunks, 2)
+        self.assertEqual(table.table.column(0).to_pylist(), [1, 2, 3])
+        self.assertEqual(table.table.column(1).to_pylist(), ["x", "y", "x"])
+        self.assertEqual(table.metadata.n_rows, 3)
+        # The second batch uses only "x" of the shared dictionary [x, y]. That's
+        # valid: the column as a whole uses every value.
+        validate_arrow_table(table.table)  # do not raise
+
     def test_arrow_datetime_column(self):
         dataframe, columns = arrow_table_to_dataframe(
             arrow_table(
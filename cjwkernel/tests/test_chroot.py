@@ -0,0 +1,98 @@
+import asyncio
+import contextlib
+import threading
+import unittest
+from cjwkernel.chroot import Chroot, ChrootPool
+from cjwkernel.util import tempdir_context
+
+
+class ChrootPoolTests(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.ctx = contextlib.ExitStack()
+        base = self.ctx.enter_context(tempdir_context())
+        self.chroots = [
+            Chroot(
+                self.ctx.enter_context(tempdir_context()),  # root
+                base,
+                self.ctx.enter_context(tempdir_context()),  # upper
+            )
+            for _ in range(2)
+        ]
+        self.pool = ChrootPool(self.chroots)
+
+    def tearDown(self):
+        self.ctx.close()
+        super().tearDown()
+
+    def test_acquire_distinct_chroots(self):
+        with self.pool.acquire_context() as ctx1:
+            with self.pool.acquire_context() as ctx2:
+                self.assertNotEqual(ctx1.chroot, ctx2.chroot)
+
+    def test_release_on_exit(self):
+        with self.pool.acquire_context() as ctx1:
+            chroot = ctx1.chroot
+        with self.pool.acquire_context() as ctx2:
+            with self.pool.acquire_context() as ctx3:
+                self.assertIn(chroot, [ctx2.chroot, ctx3.chroot])
+
+    def test_release_on_error(self):
+        with self.assertRaises(ValueError):
+            with self.pool.acquire_context():
+                raise ValueError("boo")
+        with self.pool.acquire_context():
+            with self.pool.acquire_context():
+                pass  # both chroots are free
+
+    def test_acquire_waits_for_release(self):
+        acquired = threading.Event()
+        results = []
+
+        def acquire_third():
+            with self.pool.acquire_context() as ctx:
+                results.append(ctx.chroot)
+                acquired.set()
+
+        with self.pool.acquire_context() as ctx1:
+            with self.pool.acquire_context():
+                thread = threading.Thread(target=acquire_third)
+                thread.start()
+                self.assertFalse(acquired.wait(0.05))
+            # releasing ctx2's chroot hands it to the thread
+            self.assertTrue(acquired.wait(1))
+            thread.join()
+            self.assertNotEqual(results[0], ctx1.chroot)
+
+    def test_acquire_async_waits_for_release(self):
+        async def inner():
+            async with self.pool.acquire_context_async() as ctx1:
+                chroot1 = ctx1.chroot
+                async with self.pool.acquire_context_async():
+                    task = asyncio.create_task(self._acquire_async())
+                    await asyncio.sleep(0.01)
+                    self.assertFalse(task.done())
+                chroot3 = await task
+                self.assertNotEqual(chroot3, chroot1)
+
+        asyncio.run(inner())
+
+    def test_acquire_async_cancel_while_waiting(self):
+        async def inner():
+            async with self.pool.acquire_context_async():
+                async with self.pool.acquire_context_async():
+                    task = asyncio.create_task(self._acquire_async())
+                    await asyncio.sleep(0.01)
+                    task.cancel()
+                    with self.assertRaises(asyncio.CancelledError):
+                        await task
+            # Both chroots must be free again
+            async with self.pool.acquire_context_async():
+                async with self.pool.acquire_context_async():
+                    pass
+
+        asyncio.run(inner())
+
+    async def _acquire_async(self) -> Chroot:
+        async with self.pool.acquire_context_async() as ctx:
+            return ctx.chroot
@@ -2,6 +2,7 @@ import unittest
 from cjwkernel.errors import (
     ModuleError,
     ModuleExitedError,
+    ModuleMemoryExceededError,
     ModuleTimeoutError,
     format_for_user_debugging,
 )
@@ -11,6 +12,12 @@ class FormatForUserDebuggingTests(unittest.TestCase):
     def test_timeout_error(self):
         self.assertEqual(format_for_user_debugging(ModuleTimeoutError()), "timed out")
 
+    def test_memory_exceeded_error(self):
+        self.assertEqual(
+            format_for_user_debugging(ModuleMemoryExceededError(512 * 1024 * 1024)),
+            "out of memory (limit 512MB)",
+        )
+
     def test_exited_sigkill(self):
         self.assertEqual(
             format_for_user_debugging(ModuleExitedError(-9, "")), "SIGKILL"
@@ -1,13 +1,19 @@
+import asyncio
 import contextlib
 import marshal
 import textwrap
 import unittest
 from unittest.mock import patch
 import pyarrow
-from cjwkernel.errors import ModuleExitedError, ModuleTimeoutError
-from cjwkernel.kernel import Kernel
+from cjwkernel.errors import (
+    ModuleExitedError,
+    ModuleMemoryExceededError,
+    ModuleTimeoutError,
+)
+import cjwkernel.kernel
+from cjwkernel.kernel import Kernel, KernelTiming
 from cjwkernel.tests.util import arrow_table_context
-from cjwkernel.chroot import EDITABLE_CHROOT
+from cjwkernel.chroot import EDITABLE_CHROOT_POOL
 from cjwkernel import types
 
 
@@ -35,7 +41,9 @@ class KernelTests(unittest.TestCase):
     def setUp(self):
         super().setUp()
         self.ctx = contextlib.ExitStack()
-        self.chroot_context = self.ctx.enter_context(EDITABLE_CHROOT.acquire_context())
+        self.chroot_context = self.ctx.enter_context(
+            EDITABLE_CHROOT_POOL.acquire_context()
+        )
         self.basedir = self.ctx.enter_context(
             self.chroot_context.tempdir_context(prefix="basedir-")
         )
@@ -124,6 +132,21 @@ class KernelTests(unittest.TestCase):
         with self.assertRaises(ModuleExitedError):
             self.kernel.migrate_params(mod, {"foo": 123})
 
+    def test_migrate_params_many(self):
+        mod = _compile("foo", "def migrate_params(params): return {'nested': params}")
+        result = self.kernel.migrate_params_many(mod, [{"foo": 1}, {"foo": 2}])
+        self.assertEquals(result, [{"nested": {"foo": 1}}, {"nested": {"foo": 2}}])
+
+    def test_migrate_params_many_error_in_one_params(self):
+        mod = _compile(
+            "foo",
+            "def migrate_params(params):\n  if params['foo'] == 2:\n    raise ValueError('bad')\n  return params",
+        )
+        result = self.kernel.migrate_params_many(mod, [{"foo": 1}, {"foo": 2}])
+        self.assertEquals(result[0], {"foo": 1})
+        self.assertIsInstance(result[1], ModuleExitedError)
+        self.assertRegex(result[1].log, "ValueError: bad")
+
     def test_render_happy_path(self):
         mod = _compile(
             "foo",
@@ -157,6 +180,84 @@ class KernelTests(unittest.TestCase):
                     {"A": [2.5, 5.0, 7.5], "B": ["aXX", "bXX", "cXX"]},
                 )
 
+    def test_render_zygote_fails_to_start_falls_back(self):
+        mod = _compile("foo", "def render(table, params): return table")
+        with patch.object(
+            cjwkernel.kernel, "find_preloadable_imports", return_value=("json",)
+        ), patch.object(self.kernel._zygotes, "get", side_effect=OSError):
+            with arrow_table_context({"A": [1]}, dir=self.basedir) as input_table:
+                input_table.path.chmod(0o644)
+                with self.chroot_context.tempfile_context(
+                    prefix="output-", dir=self.basedir
+                ) as output_path:
+                    with self.assertLogs("cjwkernel.kernel", level="ERROR"):
+                        result = self.kernel.render(
+                            mod,
+                            self.chroot_context,
+                            self.basedir,
+                            input_table,
+                            types.Params({}),
+                            types.Tab("tab-1", "Tab 1"),
+                            None,
+                            output_filename=output_path.name,
+                        )
+                    self.assertEquals(result.table.table.to_pydict(), {"A": [1]})
+
+    def test_render_json_larger_than_output_buffer(self):
+        # The response goes through a file, not stdout, so it isn't limited to
+        # OUTPUT_BUFFER_MAX_BYTES
+        mod = _compile(
+            "foo",
+            "def render(table, params):\n  return table, '', {'x': 'y' * 3000000}",
+        )
+        with arrow_table_context({"A": [1]}, dir=self.basedir) as input_table:
+            input_table.path.chmod(0o644)
+            with self.chroot_context.tempfile_context(
+                prefix="output-", dir=self.basedir
+            ) as output_path:
+                result = self.kernel.render(
+                    mod,
+                    self.chroot_context,
+                    self.basedir,
+                    input_table,
+                    types.Params({}),
+                    types.Tab("tab-1", "Tab 1"),
+                    None,
+                    output_filename=output_path.name,
+                )
+                self.assertEqual(result.json, {"x": "y" * 3000000})
+
+    def test_render_timing(self):
+        mod = _compile(
+            "foo",
+            "import pandas as pd\ndef render(table, params): return pd.DataFrame({'A': [1]})",
+        )
+        with arrow_table_context({"A": [1]}, dir=self.basedir) as input_table:
+            input_table.path.chmod(0o644)
+            with self.chroot_context.tempfile_context(
+                prefix="output-", dir=self.basedir
+            ) as output_path:
+                timing = KernelTiming()
+                self.kernel.render(
+                    mod,
+                    self.chroot_context,
+                    self.basedir,
+                    input_table,
+                    types.Params({}),
+                    types.Tab("tab-1", "Tab 1"),
+                    None,
+                    output_filename=output_path.name,
+                    timing=timing,
+                )
+        self.assertGreater(timing.spawn_seconds, 0)
+        self.assertGreater(timing.child_output_seconds, 0)
+        self.assertGreaterEqual(timing.n_reap_polls, 1)
+        self.assertGreater(timing.validate_seconds, 0)
+        self.assertGreater(timing.child_max_rss_bytes, 0)
+        self.assertGreater(
+            timing.child_user_cpu_seconds + timing.child_system_cpu_seconds, 0
+        )
+
     def test_render_exception(self):
         mod = _compile(
             "foo.py", "import os\ndef render(table, params): raise RuntimeError('fail')"
@@ -259,6 +360,140 @@ class KernelTests(unittest.TestCase):
                             output_filename=output_path.name,
                         )
 
+    def test_render_memory_exceeded(self):
+        mod = _compile(
+            "foo",
+            "def render(table, params):\n  return bytearray(4 * 1024 * 1024 * 1024)",
+        )
+        with patch.object(self.kernel, "render_max_memory_bytes", 1024 * 1024 * 1024):
+            with self.assertRaises(ModuleMemoryExceededError):
+                with arrow_table_context({"A": [1]}, dir=self.basedir) as input_table:
+                    input_table.path.chmod(0o644)
+                    with self.chroot_context.tempfile_context(
+                        prefix="output-", dir=self.basedir
+                    ) as output_path:
+                        self.kernel.render(
+                            mod,
+                            self.chroot_context,
+                            self.basedir,
+                            input_table,
+                            types.Params({}),
+                            types.Tab("tab-1", "Tab 1"),
+                            None,
+                            output_filename=output_path.name,
+                        )
+
+    def test_render_cpu_exceeded(self):
+        mod = _compile("foo", "def render(table, params):\n  while True: pass")
+        with patch.object(self.kernel, "render_max_cpu_seconds", 1):
+            with self.assertRaises(ModuleTimeoutError):
+                with arrow_table_context({"A": [1]}, dir=self.basedir) as input_table:
+                    input_table.path.chmod(0o644)
+                    with self.chroot_context.tempfile_context(
+                        prefix="output-", dir=self.basedir
+                    ) as output_path:
+                        self.kernel.render(
+                            mod,
+                            self.chroot_context,
+                            self.basedir,
+                            input_table,
+                            types.Params({}),
+                            types.Tab("tab-1", "Tab 1"),
+                            None,
+                            output_filename=output_path.name,
+                        )
+
+    def test_render_async(self):
+        mod = _compile(
+            "foo",
+            "import pandas as pd\ndef render(table, params): return table * 2",
+        )
+        with arrow_table_context({"A": [1]}, dir=self.basedir) as input_table:
+            input_table.path.chmod(0o644)
+            with self.chroot_context.tempfile_context(
+                prefix="output-", dir=self.basedir
+            ) as output_path:
+                timing = KernelTiming()
+                result = asyncio.get_event_loop().run_until_complete(
+                    self.kernel.render_async(
+                        mod,
+                        self.chroot_context,
+                        self.basedir,
+                        input_table,
+                        types.Params({}),
+                        types.Tab("tab-1", "Tab 1"),
+                        None,
+                        output_filename=output_path.name,
+                        timing=timing,
+                    )
+                )
+                self.assertEquals(result.table.table.to_pydict(), {"A": [2]})
+        self.assertEqual(timing.n_reap_polls, 1)  # pidfd told us it exited
+        self.assertLess(timing.reap_seconds, 0.5)
+
+    def test_render_async_kill_timeout(self):
+        mod = _compile(
+            "foo", "import time\ndef render(table, params):\n  time.sleep(2)"
+        )
+        with patch.object(self.kernel, "render_timeout", 0.001):
+            with self.assertRaises(ModuleTimeoutError):
+                with arrow_table_context({"A": [1]}, dir=self.basedir) as input_table:
+                    input_table.path.chmod(0o644)
+                    with self.chroot_context.tempfile_context(
+                        prefix="output-", dir=self.basedir
+                    ) as output_path:
+                        asyncio.get_event_loop().run_until_complete(
+                            self.kernel.render_async(
+                                mod,
+                                self.chroot_context,
+                                self.basedir,
+                                input_table,
+                                types.Params({}),
+                                types.Tab("tab-1", "Tab 1"),
+                                None,
+                                output_filename=output_path.name,
+                            )
+                        )
+
+    def test_render_async_cancel_kills_child(self):
+        mod = _compile(
+            "foo", "import time\ndef render(table, params):\n  time.sleep(30)"
+        )
+
+        async def render_and_cancel(input_table, output_path):
+            task = asyncio.ensure_future(
+                self.kernel.render_async(
+                    mod,
+                    self.chroot_context,
+                    self.basedir,
+                    input_table,
+                    types.Params({}),
+                    types.Tab("tab-1", "Tab 1"),
+                    None,
+                    output_filename=output_path.name,
+                )
+            )
+            await asyncio.sleep(0.5)  # let the child spawn and start sleeping
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        with patch.object(
+            cjwkernel.kernel,
+            "_kill_and_reap_child",
+            wraps=cjwkernel.kernel._kill_and_reap_child,
+        ) as kill_and_reap:
+            with arrow_table_context({"A": [1]}, dir=self.basedir) as input_table:
+                input_table.path.chmod(0o644)
+                with self.chroot_context.tempfile_context(
+                    prefix="output-", dir=self.basedir
+                ) as output_path:
+                    asyncio.get_event_loop().run_until_complete(
+                        render_and_cancel(input_table, output_path)
+                    )
+            # The child is dead before we release the chroot
+            kill_and_reap.assert_called_once()
+
     def test_fetch_happy_path(self):
         mod = _compile(
             "foo",
@@ -4,13 +4,14 @@ import pyarrow
 from cjwkernel.types import Column, ColumnType, TableMetadata
 from cjwkernel.util import tempfile_context
 from cjwkernel.validate import (
+    read_and_validate_arrow_file,
     validate_arrow_file,
+    validate_arrow_table,
     validate_table_metadata,
     DatetimeTimezoneNotAllowed,
     DatetimeUnitNotAllowed,
     DuplicateColumnName,
     InvalidArrowFile,
-    TableHasTooManyRecordBatches,
     TableShouldBeNone,
     WrongColumnCount,
     WrongColumnName,
@@ -72,6 +73,152 @@ class ValidateArrowFileTests(unittest.TestCase):
                 validate_arrow_file(path)
 
 
+class ValidateArrowTableTests(unittest.TestCase):
+    def _invalid_utf8_array(self) -> pyarrow.StringArray:
+        return pyarrow.StringArray.from_buffers(
+            1,
+            pyarrow.py_buffer(struct.pack("II", 0, 1)),
+            pyarrow.py_buffer(b"\xc9"),
+        )
+
+    def test_happy_path(self):
+        validate_arrow_table(
+            pyarrow.table(
+                {
+                    "A": ["x", None, "é"],
+                    "B": [1.0, None, 2.5],
+                    "C": pyarrow.array(["a", "b", "a"]).dictionary_encode(),
+                    "D": [1, 2, 3],
+                }
+            )
+        )  # do not raise
+
+    def test_invalid_utf8(self):
+        with self.assertRaisesRegex(
+            InvalidArrowFile, "arrow-validate: --check-utf8 failed on column A"
+        ):
+            validate_arrow_table(pyarrow.table({"A": self._invalid_utf8_array()}))
+
+    def test_value_split_mid_character(self):
+        array = pyarrow.StringArray.from_buffers(
+            2,
+            pyarrow.py_buffer(struct.pack("III", 0, 1, 2)),
+            pyarrow.py_buffer("é".encode("utf-8")),  # 2 bytes, split in two
+        )
+        with self.assertRaisesRegex(InvalidArrowFile, "--check-utf8"):
+            validate_arrow_table(pyarrow.table({"A": array}))
+
+    def test_offsets_overflow(self):
+        array = pyarrow.StringArray.from_buffers(
+            1,
+            pyarrow.py_buffer(struct.pack("II", 0, 5)),
+            pyarrow.py_buffer(b"x"),
+        )
+        with self.assertRaisesRegex(InvalidArrowFile, "--check-offsets-dont-overflow"):
+            validate_arrow_table(pyarrow.table({"A": array}))
+
+    def test_float_not_finite(self):
+        with self.assertRaisesRegex(
+            InvalidArrowFile, "--check-floats-all-finite failed on column A"
+        ):
+            validate_arrow_table(pyarrow.table({"A": [1.0, float("inf")]}))
+
+    def test_float_null_is_ok(self):
+        validate_arrow_table(pyarrow.table({"A": [1.0, None]}))  # do not raise
+
+    def test_dictionary_value_unused(self):
+        array = pyarrow.DictionaryArray.from_arrays(
+            pyarrow.array([0, 0], pyarrow.int32()), pyarrow.array(["a", "b"])
+        )
+        with self.assertRaisesRegex(
+            InvalidArrowFile, "--check-dictionary-values-all-used failed on column A"
+        ):
+            validate_arrow_table(pyarrow.table({"A": array}))
+
+    def test_dictionary_values_used_across_chunks(self):
+        dictionary = pyarrow.array(["a", "b", "c"])
+        column = pyarrow.chunked_array(
+            [
+                pyarrow.DictionaryArray.from_arrays(
+                    pyarrow.array([0, 0], pyarrow.int32()), dictionary
+                ),
+                pyarrow.DictionaryArray.from_arrays(
+                    pyarrow.array([1, None, 2], pyarrow.int32()), dictionary
+                ),
+            ]
+        )
+        validate_arrow_table(pyarrow.table({"A": column}))  # do not raise
+
+    def test_dictionary_value_unused_in_all_chunks(self):
+        dictionary = pyarrow.array(["a", "b", "c"])
+        column = pyarrow.chunked_array(
+            [
+                pyarrow.DictionaryArray.from_arrays(
+                    pyarrow.array([0], pyarrow.int32()), dictionary
+                ),
+                pyarrow.DictionaryArray.from_arrays(
+                    pyarrow.array([2], pyarrow.int32()), dictionary
+                ),
+            ]
+        )
+        with self.assertRaisesRegex(
+            InvalidArrowFile, "--check-dictionary-values-all-used failed on column A"
+        ):
+            validate_arrow_table(pyarrow.table({"A": column}))
+
+    def test_dictionary_value_duplicated(self):
+        array = pyarrow.DictionaryArray.from_arrays(
+            pyarrow.array([0, 1], pyarrow.int32()), pyarrow.array(["a", "a"])
+        )
+        with self.assertRaisesRegex(
+            InvalidArrowFile, "--check-dictionary-values-unique failed on column A"
+        ):
+            validate_arrow_table(pyarrow.table({"A": array}))
+
+    def test_column_name_control_character(self):
+        with self.assertRaisesRegex(
+            InvalidArrowFile, "--check-column-name-control-characters"
+        ):
+            validate_arrow_table(pyarrow.table({"A\nB": [1]}))
+
+    def test_parallel_reports_first_invalid_column(self):
+        with self.assertRaisesRegex(InvalidArrowFile, "failed on column B"):
+            validate_arrow_table(
+                pyarrow.table(
+                    {
+                        "A": ["x"],
+                        "B": self._invalid_utf8_array(),
+                        "C": [float("nan")],
+                    }
+                ),
+                n_threads=3,
+            )
+
+    def test_skip_columns_unchanged_from_validated_input(self):
+        # We pretend the input was validated; the output column is a copy of
+        # it, so we don't look at its values.
+        with arrow_file({"A": self._invalid_utf8_array()}) as path:
+            validated_input = pyarrow.ipc.open_file(str(path)).read_all()
+            with arrow_file(validated_input) as path2:
+                read_and_validate_arrow_file(
+                    path2, validated_input=validated_input
+                )  # do not raise
+
+    def test_validate_changed_columns_despite_validated_input(self):
+        validated_input = pyarrow.table({"A": ["x"]})
+        with self.assertRaisesRegex(InvalidArrowFile, "--check-utf8"):
+            validate_arrow_table(
+                pyarrow.table({"A": self._invalid_utf8_array()}),
+                validated_input=validated_input,
+            )
+
+    def test_read_file_does_not_open(self):
+        with tempfile_context() as path:
+            path.write_bytes(b"this is not an Arrow file")
+            with self.assertRaises(InvalidArrowFile):
+                read_and_validate_arrow_file(path)
+
+
 class ValidateTableMetadataTests(unittest.TestCase):
     def test_table_none_when_should_be_set(self):
         with self.assertRaises(WrongColumnCount):
@@ -87,17 +234,16 @@ class ValidateTableMetadataTests(unittest.TestCase):
                 pyarrow.Table.from_pydict({"A": ["x"]}), TableMetadata(2, [Text("A")])
             )
 
-    def test_table_not_one_batch(self):
-        with self.assertRaises(TableHasTooManyRecordBatches):
-            validate_table_metadata(
-                pyarrow.Table.from_batches(
-                    [
-                        pyarrow.RecordBatch.from_arrays([pyarrow.array(["a"])], ["A"]),
-                        pyarrow.RecordBatch.from_arrays([pyarrow.array(["b"])], ["A"]),
-                    ]
-                ),
-                TableMetadata(2, [Text("A")]),
-            )
+    def test_table_many_record_batches(self):
+        validate_table_metadata(
+            pyarrow.Table.from_batches(
+                [
+                    pyarrow.RecordBatch.from_arrays([pyarrow.array(["a"])], ["A"]),
+                    pyarrow.RecordBatch.from_arrays([pyarrow.array(["b"])], ["A"]),
+                ]
+            ),
+            TableMetadata(2, [Text("A")]),
+        )
 
     def test_duplicate_column_name(self):
         with self.assertRaises(DuplicateColumnName):
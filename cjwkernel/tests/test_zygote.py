@@ -0,0 +1,83 @@
+import unittest
+from unittest.mock import Mock
+import marshal
+from cjwkernel.zygote import ZygotePool, find_preloadable_imports
+
+
+def _marshal(code: str) -> bytes:
+    return marshal.dumps(compile(code, "<module>", "exec"))
+
+
+class FindPreloadableImportsTests(unittest.TestCase):
+    def _find(self, code, trusted=frozenset(["json", "email"]), imported=frozenset()):
+        return find_preloadable_imports(_marshal(code), trusted, imported)
+
+    def test_import_submodule(self):
+        self.assertEqual(self._find("import json.decoder"), ("json.decoder",))
+
+    def test_from_import_submodule(self):
+        self.assertEqual(
+            self._find("from email import message"), ("email", "email.message")
+        )
+
+    def test_from_import_attribute_is_not_a_module(self):
+        self.assertEqual(self._find("from json import loads"), ("json",))
+
+    def test_import_inside_function(self):
+        self.assertEqual(
+            self._find("def render(table, params):\n    import json.encoder"),
+            ("json.encoder",),
+        )
+
+    def test_skip_untrusted_package(self):
+        self.assertEqual(self._find("import antigravity\nimport this"), ())
+
+    def test_skip_main_test_and_private_modules(self):
+        self.assertEqual(
+            self._find(
+                "import unittest.__main__\n"
+                "import unittest.test\n"
+                "import email._parseaddr\n"
+                "from json import _private",
+                trusted=frozenset(["unittest", "email", "json"]),
+            ),
+            ("json",),
+        )
+
+    def test_skip_missing_module(self):
+        self.assertEqual(self._find("import json.nonexistent"), ())
+
+    def test_skip_already_imported(self):
+        self.assertEqual(
+            self._find("import json.decoder", imported=frozenset(["json.decoder"])),
+            (),
+        )
+
+
+class ZygotePoolTests(unittest.TestCase):
+    def test_disabled(self):
+        create = Mock()
+        pool = ZygotePool(0, create)
+        self.assertIsNone(pool.get(("json",)))
+        create.assert_not_called()
+
+    def test_reuse(self):
+        pool = ZygotePool(2, lambda imports: Mock())
+        self.assertIs(pool.get(("json",)), pool.get(("json",)))
+
+    def test_evict_least_recently_used(self):
+        pool = ZygotePool(2, lambda imports: Mock())
+        a = pool.get(("a",))
+        b = pool.get(("b",))
+        pool.get(("a",))  # "b" is now least-recently used
+        pool.get(("c",))
+        b.close.assert_called_with()
+        a.close.assert_not_called()
+        self.assertIs(pool.get(("a",)), a)
+
+    def test_discard(self):
+        pool = ZygotePool(2, lambda imports: Mock())
+        a = pool.get(("a",))
+        pool.discard(("a",), a)
+        a.close.assert_called_with()
+        self.assertIsNot(pool.get(("a",)), a)
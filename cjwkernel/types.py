@@ -279,7 +279,14 @@ class ArrowTable:
             return self.path.stat().st_size
 
     @classmethod
-    def from_untrusted_file(cls, path: Path, metadata: TableMetadata) -> ArrowTable:
+    def from_untrusted_file(
+        cls,
+        path: Path,
+        metadata: TableMetadata,
+        *,
+        validate_threads: int = 0,
+        validated_input: Optional[ArrowTable] = None,
+    ) -> ArrowTable:
         """
         Build an ArrowTable from path and metadata.
 
@@ -287,14 +294,31 @@ class ArrowTable:
         data does not match metadata, or `path` is not a readable file. This
         scans the entire file.
 
-        The file will be validated to ensure SECURITY.
+        The file will be validated to ensure SECURITY. By default, we validate
+        with `/usr/bin/arrow-validate`, in a subprocess. With
+        `validate_threads > 0`, we validate in this process instead, using
+        that many threads; and we skip columns that are byte-for-byte equal to
+        `validated_input`'s. (See `validate_arrow_table()`.)
         """
-        from .validate import validate_arrow_file, validate_table_metadata
+        from .validate import (
+            read_and_validate_arrow_file,
+            validate_arrow_file,
+            validate_table_metadata,
+        )
 
-        validate_arrow_file(path)  # raise ValidateError
-        # Since the file is valid, assume we can read it without error
-        reader = pyarrow.ipc.open_file(path.as_posix())  # raise nothing
-        table = reader.read_all()  # raise nothing
+        if validate_threads > 0:
+            table = read_and_validate_arrow_file(
+                path,
+                validated_input=(
+                    None if validated_input is None else validated_input.table
+                ),
+                n_threads=validate_threads,
+            )  # raise ValidateError
+        else:
+            validate_arrow_file(path)  # raise ValidateError
+            # Since the file is valid, assume we can read it without error
+            reader = pyarrow.ipc.open_file(path.as_posix())  # raise nothing
+            table = reader.read_all()  # raise nothing
         validate_table_metadata(table, metadata)  # raise ValidateError
         return ArrowTable(path, table, metadata)
 
@@ -768,7 +792,12 @@ def thrift_table_metadata_to_arrow(value: ttypes.TableMetadata) -> TableMetadata
 
 
 def thrift_arrow_table_to_arrow(
-    value: ttypes.ArrowTable, basedir: Path, trusted: bool = False
+    value: ttypes.ArrowTable,
+    basedir: Path,
+    trusted: bool = False,
+    *,
+    validate_threads: int = 0,
+    validated_input: Optional[ArrowTable] = None,
 ) -> ArrowTable:
     """
     Convert from a Thrift ArrowTable.
@@ -777,7 +806,8 @@ def thrift_arrow_table_to_arrow(
     does not match metadata.
 
     Since Thrift is used for inter-process communication, by default we
-    treat the file as untrusted. (See `from_untrusted_file()`.)
+    treat the file as untrusted. (See `from_untrusted_file()`, which
+    explains `validate_threads` and `validated_input`.)
     """
     metadata = thrift_table_metadata_to_arrow(value.metadata)
     if value.filename:
@@ -785,7 +815,12 @@ def thrift_arrow_table_to_arrow(
         if trusted:
             return ArrowTable.from_trusted_file(path, metadata)
         else:
-            return ArrowTable.from_untrusted_file(path, metadata)
+            return ArrowTable.from_untrusted_file(
+                path,
+                metadata,
+                validate_threads=validate_threads,
+                validated_input=validated_input,
+            )
     else:
         return ArrowTable.from_zero_column_metadata(metadata)
 
@@ -881,10 +916,19 @@ def thrift_fetch_result_to_arrow(
 
 
 def thrift_render_result_to_arrow(
-    value: ttypes.RenderResult, basedir: Path
+    value: ttypes.RenderResult,
+    basedir: Path,
+    *,
+    validate_threads: int = 0,
+    validated_input: Optional[ArrowTable] = None,
 ) -> RenderResult:
     return RenderResult(
-        thrift_arrow_table_to_arrow(value.table, basedir),
+        thrift_arrow_table_to_arrow(
+            value.table,
+            basedir,
+            validate_threads=validate_threads,
+            validated_input=validated_input,
+        ),
         [thrift_render_error_to_arrow(e) for e in value.errors],
         json.loads(value.json) if value.json else None,
     )
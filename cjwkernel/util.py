@@ -5,6 +5,8 @@ from pathlib import Path
 import shutil
 import tempfile
 from typing import Any, ContextManager, Dict
+import thrift.protocol.TBinaryProtocol
+import thrift.transport.TTransport
 
 
 def json_encode(value: Dict[str, Any]) -> str:
@@ -14,6 +16,30 @@ def json_encode(value: Dict[str, Any]) -> str:
     return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":"))
 
 
+def write_thrift_file(path: Path, value: Any) -> None:
+    """
+    Write Thrift `value` to `path`, overwriting it.
+    """
+    with path.open("wb") as f:
+        transport = thrift.transport.TTransport.TFileObjectTransport(f)
+        protocol = thrift.protocol.TBinaryProtocol.TBinaryProtocol(transport)
+        value.write(protocol)
+        transport.flush()
+
+
+def read_thrift_file(path: Path, value: Any) -> Any:
+    """
+    Read Thrift `value` (e.g., `ttypes.RenderRequest()`) from `path`.
+
+    Only use this on trusted files. Raise EOFError if the file is truncated.
+    """
+    with path.open("rb") as f:
+        transport = thrift.transport.TTransport.TFileObjectTransport(f)
+        protocol = thrift.protocol.TBinaryProtocol.TBinaryProtocol(transport)
+        value.read(protocol)
+    return value
+
+
 def create_tempfile(prefix=None, suffix=None, dir=None) -> Path:
     # Workbench tempfiles are usually _big_ -- sometimes >1GB. In Kubernetes
     # and Docker, /tmp is mounted on tmpfs; /var/tmp isn't, so its files are on
@@ -1,7 +1,11 @@
+import codecs
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import subprocess
-from typing import Optional
+from typing import List, Optional
+import numpy as np
 import pyarrow
+import pyarrow.ipc
 from .types import ColumnType, TableMetadata
 from . import settings
 
@@ -30,11 +34,6 @@ class TableShouldBeNone(ValidateError):
         )
 
 
-class TableHasTooManyRecordBatches(ValidateError):
-    def __init__(self, actual: int):
-        super().__init__("Table has %d record batches; we only support 1" % actual)
-
-
 class WrongColumnName(ValidateError):
     def __init__(self, position: int, expected: str, actual: str):
         super().__init__(
@@ -105,6 +104,7 @@ def validate_arrow_file(path: Path) -> None:
     * Some text data has invalid UTF-8
     * A float is NaN or Infinity.
     * A dictionary column's dictionary contains nulls or unused values
+      (values a column's record batches don't use, all batches combined)
     """
     try:
         subprocess.run(
@@ -130,6 +130,277 @@ def validate_arrow_file(path: Path) -> None:
         raise InvalidArrowFile(message) from None
 
 
+_UTF8_CHUNK_SIZE = 1024 * 1024
+
+
+def _validity_mask(array: pyarrow.Array) -> Optional[np.ndarray]:
+    """
+    Return a bool mask of non-null values, or `None` if there are no nulls.
+    """
+    if array.null_count == 0:
+        return None
+    bitmap = np.frombuffer(array.buffers()[0], dtype=np.uint8)
+    bits = np.unpackbits(bitmap, bitorder="little")
+    mask = bits[array.offset : array.offset + len(array)].astype(np.bool_)
+    if len(mask) != len(array):
+        raise ValueError("validity bitmap is too short")
+    return mask
+
+
+def _fixed_width_values(array: pyarrow.Array, dtype: np.dtype) -> np.ndarray:
+    """
+    View `array`'s values (including null slots) as numpy, without copying.
+
+    Raise ValueError if the values buffer is too short.
+    """
+    return np.frombuffer(
+        array.buffers()[1],
+        dtype=dtype,
+        count=len(array),
+        offset=array.offset * dtype.itemsize,
+    )
+
+
+def _check_utf8_array(name: str, array: pyarrow.Array) -> None:
+    buffers = array.buffers()
+    offsets = np.frombuffer(
+        buffers[1],
+        dtype=np.int32,
+        count=len(array) + 1,
+        offset=array.offset * 4,
+    )
+    if buffers[2] is None:
+        data = np.empty(0, dtype=np.uint8)
+    else:
+        data = np.frombuffer(buffers[2], dtype=np.uint8)
+    start, stop = int(offsets[0]), int(offsets[-1])
+    if start < 0 or stop > len(data) or (np.diff(offsets) < 0).any():
+        raise InvalidArrowFile(
+            "--check-offsets-dont-overflow failed on column %s" % name
+        )
+
+    # Each value starts on a character boundary (never on a continuation
+    # byte), so each value is valid UTF-8 if their concatenation is.
+    starts = offsets[offsets < stop]
+    if ((data[starts] & 0xC0) == 0x80).any():
+        raise InvalidArrowFile("--check-utf8 failed on column %s" % name)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        memory = memoryview(data)
+        for pos in range(start, stop, _UTF8_CHUNK_SIZE):
+            decoder.decode(memory[pos : min(stop, pos + _UTF8_CHUNK_SIZE)])
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise InvalidArrowFile("--check-utf8 failed on column %s" % name) from None
+
+
+def _check_float_array(name: str, array: pyarrow.Array) -> None:
+    values = _fixed_width_values(array, np.dtype(array.type.to_pandas_dtype()))
+    mask = _validity_mask(array)
+    if mask is not None:
+        values = values[mask]
+    if not np.isfinite(values).all():
+        raise InvalidArrowFile("--check-floats-all-finite failed on column %s" % name)
+
+
+def _check_dictionary(name: str, dictionary: pyarrow.Array) -> None:
+    if dictionary.null_count:
+        raise InvalidArrowFile(
+            "--check-dictionary-values-not-null failed on column %s" % name
+        )
+    _check_array(name, dictionary)
+    if len(set(dictionary.to_pylist())) != len(dictionary):
+        raise InvalidArrowFile(
+            "--check-dictionary-values-unique failed on column %s" % name
+        )
+
+
+def _count_dictionary_codes(name: str, array: pyarrow.DictionaryArray) -> np.ndarray:
+    """
+    Return how many times `array` uses each value of its dictionary.
+    """
+    indices = array.indices
+    codes = _fixed_width_values(indices, np.dtype(indices.type.to_pandas_dtype()))
+    mask = _validity_mask(indices)
+    if mask is not None:
+        codes = codes[mask]
+    if len(codes) and (codes.min() < 0 or codes.max() >= len(array.dictionary)):
+        raise InvalidArrowFile(
+            "--check-offsets-dont-overflow failed on column %s" % name
+        )
+    return np.bincount(codes.astype(np.int64), minlength=len(array.dictionary))
+
+
+def _check_dictionary_chunks(name: str, chunks: List[pyarrow.DictionaryArray]) -> None:
+    """
+    Check the record batches of one dictionary-encoded column.
+
+    Batches in an Arrow file share their column's dictionary, so each batch
+    may use only part of it. "All values used" applies to the whole column:
+    we sum value counts across consecutive chunks that share a dictionary,
+    and we check each shared dictionary once.
+    """
+    dictionary = None
+    counts = None
+
+    def check_all_used():
+        if counts is not None and (counts == 0).any():
+            raise InvalidArrowFile(
+                "--check-dictionary-values-all-used failed on column %s" % name
+            )
+
+    for chunk in chunks:
+        if dictionary is None or not chunk.dictionary.equals(dictionary):
+            check_all_used()
+            dictionary = chunk.dictionary
+            _check_dictionary(name, dictionary)
+            counts = np.zeros(len(dictionary), dtype=np.int64)
+        counts += _count_dictionary_codes(name, chunk)
+    check_all_used()
+
+
+def _check_array(name: str, array: pyarrow.Array) -> None:
+    data_type = array.type
+    if pyarrow.types.is_string(data_type):
+        _check_utf8_array(name, array)
+    elif pyarrow.types.is_floating(data_type):
+        _check_float_array(name, array)
+    elif pyarrow.types.is_dictionary(data_type):
+        _check_dictionary_chunks(name, [array])
+    # Other types: any bits are valid. validate_table_metadata() rejects
+    # types Workbench doesn't support.
+
+
+def _is_unchanged(column: pyarrow.ChunkedArray, original: pyarrow.ChunkedArray) -> bool:
+    """
+    Return True if `column` is byte-for-byte the same data as `original`.
+
+    This compares raw buffers (memcmp), which is far cheaper than validating.
+    """
+    if column.type != original.type or column.num_chunks != original.num_chunks:
+        return False
+
+    def same_buffers(a: pyarrow.Array, b: pyarrow.Array) -> bool:
+        if len(a) != len(b) or a.offset != b.offset or a.null_count != b.null_count:
+            return False
+        for buf_a, buf_b in zip(a.buffers(), b.buffers()):
+            if (buf_a is None) != (buf_b is None):
+                return False
+            if buf_a is not None and not buf_a.equals(buf_b):
+                return False
+        if pyarrow.types.is_dictionary(a.type):
+            return same_buffers(a.indices, b.indices) and same_buffers(
+                a.dictionary, b.dictionary
+            )
+        return True
+
+    return all(same_buffers(a, b) for a, b in zip(column.chunks, original.chunks))
+
+
+def _validate_column(
+    name: str, column: pyarrow.ChunkedArray, original: Optional[pyarrow.ChunkedArray]
+) -> None:
+    if original is not None and _is_unchanged(column, original):
+        return
+    try:
+        if pyarrow.types.is_dictionary(column.type):
+            _check_dictionary_chunks(name, column.chunks)
+        else:
+            for chunk in column.chunks:
+                _check_array(name, chunk)
+    except InvalidArrowFile:
+        raise
+    except (ValueError, TypeError, pyarrow.ArrowException) as err:
+        # Usually np.frombuffer(): a buffer is shorter than the array says
+        raise InvalidArrowFile("column %s is malformed: %s" % (name, err)) from None
+
+
+def validate_arrow_table(
+    table: pyarrow.Table,
+    *,
+    validated_input: Optional[pyarrow.Table] = None,
+    n_threads: int = 1,
+) -> None:
+    """
+    Run `validate_arrow_file()`'s checks on `table`, in this process.
+
+    Raise InvalidArrowFile (with the same messages as arrow-validate) if:
+
+    * A column name has invalid UTF-8, is too long or contains ASCII control
+      characters
+    * Text columns' offsets are invalid
+    * Some text data has invalid UTF-8
+    * A float is NaN or Infinity
+    * A dictionary column's dictionary contains nulls, duplicates or unused
+      values (all record batches combined), or its indices point outside it
+
+    Checks are vectorized (numpy and the UTF-8 codec), one column at a time.
+    With `n_threads > 1`, columns are checked in parallel threads.
+
+    `validated_input` is a table we've already validated (say, the input to
+    the module that wrote `table`). We don't re-check columns that are
+    byte-for-byte equal to the same-named column in `validated_input`: most
+    modules pass most of their input columns through unchanged.
+
+    SECURITY: this trusts pyarrow's IPC reader to have bounds-checked the
+    file's buffers. `validate_arrow_file()` doesn't; it's the safer choice.
+    """
+    try:
+        names = table.schema.names
+    except UnicodeDecodeError:
+        raise InvalidArrowFile("--check-utf8 failed on a column name") from None
+    for name in names:
+        if len(name.encode("utf-8")) > settings.MAX_BYTES_PER_COLUMN_NAME:
+            raise InvalidArrowFile(
+                "--check-column-name-max-bytes=%d failed on column %s"
+                % (settings.MAX_BYTES_PER_COLUMN_NAME, name)
+            )
+        if any(ord(c) < 0x20 or c == "\x7f" for c in name):
+            raise InvalidArrowFile(
+                "--check-column-name-control-characters failed on column %r" % name
+            )
+
+    if validated_input is None:
+        original_columns = {}
+    else:
+        original_columns = dict(
+            zip(validated_input.schema.names, validated_input.columns)
+        )
+    jobs = [
+        (name, column, original_columns.get(name))
+        for name, column in zip(names, table.columns)
+    ]
+    if n_threads > 1 and len(jobs) > 1:
+        with ThreadPoolExecutor(
+            max_workers=n_threads, thread_name_prefix="validate-arrow-"
+        ) as executor:
+            # list() raises the first column's error, in column order
+            list(executor.map(lambda job: _validate_column(*job), jobs))
+    else:
+        for job in jobs:
+            _validate_column(*job)
+
+
+def read_and_validate_arrow_file(
+    path: Path,
+    *,
+    validated_input: Optional[pyarrow.Table] = None,
+    n_threads: int = 1,
+) -> pyarrow.Table:
+    """
+    Read `path` and `validate_arrow_table()` it, without a subprocess.
+
+    Raise InvalidArrowFile if the file can't be read or doesn't validate.
+    """
+    try:
+        reader = pyarrow.ipc.open_file(path.as_posix())
+        table = reader.read_all()
+    except (OSError, pyarrow.ArrowException) as err:
+        raise InvalidArrowFile(str(err)) from None
+    validate_arrow_table(table, validated_input=validated_input, n_threads=n_threads)
+    return table
+
+
 def validate_table_metadata(
     table: Optional[pyarrow.Table], metadata: TableMetadata
 ) -> None:
@@ -140,13 +411,14 @@ def validate_table_metadata(
 
     * `table is not None` and `metadata.columns` is empty
     * `table is None` and `metadata.columns` is not empty
-    * table has more than one record batch
     * table and metadata have different numbers of columns or rows
     * table column names do not match metadata column names
     * table column names have duplicates
     * table column types are not compatible with metadata column types
       (e.g., Numbers column in metadata, Datetime table type)
 
+    The table may have any number of record batches.
+
     Be sure the Arrow file backing the table was validated with
     `validate_arrow_file()` first. Otherwise, you may experience a
     UnicodeError while printing error messages, or subsequent code may
@@ -165,8 +437,6 @@ def validate_table_metadata(
         for position, expected in enumerate(metadata.columns):
             actual = table.column(position)
             actual_name = actual._name
-            if position == 0 and actual.num_chunks > 1:
-                raise TableHasTooManyRecordBatches(actual.num_chunks)
             if expected.name != actual_name:
                 raise WrongColumnName(position, expected.name, actual_name)
             if actual_name in seen_column_names:
@@ -0,0 +1,179 @@
+from collections import OrderedDict
+import dis
+import functools
+import importlib.machinery
+import logging
+import marshal
+import re
+import threading
+from typing import Any, Callable, FrozenSet, Iterator, Optional, Tuple
+
+import pyspawner
+
+
+logger = logging.getLogger(__name__)
+
+
+MODULE_NAME_REGEX = re.compile(r"\A[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*\Z")
+
+UNSAFE_MODULE_NAME_PARTS = frozenset(
+    ["__main__", "conftest", "test", "testing", "tests"]
+)
+"""
+Module-name components we never preload, even within trusted packages.
+
+Importing a `__main__` module runs a program (`numpy.f2py.__main__` runs
+f2py). Test suites and private (`_`-prefixed) modules are written to be
+imported by their own package, not by us; importing them may have side
+effects. Normal library code never imports them, so we lose nothing.
+"""
+
+
+def _is_safe_module_name(name: str) -> bool:
+    if not MODULE_NAME_REGEX.match(name):
+        return False
+    return not any(
+        part in UNSAFE_MODULE_NAME_PARTS or part.startswith("_")
+        for part in name.split(".")
+    )
+
+
+def _iter_code_objects(code) -> Iterator[Any]:
+    yield code
+    for const in code.co_consts:
+        if hasattr(const, "co_code"):
+            yield from _iter_code_objects(const)
+
+
+def _iter_import_names(code) -> Iterator[str]:
+    """
+    Yield every module name `code` (or a nested function/class) may import.
+
+    `import a.b` yields "a.b". `from a import b` yields "a" and "a.b" -- we
+    can't know whether "b" is a submodule or an attribute, so we yield it and
+    let the caller check.
+    """
+    for code_object in _iter_code_objects(code):
+        module_name = None
+        for instruction in dis.get_instructions(code_object):
+            if instruction.opname == "IMPORT_NAME":
+                module_name = instruction.argval
+                yield module_name
+            elif instruction.opname == "IMPORT_FROM" and module_name:
+                yield module_name + "." + instruction.argval
+
+
+def _module_exists(name: str) -> bool:
+    """
+    Return True if `name` is an importable module on disk.
+
+    This does _not_ import anything: importing parent packages would load
+    them into our own process.
+    """
+    path = None
+    for part in name.split("."):
+        try:
+            spec = importlib.machinery.PathFinder.find_spec(part, path)
+        except (ImportError, ValueError):
+            return False
+        if spec is None:
+            return False
+        path = spec.submodule_search_locations
+    return True
+
+
+@functools.lru_cache(maxsize=500)
+def find_preloadable_imports(
+    marshalled_code_object: bytes,
+    trusted_packages: FrozenSet[str],
+    already_imported: FrozenSet[str],
+) -> Tuple[str, ...]:
+    """
+    List modules a module's code imports that a zygote could preload.
+
+    SECURITY: we never _execute_ the module's code outside the sandbox. We
+    only read the names it imports -- but those names are untrusted, and the
+    zygote imports whatever we return outside the sandbox. So we only return
+    public library modules within `trusted_packages` (the packages the kernel
+    preloads anyway): never `__main__` modules, test suites or private
+    `_`-prefixed modules. (See `UNSAFE_MODULE_NAME_PARTS`.)
+
+    The result is sorted, so two module versions with the same imports share a
+    zygote.
+    """
+    code = marshal.loads(marshalled_code_object)
+    names = set()
+    for name in _iter_import_names(code):
+        if (
+            name not in already_imported
+            and _is_safe_module_name(name)
+            and name.split(".")[0] in trusted_packages
+            and _module_exists(name)
+        ):
+            names.add(name)
+    return tuple(sorted(names))
+
+
+class ZygotePool:
+    """
+    Least-recently-used set of pyspawner "zygotes", keyed by extra imports.
+
+    Each zygote is a pyspawner.Client that preloads the kernel's imports plus
+    a few module-specific ones. Children forked from it skip those imports.
+
+    A zygote costs a whole Python process (~100MB of memory that isn't shared
+    with the kernel's main pyspawner), so we keep at most `max_zygotes`.
+    """
+
+    def __init__(
+        self,
+        max_zygotes: int,
+        create_client: Callable[[Tuple[str, ...]], pyspawner.Client],
+    ):
+        self.max_zygotes = max_zygotes
+        self._create_client = create_client
+        self._lock = threading.Lock()
+        self._clients = OrderedDict()  # imports => pyspawner.Client, LRU first
+
+    def get(self, imports: Tuple[str, ...]) -> Optional[pyspawner.Client]:
+        """
+        Return a zygote that preloads `imports`, creating it if needed.
+
+        Return None if zygotes are disabled. Raise OSError or EOFError if a
+        new zygote fails to start.
+        """
+        if self.max_zygotes <= 0:
+            return None
+
+        evicted = []
+        with self._lock:
+            try:
+                client = self._clients[imports]
+                self._clients.move_to_end(imports)
+            except KeyError:
+                logger.info("Starting zygote preloading %r", imports)
+                client = self._create_client(imports)
+                self._clients[imports] = client
+                while len(self._clients) > self.max_zygotes:
+                    evicted.append(self._clients.popitem(last=False)[1])
+
+        # Close outside our lock: close() waits for in-progress spawns
+        for old_client in evicted:
+            old_client.close()
+        return client
+
+    def discard(self, imports: Tuple[str, ...], client: pyspawner.Client) -> None:
+        """
+        Close and forget `client`, because it misbehaved.
+        """
+        with self._lock:
+            if self._clients.get(imports) is client:
+                del self._clients[imports]
+        client.close()
+
+    def close(self) -> None:
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            client.close()
@@ -40,6 +40,122 @@ When storing a new FetchResult, we delete old FetchResults that exceed this
 limit.
 """
 
+RENDERCACHE_LOCAL_CACHE_MAX_BYTES = int(
+    os.environ.get("CJW_RENDERCACHE_LOCAL_CACHE_MAX_BYTES", 2 * 1024 * 1024 * 1024)
+)
+"""
+How much local disk may each process use to cache render-cache Parquet files?
+
+The table viewer and the renderer read the same cached results over and over.
+Each process keeps the most-recently-used files on disk so it needn't
+re-download them from minio. Set to 0 to disable.
+"""
+
+RENDERCACHE_ARROW_CACHE_MAX_BYTES = int(
+    os.environ.get("CJW_RENDERCACHE_ARROW_CACHE_MAX_BYTES", 2 * 1024 * 1024 * 1024)
+)
+"""
+How much local disk may the renderer use to remember Arrow files it rendered?
+
+When the renderer resumes a workflow from a step it rendered recently, it
+copies that step's Arrow output from this cache instead of downloading and
+decoding Parquet. Set to 0 to disable.
+"""
+
+RENDERER_MAX_PARALLEL_TABS_PER_WORKFLOW = int(
+    os.environ.get("CJW_RENDERER_MAX_PARALLEL_TABS_PER_WORKFLOW", 1)
+)
+"""
+How many of a workflow's tabs may the renderer render at the same time?
+
+Tabs that don't depend on one another render concurrently, each in its own
+sandbox. 1 means, "render tabs one at a time". The renderer has
+CJW_N_EDITABLE_CHROOTS sandboxes; tabs beyond that wait for a free one.
+"""
+
+KERNEL_MAX_MODULE_ZYGOTES = int(os.environ.get("CJW_KERNEL_MAX_MODULE_ZYGOTES", 0))
+"""
+How many module-specific pyspawner processes may the kernel keep warm?
+
+Each one preloads the (trusted) library submodules a module imports, so that
+module's renders skip those imports. Each costs ~100MB of RAM. 0 disables.
+"""
+
+KERNEL_VALIDATE_ARROW_THREADS = int(
+    os.environ.get("CJW_KERNEL_VALIDATE_ARROW_THREADS", 0)
+)
+"""
+How should the kernel validate Arrow files that modules write?
+
+0 (default) runs `/usr/bin/arrow-validate` in a subprocess, which scans the
+whole file. N > 0 validates in the renderer process with N threads (one
+column per thread), skipping columns the module passed through unchanged.
+"""
+
+KERNEL_MIGRATE_PARAMS_MAX_MEMORY_BYTES = int(
+    os.environ.get("CJW_KERNEL_MIGRATE_PARAMS_MAX_MEMORY_BYTES", 0)
+)
+KERNEL_MIGRATE_PARAMS_MAX_CPU_SECONDS = int(
+    os.environ.get("CJW_KERNEL_MIGRATE_PARAMS_MAX_CPU_SECONDS", 0)
+)
+KERNEL_FETCH_MAX_MEMORY_BYTES = int(
+    os.environ.get("CJW_KERNEL_FETCH_MAX_MEMORY_BYTES", 0)
+)
+KERNEL_FETCH_MAX_CPU_SECONDS = int(
+    os.environ.get("CJW_KERNEL_FETCH_MAX_CPU_SECONDS", 0)
+)
+KERNEL_RENDER_MAX_MEMORY_BYTES = int(
+    os.environ.get("CJW_KERNEL_RENDER_MAX_MEMORY_BYTES", 0)
+)
+KERNEL_RENDER_MAX_CPU_SECONDS = int(
+    os.environ.get("CJW_KERNEL_RENDER_MAX_CPU_SECONDS", 0)
+)
+"""
+Per-child limits for each kind of module call. 0 (default) means unlimited.
+
+Memory is the child's heap (RLIMIT_DATA), including ~200MB it shares with the
+pyspawner that forked it. A module that exceeds it gets a "too big" error
+instead of getting the whole process OOM-killed. CPU seconds are total across
+threads, on top of the wall-clock timeout.
+"""
+
+RENDERCACHE_PARQUET_ROW_GROUP_SIZE = int(
+    os.environ.get("CJW_RENDERCACHE_PARQUET_ROW_GROUP_SIZE", 10_000)
+)
+"""
+How many rows go in each row group of a render-cache Parquet file?
+
+The table viewer reads a few hundred rows at a time, and it can only read
+whole row groups. Small row groups make scrolling through a million-row table
+cheap; large ones compress slightly better. Set to 0 to write one row group
+per table (or per 64M rows, pyarrow's maximum).
+"""
+
+STOREDOBJECTS_LOCAL_CACHE_MAX_BYTES = int(
+    os.environ.get("CJW_STOREDOBJECTS_LOCAL_CACHE_MAX_BYTES", 2 * 1024 * 1024 * 1024)
+)
+"""
+How much local disk may each process use to cache fetch results?
+
+Stored objects never change, and the renderer reads the same one on every
+render of a fetch-backed step. Each process keeps the most-recently-used
+files on disk so it needn't re-download them from minio. Set to 0 to disable.
+"""
+
+RENDERCACHE_CONTENT_ADDRESSED = bool(
+    int(os.environ.get("CJW_RENDERCACHE_CONTENT_ADDRESSED", 0))
+)
+"""
+Should the renderer share step outputs across workflows?
+
+When 1, the renderer stores each step's output under a hash of its module
+code, kernel code, params, input and fetch result (in the "content/" prefix of
+the cached-render-results bucket). Any step -- in any workflow -- with the
+same hash copies that output instead of rendering. Nothing deletes these
+files: configure the bucket to expire them. (After a deploy that changes
+kernel code, nothing reads the old ones.)
+"""
+
 # ----- App Boilerplate -----
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
@@ -0,0 +1,217 @@
+from collections import OrderedDict
+import contextlib
+import errno
+import logging
+import os
+from pathlib import Path
+import shutil
+import threading
+from typing import Optional
+import uuid
+from cjwkernel.util import create_tempdir
+
+
+logger = logging.getLogger(__name__)
+
+
+class LocalFileCache:
+    """
+    Byte-bounded, least-recently-used cache of immutable files on local disk.
+
+    Each entry maps a `key` (usually a minio key) to a file. Callers never see
+    the cache's own files: `get()` hard-links (or, across filesystems, copies)
+    the cached file to a path the caller owns. That means eviction can never
+    yank a file out from under a reader: the reader's hard link keeps the data
+    alive until the reader deletes it.
+
+    This is thread-safe. It is _not_ shared between processes: each process
+    has its own cache directory. The directory is created lazily in /var/tmp
+    (on disk, not tmpfs) and we leak it when the process exits. In
+    production, processes run in Docker containers, so leaked files won't
+    pile up.
+
+    Entries are only valid if the underlying data never changes for a given
+    key. When a key's data _does_ change, call `put()` again (to overwrite) or
+    `remove_by_prefix()` (to forget).
+
+    Pass `hardlink=False` if callers may modify files in place after `put()`
+    or `get()`. (For instance, the renderer truncates and rewrites its Arrow
+    files.) Then the cache will always copy.
+    """
+
+    def __init__(self, name: str, max_bytes: int, *, hardlink: bool = True):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.hardlink = hardlink
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key => (path, size), LRU first
+        self._n_bytes = 0
+        self._dir: Optional[Path] = None
+
+    @property
+    def n_bytes(self) -> int:
+        return self._n_bytes
+
+    def _ensure_dir(self) -> Path:
+        # call with self._lock held
+        if self._dir is None or not self._dir.exists():
+            self._dir = create_tempdir(prefix="localcache-%s-" % self.name)
+            # If the directory disappeared, so did its files
+            self._entries.clear()
+            self._n_bytes = 0
+        return self._dir
+
+    def _evict_until(self, max_bytes: int) -> None:
+        # call with self._lock held
+        while self._entries and self._n_bytes > max_bytes:
+            _, (path, size) = self._entries.popitem(last=False)
+            self._n_bytes -= size
+            with contextlib.suppress(FileNotFoundError):
+                path.unlink()
+
+    def _pop(self, key: str) -> None:
+        # call with self._lock held
+        try:
+            path, size = self._entries.pop(key)
+        except KeyError:
+            return
+        self._n_bytes -= size
+        with contextlib.suppress(FileNotFoundError):
+            path.unlink()
+
+    def get(self, key: str, path: Path) -> bool:
+        """
+        Overwrite `path` with the cached file for `key`, and return True.
+
+        Return False if `key` is not cached. (Leave `path` untouched.)
+
+        Unless `hardlink=False`, do not modify `path`'s contents afterwards: it
+        may share an inode with the cache. (Deleting or replacing it is fine.)
+        """
+        with self._lock:
+            try:
+                entry_path, _ = self._entries[key]
+            except KeyError:
+                return False
+            self._entries.move_to_end(key)
+            # Link _within_ our directory while holding the lock, so eviction
+            # can't delete entry_path between lookup and link. Linking is
+            # cheap; any copy happens outside the lock.
+            link_path = self._dir / ("get-" + uuid.uuid4().hex)
+            try:
+                os.link(entry_path, link_path)
+            except FileNotFoundError:
+                # Someone deleted our file from disk. Forget about it.
+                self._pop(key)
+                return False
+
+        try:
+            if self.hardlink:
+                _move_or_copy(link_path, path)
+            else:
+                shutil.copyfile(link_path, path)
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                link_path.unlink()
+        return True
+
+    def put(self, key: str, path: Path) -> None:
+        """
+        Store a copy of the file at `path` as the cached value for `key`.
+
+        Unless `hardlink=False`, do not modify `path`'s contents afterwards: it
+        may share an inode with the cache. (Deleting or replacing it is fine.)
+
+        Files larger than `max_bytes` are not cached.
+        """
+        size = path.stat().st_size
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            entry_path = self._ensure_dir() / uuid.uuid4().hex
+
+        try:
+            if self.hardlink:
+                _link_or_copy(path, entry_path)
+            else:
+                shutil.copyfile(path, entry_path)
+        except OSError:
+            logger.exception("Failed to cache %s in local %s cache", key, self.name)
+            with contextlib.suppress(FileNotFoundError):
+                entry_path.unlink()
+            return
+
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (entry_path, size)
+            self._n_bytes += size
+            self._evict_until(self.max_bytes)
+
+    def remove(self, key: str) -> None:
+        """
+        Forget `key`, if it is cached.
+        """
+        with self._lock:
+            self._pop(key)
+
+    def rename(self, old_key: str, new_key: str) -> None:
+        """
+        Make the file cached as `old_key` the cached value for `new_key`.
+
+        Do nothing if `old_key` is not cached.
+        """
+        with self._lock:
+            try:
+                entry = self._entries.pop(old_key)
+            except KeyError:
+                return
+            self._pop(new_key)
+            self._entries[new_key] = entry
+
+    def remove_by_prefix(
+        self, prefix: str, *, except_key: Optional[str] = None
+    ) -> None:
+        """
+        Forget all keys that start with `prefix` (except `except_key`).
+        """
+        with self._lock:
+            for key in [
+                k for k in self._entries if k.startswith(prefix) and k != except_key
+            ]:
+                self._pop(key)
+
+    def clear(self) -> None:
+        """
+        Forget all keys.
+        """
+        with self._lock:
+            self._evict_until(0)
+
+
+def _link_or_copy(src: Path, dest: Path) -> None:
+    """
+    Make `dest` (which must not exist) have the same contents as `src`.
+
+    Hard-link if possible; copy if `src` is on a different filesystem.
+    """
+    try:
+        os.link(src, dest)
+    except OSError as err:
+        if err.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+            raise
+        shutil.copyfile(src, dest)
+
+
+def _move_or_copy(src: Path, dest: Path) -> None:
+    """
+    Make `dest` (which may exist) have the same contents as `src`.
+
+    `src` may be deleted in the process.
+    """
+    try:
+        os.replace(src, dest)
+    except OSError as err:
+        if err.errno != errno.EXDEV:
+            raise
+        shutil.copyfile(src, dest)
@@ -1,6 +1,7 @@
 from contextlib import contextmanager
 from dataclasses import dataclass
 import errno
+import io
 import json
 import logging
 import pathlib
@@ -382,3 +383,89 @@ def download(bucket: str, key: str, path: pathlib.Path) -> None:
             raise FileNotFoundError(errno.ENOENT, f"No file at {bucket}/{key}")
         else:
             raise
+
+
+class RangedReader(io.RawIOBase):
+    """
+    Read-only, seekable file over an S3 object, using ranged GETs.
+
+    Each `read()` is an HTTP request, so callers should wrap this in an
+    `io.BufferedReader` (as `open_ranged()` does) or read in large chunks.
+
+    Raise FileNotFoundError on construction if the key is not on S3.
+    """
+
+    def __init__(self, bucket: str, key: str):
+        super().__init__()
+        self.bucket = bucket
+        self.key = key
+        try:
+            self.size = stat(bucket, key).size
+        except error.ClientError as err:
+            if err.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                raise FileNotFoundError(errno.ENOENT, f"No file at {bucket}/{key}")
+            else:
+                raise
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError("Invalid whence %r" % whence)
+        if position < 0:
+            raise ValueError("Negative seek position %d" % position)
+        self._position = position
+        return position
+
+    def readinto(self, b) -> int:
+        start = self._position
+        end = min(self.size, start + len(b))  # exclusive
+        if end <= start:
+            return 0
+        try:
+            response = get_object_with_data(
+                self.bucket, self.key, Range="bytes=%d-%d" % (start, end - 1)
+            )
+        except error.NoSuchKey:
+            # Someone deleted the file while we were reading it
+            raise FileNotFoundError(
+                errno.ENOENT, f"No file at {self.bucket}/{self.key}"
+            )
+        data = response["Body"]
+        n = len(data)
+        b[:n] = data
+        self._position += n
+        return n
+
+
+def open_ranged(bucket: str, key: str, buffer_size: int = 1024 * 1024):
+    """
+    Open an S3 object for reading, without downloading it.
+
+    Use this when you only need a few parts of a large file -- for instance,
+    a Parquet footer and a few of its column chunks. Reads are buffered:
+    each buffer fill is one ranged GET of (at least) `buffer_size` bytes.
+
+    Raise FileNotFoundError if the key is not on S3.
+
+    Usage:
+
+        with minio.open_ranged('bucket', 'key') as f:
+            f.seek(-8, io.SEEK_END)
+            f.read(8)  # last 8 bytes of the file
+    """
+    return io.BufferedReader(RangedReader(bucket, key), buffer_size=buffer_size)
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 from cjwkernel.types import RenderError, TableMetadata
 
 
@@ -27,3 +27,17 @@ class CachedRenderResult:
     errors: List[RenderError]
     json: Dict[str, Any]
     table_metadata: TableMetadata
+    fingerprint: Optional[str] = None
+    """
+    Hash of table, errors and json; `None` for results cached long ago.
+    """
+    column_stats: Optional[List[Dict[str, Any]]] = None
+    """
+    One dict per column (see `cjwstate.rendercache.stats`); `None` for results
+    cached long ago.
+    """
+    row_group_offsets: Optional[List[int]] = None
+    """
+    First row of each row group in the Parquet file; `None` for results cached
+    long ago.
+    """
@@ -1,10 +1,70 @@
-from django.db import models
-from django.db.models.signals import pre_delete
+from contextlib import contextmanager
+from functools import partial
+from typing import Iterable
+from django.db import connection, models, transaction
+from django.db.models.signals import post_delete, pre_delete
 from django.dispatch import receiver
 from django.utils import timezone
 from cjwstate import minio
 
 
+BlobLockKey = 3
+"""
+First half of the `pg_advisory_xact_lock()` key we use to lock a blob.
+
+(`cjworkbench.pg_render_locker` uses 1 and 2.)
+"""
+
+
+def blob_key(hash: str) -> str:
+    """
+    Content-addressed key for a file with SHA-256 hex digest `hash`.
+    """
+    return "sha256/%s" % hash
+
+
+def is_blob_key(key: str) -> bool:
+    return key.startswith("sha256/")
+
+
+def _blob_lock_id(key: str) -> int:
+    # Map the hash's first 32 bits to a signed int4
+    return int(key[len("sha256/") :][:8], 16) - 2**31
+
+
+@contextmanager
+def locked_blobs(keys: Iterable[str]):
+    """
+    Yield in a database transaction that holds a lock on each blob in `keys`.
+
+    Everybody who reads or changes a blob's refcount must hold its lock: it
+    makes "add a reference" and "delete the last reference, then delete the
+    file" atomic with respect to each other. Locks are released when the
+    (outermost) transaction ends.
+
+    We take the locks in sorted order, so two transactions that lock the same
+    blobs can't deadlock. For the same reason, a transaction that will lock
+    several blobs must lock them all up front, here, rather than one at a
+    time. (Locking a blob again, later in the transaction, is free.)
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            for lock_id in sorted(set(_blob_lock_id(key) for key in keys)):
+                cursor.execute(
+                    "SELECT pg_advisory_xact_lock(%s, %s)", [BlobLockKey, lock_id]
+                )
+        yield
+
+
+def locked_blob(key: str):
+    """
+    Yield in a database transaction that holds a lock on blob `key`.
+
+    See `locked_blobs()`.
+    """
+    return locked_blobs([key])
+
+
 # StoredObject is our persistence layer.
 # Allows WfModules to store keyed, versioned binary objects
 class StoredObject(models.Model):
@@ -14,8 +74,11 @@ class StoredObject(models.Model):
     Ideally, a module's fetch() would store whatever it wants. Currently, we
     only allow storing data frames.
 
-    StoredObject links to an S3 key in minio.StoredObjectsBucket. The key must
-    adhere to the format: "{workflow_id}/{wf_module_id}/{uuidv1()}"
+    StoredObject links to an S3 key in minio.StoredObjectsBucket. The key is
+    content-addressed: "sha256/{hash}" (see `blob_key()`). Many StoredObjects
+    -- in many workflows -- may share one file: the number of StoredObjects
+    with a given key is that file's refcount. Objects stored long ago have key
+    "{workflow_id}/{wf_module_id}/{uuidv1()}" and own their files.
     """
 
     class Meta:
@@ -28,28 +91,50 @@ class StoredObject(models.Model):
     )
 
     # identification for file backing store
-    key = models.CharField(max_length=255, null=False, blank=True, default="")
+    key = models.CharField(
+        max_length=255, null=False, blank=True, default="", db_index=True
+    )
     stored_at = models.DateTimeField(default=timezone.now)
 
-    # used only for stored tables
-    hash = models.CharField(max_length=32)
+    hash = models.CharField(max_length=64)
+    """
+    SHA-256 hex digest of the file (see `storedobjects.hash_file()`).
+
+    Objects stored long ago have "unhashed" (or another non-SHA-256 value).
+    """
     size = models.IntegerField(default=0)  # file size
 
     # keeping track of whether this version of the data has ever been loaded
     # and delivered to the frontend
     read = models.BooleanField(default=False)
 
-    # make a deep copy for another WfModule
     def duplicate(self, to_wf_module):
-        basename = self.key.split("/")[-1]
-        key = f"{to_wf_module.workflow_id}/{to_wf_module.id}/{basename}"
-        minio.copy(
-            minio.StoredObjectsBucket, key, f"{minio.StoredObjectsBucket}/{self.key}"
-        )
+        """
+        Make a StoredObject for another WfModule, with the same data.
+
+        For a content-addressed file, this adds a reference: it doesn't copy
+        data. Legacy files are copied.
+        """
+        if is_blob_key(self.key):
+            with locked_blob(self.key):
+                return to_wf_module.stored_objects.create(
+                    stored_at=self.stored_at,
+                    hash=self.hash,
+                    key=self.key,
+                    size=self.size,
+                )
+        else:
+            basename = self.key.split("/")[-1]
+            key = f"{to_wf_module.workflow_id}/{to_wf_module.id}/{basename}"
+            minio.copy(
+                minio.StoredObjectsBucket,
+                key,
+                f"{minio.StoredObjectsBucket}/{self.key}",
+            )
 
-        return to_wf_module.stored_objects.create(
-            stored_at=self.stored_at, hash=self.hash, key=key, size=self.size
-        )
+            return to_wf_module.stored_objects.create(
+                stored_at=self.stored_at, hash=self.hash, key=key, size=self.size
+            )
 
 
 @receiver(pre_delete, sender=StoredObject)
@@ -61,6 +146,45 @@ def _delete_from_s3_pre_delete(sender, instance, **kwargs):
     _gone_, completely, forever -- that's what "delete" means to the user. If
     deletion fails, we need the link to remain in our database -- that's how
     the user will know it isn't deleted.
+
+    Content-addressed files are shared, so `_release_blob_post_delete()`
+    handles them instead.
     """
-    if instance.key:
+    if instance.key and not is_blob_key(instance.key):
         minio.remove(minio.StoredObjectsBucket, instance.key)
+
+
+@receiver(post_delete, sender=StoredObject)
+def _release_blob_post_delete(sender, instance, **kwargs):
+    """
+    Delete a content-addressed file from S3 when nothing references it.
+
+    Why post-delete? Because when Django deletes several StoredObjects at once
+    (say, deleting a workflow), it sends all pre-delete signals first. Were we
+    to count references then, each object would see the others and nobody
+    would delete the file.
+
+    Why on commit? Because until the deleting transaction commits, it may
+    roll back -- and then the file would be referenced but gone. Also, were
+    we to lock here, a transaction deleting many objects would hold many blob
+    locks, taken in whatever order Django deletes; two such transactions
+    could deadlock.
+    """
+    if is_blob_key(instance.key):
+        transaction.on_commit(partial(_release_blob, instance.key, instance.hash))
+
+
+def _release_blob(key: str, hash: str) -> None:
+    """
+    Delete blob `key` if no StoredObject references it.
+
+    This runs in its own transaction and holds no other blob lock, so lock
+    order can't matter. Somebody may have added a reference since the
+    delete, so we re-count references under the lock.
+    """
+    from cjwstate.rendercache import delete_parsed_fetch_results
+
+    with locked_blob(key):
+        if not StoredObject.objects.filter(key=key).exists():
+            minio.remove(minio.StoredObjectsBucket, key)
+            delete_parsed_fetch_results(hash)
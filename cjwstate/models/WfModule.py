@@ -148,6 +148,40 @@ class WfModule(models.Model):
     cached_render_result_json = models.BinaryField(blank=True)
     cached_render_result_columns = ColumnsField(null=True, blank=True)
     cached_render_result_nrows = models.IntegerField(null=True, blank=True)
+    cached_render_result_fingerprint = models.CharField(
+        null=True, blank=True, max_length=40
+    )
+    """
+    Hash of the cached table, errors and json.
+
+    Two renders with the same fingerprint produced the same output.
+    """
+
+    cached_render_result_input_fingerprint = models.CharField(
+        null=True, blank=True, max_length=40
+    )
+    """
+    Hash of everything render() read to produce the cached result.
+
+    That's the input table's fingerprint, the module version, params, tab and
+    fetch result. `None` means we can't tell (for instance, because the step
+    has tab params); such a step must always re-render.
+    """
+
+    cached_render_result_column_stats = JSONField(null=True, blank=True)
+    """
+    Stats about each column of the cached table, in column order.
+
+    See `cjwstate.rendercache.stats`. `None` for results cached long ago.
+    """
+
+    cached_render_result_row_group_offsets = JSONField(null=True, blank=True)
+    """
+    Index of the first row of each row group in the cached Parquet file.
+
+    Readers use this to find which row groups hold the rows they want. `None`
+    for results cached long ago (or with no columns).
+    """
 
     # TODO once we auto-compute stale module outputs, nix is_busy -- it will
     # be implied by the fact that the cached output revision is wrong.
@@ -354,7 +388,17 @@ class WfModule(models.Model):
         if cached_result is not None and self.tab.name == to_tab.name:
             # assuming file-copy succeeds, copy cached results.
             new_step.cached_render_result_delta_id = new_step.last_relevant_delta_id
-            for attr in ("status", "errors", "json", "columns", "nrows"):
+            for attr in (
+                "status",
+                "errors",
+                "json",
+                "columns",
+                "nrows",
+                "fingerprint",
+                "input_fingerprint",
+                "column_stats",
+                "row_group_offsets",
+            ):
                 full_attr = f"cached_render_result_{attr}"
                 setattr(new_step, full_attr, getattr(self, full_attr))
 
@@ -510,6 +554,9 @@ class WfModule(models.Model):
             errors=errors,
             json=json_dict,
             table_metadata=TableMetadata(nrows, columns),
+            fingerprint=self.cached_render_result_fingerprint,
+            column_stats=self.cached_render_result_column_stats,
+            row_group_offsets=self.cached_render_result_row_group_offsets,
         )
 
     def delete(self, *args, **kwargs):
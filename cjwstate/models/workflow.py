@@ -3,11 +3,12 @@ from contextlib import contextmanager
 from dataclasses import dataclass
 from typing import Callable, Dict, List, Optional, Set, Tuple, FrozenSet
 from django.db import models, transaction
-from django.db.models import Q
+from django.db.models import F, Q
 from django.contrib.auth.models import User
 from django.http import HttpRequest
 from django.urls import reverse
 from django.utils import timezone
+from cjwkernel.errors import ModuleError
 from cjwstate import clientside, minio
 from cjwstate.modules.param_spec import ParamDType
 
@@ -460,12 +461,31 @@ class Workflow(models.Model):
 
             InitWorkflowCommand.create(wf)
 
-            tabs = list(self.live_tabs)
-            for tab in tabs:
-                tab.duplicate_into_new_workflow(wf)
+            from .StoredObject import locked_blobs
+
+            # Each step adds a reference to its stored object's blob. Lock all
+            # those blobs now, in sorted order: locking them one step at a
+            # time could deadlock with another duplication.
+            with locked_blobs(self._live_stored_object_blob_keys()):
+                tabs = list(self.live_tabs)
+                for tab in tabs:
+                    tab.duplicate_into_new_workflow(wf)
 
         return wf
 
+    def _live_stored_object_blob_keys(self) -> List[str]:
+        """
+        List blob keys of live steps' current stored objects.
+        """
+        from .StoredObject import StoredObject, is_blob_key
+        from .WfModule import WfModule
+
+        keys = StoredObject.objects.filter(
+            wf_module__in=WfModule.live_in_workflow(self),
+            stored_at=F("wf_module__stored_data_version"),
+        ).values_list("key", flat=True)
+        return [key for key in keys if is_blob_key(key)]
+
     def duplicate(self, owner: User) -> "Workflow":
         """
         Save and return a duplicate Workflow owned by `user`.
@@ -649,6 +669,7 @@ class DependencyGraph:
 
         tabs = []
         steps = {}
+        tab_param_steps = []  # (wf_module, module_zipfile, schema)
 
         for tab in workflow.live_tabs:
             tab_wf_module_ids = []
@@ -676,20 +697,33 @@ class DependencyGraph:
                     steps[wf_module.id] = cls.Step(set())
                     continue
 
-                from cjwstate.params import get_migrated_params
+                tab_param_steps.append((wf_module, module_zipfile, schema))
 
-                params = get_migrated_params(wf_module)
+            tabs.append(cls.Tab(tab.slug, tab_wf_module_ids))
 
-                # raises ValueError (and we don't handle that right now)
-                schema.validate(params)
-                tab_slugs = frozenset(
-                    v
-                    for dtype, v in schema.iter_dfs_dtype_values(params)
-                    if isinstance(dtype, ParamDType.Tab)
-                )
-                steps[wf_module.id] = cls.Step(tab_slugs)
+        from cjwstate.params import get_migrated_params_many
 
-            tabs.append(cls.Tab(tab.slug, tab_wf_module_ids))
+        # One kernel call per module, not one per step
+        migrated_params = get_migrated_params_many(
+            [
+                (wf_module, module_zipfile)
+                for wf_module, module_zipfile, _ in tab_param_steps
+            ]
+        )
+
+        for wf_module, module_zipfile, schema in tab_param_steps:
+            params = migrated_params[wf_module.id]
+            if isinstance(params, ModuleError):
+                raise params
+
+            # raises ValueError (and we don't handle that right now)
+            schema.validate(params)
+            tab_slugs = frozenset(
+                v
+                for dtype, v in schema.iter_dfs_dtype_values(params)
+                if isinstance(dtype, ParamDType.Tab)
+            )
+            steps[wf_module.id] = cls.Step(tab_slugs)
 
         return cls(tabs, steps)
 
@@ -1,5 +1,6 @@
 import cjwkernel.chroot
 import cjwkernel.kernel
+from django.conf import settings
 import cjwstate.modules.staticregistry
 
 kernel = None
@@ -19,5 +20,14 @@ def init_module_system():
     # Ignore spurious init() calls. They happen in unit-testing: each unit test
     # that relies on the module system needs to ensure it's initialized.
     if kernel is None:
-        kernel = cjwkernel.kernel.Kernel()
+        kernel = cjwkernel.kernel.Kernel(
+            max_module_zygotes=settings.KERNEL_MAX_MODULE_ZYGOTES,
+            validate_arrow_threads=settings.KERNEL_VALIDATE_ARROW_THREADS,
+            migrate_params_max_memory_bytes=settings.KERNEL_MIGRATE_PARAMS_MAX_MEMORY_BYTES,
+            migrate_params_max_cpu_seconds=settings.KERNEL_MIGRATE_PARAMS_MAX_CPU_SECONDS,
+            fetch_max_memory_bytes=settings.KERNEL_FETCH_MAX_MEMORY_BYTES,
+            fetch_max_cpu_seconds=settings.KERNEL_FETCH_MAX_CPU_SECONDS,
+            render_max_memory_bytes=settings.KERNEL_RENDER_MAX_MEMORY_BYTES,
+            render_max_cpu_seconds=settings.KERNEL_RENDER_MAX_CPU_SECONDS,
+        )
         cjwstate.modules.staticregistry._setup(kernel)
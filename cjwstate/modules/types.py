@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 from functools import lru_cache
+import hashlib
 import json
 import marshal
 from pathlib import Path
@@ -52,6 +53,7 @@ class ModuleSpec:
     help_url: str = ""
     param_schema: Optional[Dict[str, Any]] = None
     parameters_version: Optional[int] = None
+    parse_fetch_result_params: Optional[List[str]] = None
 
     def get_uses_data(self):
         if self.uses_data is None:
@@ -229,6 +231,29 @@ class ModuleZipfile:
         )
         return CompiledModule(self.module_id, marshal.dumps(code_object))
 
+    @lru_cache(1)
+    def get_content_hash(self) -> str:
+        """
+        Return a hex digest of every file in the zipfile.
+
+        Two ModuleZipfiles with the same content hash behave identically, even
+        if their versions differ. (Internal modules' zipfiles are rebuilt on
+        every deploy, so their timestamps differ; their contents don't.)
+
+        Raise `FileNotFoundError` or `BadZipFile` if `self.path` is not a valid
+        zipfile.
+        """
+        sha1 = hashlib.sha1()
+        with zipfile.ZipFile(self.path) as zf:  # raise FileNotFoundError, BadZipFile
+            for info in sorted(zf.infolist(), key=lambda info: info.filename):
+                if info.is_dir():
+                    continue
+                data = zf.read(info)  # raise BadZipFile
+                filename = info.filename.encode("utf-8")
+                sha1.update(b"%d:%s%d:" % (len(filename), filename, len(data)))
+                sha1.update(data)
+        return sha1.hexdigest()
+
     @lru_cache(1)
     def get_optional_html(self) -> Optional[str]:
         """
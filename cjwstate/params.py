@@ -1,6 +1,6 @@
 import logging
 import time
-from typing import Any, Dict
+from typing import Any, Dict, List, Tuple, Union
 from cjwkernel.errors import ModuleError
 from cjwstate.models import WfModule
 from cjwstate.models.module_registry import MODULE_REGISTRY
@@ -42,7 +42,73 @@ def get_migrated_params(
         # raise KeyError
         module_zipfile = MODULE_REGISTRY.latest(wf_module.module_id_name)
 
-    stale = (
+    if not _is_stale(wf_module, module_zipfile):
+        return wf_module.cached_migrated_params
+    else:
+        # raise ModuleError
+        params = invoke_migrate_params(module_zipfile, wf_module.params)
+        _save_migrated_params(wf_module, module_zipfile, params)
+        return params
+
+
+def get_migrated_params_many(
+    wf_modules: List[Tuple[WfModule, ModuleZipfile]]
+) -> Dict[int, Union[Dict[str, Any], ModuleError]]:
+    """
+    Like `get_migrated_params()`, for many WfModules at once.
+
+    Call this within a `Workflow.cooperative_lock()`.
+
+    Stale WfModules are grouped by module, and each group is migrated in a
+    single kernel call. Return `{wf_module.id: params_or_error}`: for each
+    WfModule whose migrate_params() raised, the value is the `ModuleError`
+    (already logged) that `get_migrated_params()` would raise.
+    """
+    result = {}
+    stale_groups = {}  # module_id_and_version => (module_zipfile, [wf_module])
+    for wf_module, module_zipfile in wf_modules:
+        if _is_stale(wf_module, module_zipfile):
+            key = module_zipfile.module_id_and_version
+            stale_groups.setdefault(key, (module_zipfile, []))[1].append(wf_module)
+        else:
+            result[wf_module.id] = wf_module.cached_migrated_params
+
+    for module_zipfile, group in stale_groups.values():
+        params_list = _invoke_migrate_params_bisecting(module_zipfile, group)
+        for wf_module, params in zip(group, params_list):
+            if not isinstance(params, ModuleError):
+                _save_migrated_params(wf_module, module_zipfile, params)
+            result[wf_module.id] = params
+
+    return result
+
+
+def _invoke_migrate_params_bisecting(
+    module_zipfile: ModuleZipfile, wf_modules: List[WfModule]
+) -> List[Union[Dict[str, Any], ModuleError]]:
+    """
+    Call `invoke_migrate_params_many()`; on failure, split and retry.
+
+    The child reports each params' error separately, so the whole call only
+    fails when the child itself dies (timeout, out of memory, crash). Then
+    we can't tell which params killed it, so we bisect: a single bad step
+    costs a few extra kernel calls, not one per step.
+    """
+    try:
+        return invoke_migrate_params_many(
+            module_zipfile, [wf_module.params for wf_module in wf_modules]
+        )
+    except ModuleError as err:
+        if len(wf_modules) == 1:
+            return [err]
+        mid = len(wf_modules) // 2
+        return _invoke_migrate_params_bisecting(
+            module_zipfile, wf_modules[:mid]
+        ) + _invoke_migrate_params_bisecting(module_zipfile, wf_modules[mid:])
+
+
+def _is_stale(wf_module: WfModule, module_zipfile: ModuleZipfile) -> bool:
+    return (
         module_zipfile.version == "develop"
         # works if cached version (and thus cached _result_) is None
         or (
@@ -51,27 +117,25 @@ def get_migrated_params(
         )
     )
 
-    if not stale:
-        return wf_module.cached_migrated_params
-    else:
-        # raise ModuleError
-        params = invoke_migrate_params(module_zipfile, wf_module.params)
-        wf_module.cached_migrated_params = params
-        wf_module.cached_migrated_params_module_version = (
-            module_zipfile.get_param_schema_version()
+
+def _save_migrated_params(
+    wf_module: WfModule, module_zipfile: ModuleZipfile, params: Dict[str, Any]
+) -> None:
+    wf_module.cached_migrated_params = params
+    wf_module.cached_migrated_params_module_version = (
+        module_zipfile.get_param_schema_version()
+    )
+    try:
+        wf_module.save(
+            update_fields=[
+                "cached_migrated_params",
+                "cached_migrated_params_module_version",
+            ]
         )
-        try:
-            wf_module.save(
-                update_fields=[
-                    "cached_migrated_params",
-                    "cached_migrated_params_module_version",
-                ]
-            )
-        except ValueError:
-            # WfModule was deleted, so we get:
-            # "ValueError: Cannot force an update in save() with no primary key."
-            pass
-        return params
+    except ValueError:
+        # WfModule was deleted, so we get:
+        # "ValueError: Cannot force an update in save() with no primary key."
+        pass
 
 
 def invoke_migrate_params(
@@ -109,3 +173,50 @@ def invoke_migrate_params(
             status,
             int((time2 - time1) * 1000),
         )
+
+
+def invoke_migrate_params_many(
+    module_zipfile: ModuleZipfile, raw_params_list: List[Dict[str, Any]]
+) -> List[Union[Dict[str, Any], ModuleError]]:
+    """
+    Call module `migrate_params()` on each params, in one kernel call.
+
+    Return one entry per params: its result, or the ModuleError it raised.
+
+    Raise ModuleError if the kernel call itself failed.
+
+    Log any ModuleError. Also log success.
+    """
+    time1 = time.time()
+    logger.info(
+        "%s:migrate_params() x%d begin", module_zipfile.path.name, len(raw_params_list)
+    )
+    status = "???"
+    try:
+        result = cjwstate.modules.kernel.migrate_params_many(
+            module_zipfile.compile_code_without_executing(), raw_params_list
+        )  # raise ModuleError
+        n_errors = 0
+        for params_or_error in result:
+            if isinstance(params_or_error, ModuleError):
+                n_errors += 1
+                logger.error(
+                    "Exception in %s:migrate_params(): %s",
+                    module_zipfile.path.name,
+                    str(params_or_error),
+                )
+        status = "ok" if n_errors == 0 else "%d errors" % n_errors
+        return result
+    except ModuleError as err:
+        logger.exception("Exception in %s:migrate_params()", module_zipfile.path.name)
+        status = type(err).__name__
+        raise
+    finally:
+        time2 = time.time()
+        logger.info(
+            "%s:migrate_params() x%d => %s in %dms",
+            module_zipfile.path.name,
+            len(raw_params_list),
+            status,
+            int((time2 - time1) * 1000),
+        )
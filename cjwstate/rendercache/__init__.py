@@ -1,19 +1,61 @@
 from cjwstate.models.CachedRenderResult import CachedRenderResult
+from .content import (
+    cache_content_render_result,
+    delete_parsed_fetch_results,
+    load_content_render_result,
+    parsed_fetch_result_content_key,
+)
+from .export import (
+    discard_export,
+    export_etag,
+    iter_export_bytes,
+    materialize_export,
+)
 from .io import (
     cache_render_result,
+    copy_stale_cached_render_result,
+    discard_prepared_render_result,
+    discard_restamped_cached_render_result,
     downloaded_parquet_file,
+    fingerprint_render_result,
     load_cached_render_result,
     open_cached_render_result,
+    prepare_render_result,
+    read_cached_render_result_column,
     read_cached_render_result_slice_as_text,
+    restamp_cached_render_result,
+    save_prepared_render_result,
+    save_restamped_cached_render_result,
+    upload_prepared_render_result,
     CorruptCacheError,
+    PreparedRenderResult,
 )
 
 __all__ = (
     "CachedRenderResult",
     "CorruptCacheError",
+    "PreparedRenderResult",
+    "cache_content_render_result",
     "cache_render_result",
+    "copy_stale_cached_render_result",
+    "delete_parsed_fetch_results",
+    "discard_export",
+    "discard_prepared_render_result",
+    "discard_restamped_cached_render_result",
     "downloaded_parquet_file",
+    "export_etag",
+    "fingerprint_render_result",
+    "iter_export_bytes",
     "load_cached_render_result",
+    "load_content_render_result",
+    "materialize_export",
     "open_cached_render_result",
+    "parsed_fetch_result_content_key",
+    "prepare_render_result",
+    "read_cached_render_result_column",
     "read_cached_render_result_slice_as_text",
+    "restamp_cached_render_result",
+    "save_prepared_render_result",
+    "save_restamped_cached_render_result",
+    "upload_prepared_render_result",
 )
@@ -0,0 +1,141 @@
+"""
+Render results shared by all workflows, keyed by what produced them.
+
+The rest of `cjwstate.rendercache` stores one result per WfModule, keyed by
+workflow/step/delta. That can't help when the _same_ computation happens in
+a different place: a duplicated workflow, hundreds of students running the
+same lesson, or an undo followed by a redo.
+
+This layer stores results by a `content_key`: a hash of module code, kernel
+code (see `renderer.execute.wf_module.kernel_version()`), params, input table
+and fetch result. Anybody whose render would have the same content key can
+copy the result instead of rendering.
+
+Each result is two files in `minio.CachedRenderResultsBucket`:
+
+    content/{content_key}.dat -- Parquet table (absent for zero-column tables)
+    content/{content_key}.json -- errors, json and column metadata
+
+We write the .json file last: if it exists, the result is complete.
+
+Nothing deletes these files. Configure an expiry rule on the "content/"
+prefix in production (S3 lifecycle or `mc ilm`). A deploy that changes kernel
+code changes every content key, so the old entries are never read again:
+the expiry rule is what cleans them up.
+
+The exception: parsed fetch results (see `parsed_fetch_result_content_key()`)
+live under "content/parsed/{stored_object_hash}/", and we delete them along
+with their stored object's file.
+"""
+import json
+import logging
+from pathlib import Path
+from typing import Optional
+import cjwparquet
+import pyarrow
+from cjwkernel.types import ArrowTable, RenderResult, TableMetadata
+from cjwkernel.util import json_encode, tempfile_context
+from cjwstate import minio
+from cjwstate.models.fields import (
+    _column_to_dict,
+    _dict_to_column,
+    _dict_to_render_error,
+    _render_error_to_dict,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+BUCKET = minio.CachedRenderResultsBucket
+
+
+def _parquet_key(content_key: str) -> str:
+    return "content/%s.dat" % content_key
+
+
+def _json_key(content_key: str) -> str:
+    return "content/%s.json" % content_key
+
+
+def parsed_fetch_result_content_key(stored_object_hash: str, parse_key: str) -> str:
+    """
+    Content key for the output of a render() that only parses a fetch result.
+
+    `stored_object_hash` is the SHA-256 of the fetch result's file.
+    `parse_key` hashes everything else the parse depends on (module code and
+    params).
+    """
+    return "parsed/%s/%s" % (stored_object_hash, parse_key)
+
+
+def delete_parsed_fetch_results(stored_object_hash: str) -> None:
+    """
+    Delete all cached parses of the file with SHA-256 `stored_object_hash`.
+    """
+    minio.remove_recursive(BUCKET, "content/parsed/%s/" % stored_object_hash)
+
+
+def cache_content_render_result(content_key: str, result: RenderResult) -> None:
+    """
+    Store `result` so anybody can load it by `content_key`.
+
+    This may be slow: it writes Parquet and uploads. Don't call it within a
+    database lock.
+    """
+    metadata = result.table.metadata
+    json_bytes = json_encode(
+        {
+            "errors": [_render_error_to_dict(error) for error in result.errors],
+            "json": result.json,
+            "columns": [_column_to_dict(column) for column in metadata.columns],
+            "nrows": metadata.n_rows,
+        }
+    ).encode("utf-8")
+
+    if metadata.columns:
+        with tempfile_context(prefix="rendercache-content-") as parquet_path:
+            cjwparquet.write(parquet_path, result.table.table)
+            minio.fput_file(BUCKET, _parquet_key(content_key), parquet_path)
+    minio.put_bytes(BUCKET, _json_key(content_key), json_bytes)
+
+
+def load_content_render_result(content_key: str, path: Path) -> Optional[RenderResult]:
+    """
+    Write a cached Arrow table to `path` and return the cached RenderResult.
+
+    Return `None` (and leave `path` alone) if there is no complete result for
+    `content_key`, or if the cached files are corrupt.
+    """
+    try:
+        json_bytes = minio.get_object_with_data(BUCKET, _json_key(content_key))["Body"]
+    except minio.error.NoSuchKey:
+        return None
+
+    try:
+        data = json.loads(json_bytes)
+        errors = [_dict_to_render_error(error) for error in data["errors"]]
+        columns = [_dict_to_column(column) for column in data["columns"]]
+        metadata = TableMetadata(data["nrows"], columns)
+        json_dict = data["json"]
+    except (ValueError, KeyError, TypeError):
+        logger.exception("Ignoring corrupt content-cache entry %s", content_key)
+        return None
+
+    if not columns:
+        return RenderResult(
+            ArrowTable.from_zero_column_metadata(metadata), errors, json_dict
+        )
+
+    try:
+        with minio.temporarily_download(
+            BUCKET, _parquet_key(content_key)
+        ) as parquet_path:
+            # raises ArrowIOError
+            cjwparquet.convert_parquet_file_to_arrow_file(parquet_path, path)
+    except (FileNotFoundError, pyarrow.ArrowIOError):
+        logger.exception("Ignoring corrupt content-cache entry %s", content_key)
+        return None
+
+    # We wrote the file ourselves, in cache_content_render_result()
+    return RenderResult(ArrowTable.from_trusted_file(path, metadata), errors, json_dict)
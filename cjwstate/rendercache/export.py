@@ -0,0 +1,132 @@
+"""
+Whole-table CSV and JSON exports, materialized once per cached render result.
+
+Public export URLs get polled (newsroom dashboards fetch them every minute).
+Converting Parquet to text on every hit is wasteful, so the first request for
+an export writes it to minio next to the Parquet file; later requests stream
+it straight from minio (with ranged GETs, so HTTP `Range` is cheap).
+
+Exports live under the step's `parquet_prefix()` and their keys include the
+delta ID. `cache_render_result()` deletes everything under that prefix, so a
+new render invalidates all exports of the old one.
+"""
+import gzip
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Iterator
+from cjwkernel.util import tempfile_context
+from cjwstate import minio
+from cjwstate.models import CachedRenderResult
+from .io import BUCKET, CorruptCacheError, downloaded_parquet_file, parquet_prefix
+
+
+FORMATS = ("csv", "json")
+
+
+def export_key(crr: CachedRenderResult, format: str, gzipped: bool) -> str:
+    """
+    Path to the exported file in `BUCKET`.
+    """
+    return "%sdelta-%d.%s%s" % (
+        parquet_prefix(crr.workflow_id, crr.wf_module_id),
+        crr.delta_id,
+        format,
+        ".gz" if gzipped else "",
+    )
+
+
+def export_etag(crr: CachedRenderResult, format: str, gzipped: bool) -> str:
+    """
+    Strong HTTP ETag (including quotes) for the exported file.
+
+    We compute this without touching minio, so clients with a fresh copy cost
+    us a database query and nothing more. When `crr` has a fingerprint (a hash
+    of its data), the ETag survives re-renders that produce the same table.
+    """
+    if crr.fingerprint:
+        version = crr.fingerprint
+    else:
+        version = "wfm%d-delta%d" % (crr.wf_module_id, crr.delta_id)
+    return '"%s-%s%s"' % (version, format, "-gzip" if gzipped else "")
+
+
+def _write_export(parquet_path: Path, format: str, gzipped: bool, path: Path) -> None:
+    with tempfile_context(prefix="rendercache-export-") as text_path:
+        with text_path.open("wb") as f:
+            try:
+                subprocess.run(
+                    ["/usr/bin/parquet-to-text-stream", str(parquet_path), format],
+                    stdout=f,
+                    stderr=subprocess.PIPE,
+                    check=True,
+                )
+            except subprocess.CalledProcessError:
+                raise CorruptCacheError
+        if gzipped:
+            # No filename, no mtime: the same table always gzips to the same
+            # bytes, so the ETag (derived from the table) stays honest.
+            with text_path.open("rb") as src, path.open("wb") as f:
+                with gzip.GzipFile(filename="", mode="wb", fileobj=f, mtime=0) as dest:
+                    shutil.copyfileobj(src, dest)
+        else:
+            text_path.rename(path)
+
+
+def materialize_export(crr: CachedRenderResult, format: str, gzipped: bool) -> int:
+    """
+    Make sure the export of `crr` is in minio; return its size in bytes.
+
+    The first call for a given `crr`, `format` and `gzipped` converts the
+    Parquet file. Subsequent calls just stat the exported file.
+
+    Raise CorruptCacheError if the cached Parquet file is missing or invalid.
+
+    Call this _outside_ of any lock: it can take as long as reading the whole
+    table. `crr` may become stale meanwhile, and a new render may delete the
+    step's cache before we upload. So afterwards, lock and check that `crr`
+    is still the step's cached result; if it isn't, call `discard_export()`.
+    """
+    assert format in FORMATS
+    key = export_key(crr, format, gzipped)
+    if minio.exists(BUCKET, key):
+        return minio.stat(BUCKET, key).size
+
+    with downloaded_parquet_file(crr) as parquet_path:
+        with tempfile_context(prefix="rendercache-export-") as path:
+            _write_export(parquet_path, format, gzipped, path)
+            minio.fput_file(BUCKET, key, path)
+            return path.stat().st_size
+
+
+def discard_export(crr: CachedRenderResult, format: str, gzipped: bool) -> None:
+    """
+    Delete an export of `crr`, because `crr` is no longer the cached result.
+    """
+    minio.remove(BUCKET, export_key(crr, format, gzipped))
+
+
+def iter_export_bytes(
+    crr: CachedRenderResult,
+    format: str,
+    gzipped: bool,
+    start: int,
+    stop: int,
+    chunk_size: int = 1024 * 1024,
+) -> Iterator[bytes]:
+    """
+    Yield bytes [start, stop) of a materialized export.
+
+    Call `materialize_export()` first. Raise FileNotFoundError if the export
+    has since been deleted.
+    """
+    key = export_key(crr, format, gzipped)
+    with minio.open_ranged(BUCKET, key, buffer_size=chunk_size) as f:
+        f.seek(start)
+        remaining = stop - start
+        while remaining > 0:
+            data = f.read(min(chunk_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
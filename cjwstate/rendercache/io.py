@@ -1,17 +1,49 @@
 import contextlib
+import hashlib
 from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
 from typing import ContextManager
 import cjwparquet
 import pyarrow
+import pyarrow.parquet
+from django.conf import settings
 from cjwkernel.types import ArrowTable, RenderResult, TableMetadata
-from cjwkernel.util import json_encode, tempfile_context
+from cjwkernel.util import create_tempfile, json_encode, tempfile_context
 from cjwstate import minio
+from cjwstate.localcache import LocalFileCache
 from cjwstate.models import WfModule, Workflow, CachedRenderResult
+from . import parquetslice
+from .stats import compute_column_stats
 
 
 BUCKET = minio.CachedRenderResultsBucket
 
 
+LOCAL_CACHE = LocalFileCache("rendercache", settings.RENDERCACHE_LOCAL_CACHE_MAX_BYTES)
+"""
+Parquet files we wrote or downloaded recently, keyed by minio key.
+
+Each key includes a delta ID, and we never write different data to the same
+key (except after a CorruptCacheError). So entries stay valid until we delete
+them.
+"""
+
+
+ARROW_CACHE = LocalFileCache(
+    "rendercache-arrow", settings.RENDERCACHE_ARROW_CACHE_MAX_BYTES, hardlink=False
+)
+"""
+Arrow files passed to `prepare_render_result()` recently, keyed like Parquet.
+
+Only the renderer caches render results, so only the renderer fills this
+cache. It lets back-to-back renders skip the Parquet download+decode of
+the step they resume from.
+
+The renderer overwrites its Arrow files in place, so this cache never
+hard-links: it always copies.
+"""
+
+
 WF_MODULE_FIELDS = [
     "cached_render_result_delta_id",
     "cached_render_result_errors",
@@ -19,6 +51,10 @@ WF_MODULE_FIELDS = [
     "cached_render_result_columns",
     "cached_render_result_status",
     "cached_render_result_nrows",
+    "cached_render_result_fingerprint",
+    "cached_render_result_input_fingerprint",
+    "cached_render_result_column_stats",
+    "cached_render_result_row_group_offsets",
 ]
 
 
@@ -49,12 +85,239 @@ def crr_parquet_key(crr: CachedRenderResult) -> str:
     return parquet_key(crr.workflow_id, crr.wf_module_id, crr.delta_id)
 
 
+def fingerprint_render_result(result: RenderResult) -> str:
+    """
+    Hash `result`'s table, errors and json.
+
+    Equal fingerprints mean equal results. (The converse isn't guaranteed: one
+    table can be written as several different Arrow files.)
+
+    This reads the whole Arrow file. That's cheap compared to rendering, and
+    very cheap compared to writing Parquet.
+    """
+    hasher = hashlib.sha1()
+    for part in (
+        json_encode(result.json).encode("utf-8"),
+        repr(result.errors).encode("utf-8"),
+        repr(result.table.metadata).encode("utf-8"),
+    ):
+        hasher.update(b"%d:" % len(part))
+        hasher.update(part)
+    if result.table.path is not None:
+        with result.table.path.open("rb") as f:
+            while True:
+                block = f.read(1024 * 1024)
+                if not block:
+                    break
+                hasher.update(block)
+    return hasher.hexdigest()
+
+
+def _write_parquet_for_random_access(path: Path, table: pyarrow.Table) -> List[int]:
+    """
+    Write `table` to `path` as Parquet with small row groups.
+
+    Return the index of the first row of each row group.
+
+    We write Parquet format 2.0, so timestamps keep nanosecond precision. Row
+    groups hold `settings.RENDERCACHE_PARQUET_ROW_GROUP_SIZE` rows, so readers
+    can seek to the rows they want without decoding the rest of the table.
+
+    We dictionary-encode only dictionary columns, so plain text columns read
+    back as plain text columns.
+    """
+    pyarrow.parquet.write_table(
+        table,
+        str(path),
+        version="2.0",
+        compression="SNAPPY",
+        row_group_size=(settings.RENDERCACHE_PARQUET_ROW_GROUP_SIZE or None),
+        use_dictionary=[
+            name.encode("utf-8")
+            for name, column in zip(table.column_names, table.columns)
+            if pyarrow.types.is_dictionary(column.type)
+        ],
+    )
+    metadata = pyarrow.parquet.read_metadata(str(path))
+    offsets = []
+    offset = 0
+    for i in range(metadata.num_row_groups):
+        offsets.append(offset)
+        offset += metadata.row_group(i).num_rows
+    return offsets
+
+
+class PreparedRenderResult(NamedTuple):
+    """
+    A render result, encoded and ready to be made the step's cached result.
+
+    `prepare_render_result()` computes this without touching the database,
+    so the slow parts of caching (Parquet encoding, column stats, upload)
+    can happen outside of any lock.
+    """
+
+    workflow_id: int
+    wf_module_id: int
+    delta_id: int
+    fields: Dict[str, Any]
+    """
+    `wf_module.cached_render_result_*` values, keyed by field name.
+    """
+
+    parquet_path: Optional[Path]
+    """
+    Local Parquet file, or `None` for a zero-column table.
+
+    The caller owns this file: `upload_prepared_render_result()` or
+    `discard_prepared_render_result()` deletes it.
+    """
+
+    @property
+    def key(self) -> str:
+        return parquet_key(self.workflow_id, self.wf_module_id, self.delta_id)
+
+
+def prepare_render_result(
+    workflow_id: int,
+    wf_module_id: int,
+    delta_id: int,
+    result: RenderResult,
+    *,
+    input_fingerprint: Optional[str] = None,
+) -> PreparedRenderResult:
+    """
+    Encode `result` as Parquet and compute the fields we'll store in the DB.
+
+    This reads `result`'s Arrow file; once it returns, the caller may modify
+    or delete that file. (We copy it into `ARROW_CACHE`.)
+
+    The caller must pass the return value to
+    `discard_prepared_render_result()` if it doesn't end up calling
+    `upload_prepared_render_result()` and `save_prepared_render_result()`.
+    """
+    assert result is not None
+
+    if not result.table.metadata.columns:
+        if result.errors:
+            status = "error"
+        else:
+            status = "unreachable"
+    else:
+        status = "ok"
+
+    fields = {
+        "cached_render_result_delta_id": delta_id,
+        "cached_render_result_errors": result.errors,
+        "cached_render_result_status": status,
+        "cached_render_result_json": json_encode(result.json).encode("utf-8"),
+        "cached_render_result_columns": result.table.metadata.columns,
+        "cached_render_result_nrows": result.table.metadata.n_rows,
+        "cached_render_result_fingerprint": fingerprint_render_result(result),
+        "cached_render_result_input_fingerprint": input_fingerprint,
+        "cached_render_result_column_stats": compute_column_stats(result.table),
+        "cached_render_result_row_group_offsets": None,
+    }
+
+    if not result.table.metadata.columns:  # only write non-zero-column tables
+        return PreparedRenderResult(workflow_id, wf_module_id, delta_id, fields, None)
+
+    parquet_path = create_tempfile(prefix="rendercache-prepare-")
+    try:
+        # Write locally first: we store the row-group index in the DB.
+        fields[
+            "cached_render_result_row_group_offsets"
+        ] = _write_parquet_for_random_access(parquet_path, result.table.table)
+    except BaseException:
+        parquet_path.unlink()
+        raise
+    prepared = PreparedRenderResult(
+        workflow_id, wf_module_id, delta_id, fields, parquet_path
+    )
+    ARROW_CACHE.put(prepared.key, result.table.path)
+    return prepared
+
+
+def upload_prepared_render_result(prepared: PreparedRenderResult) -> None:
+    """
+    Upload `prepared`'s Parquet file to minio and delete it locally.
+
+    Call this _outside_ of any lock: it can take a while. The uploaded file
+    isn't anybody's cached result until `save_prepared_render_result()`.
+    """
+    if prepared.parquet_path is None:
+        return
+
+    try:
+        minio.fput_file(BUCKET, prepared.key, prepared.parquet_path)
+        LOCAL_CACHE.put(prepared.key, prepared.parquet_path)
+    finally:
+        with contextlib.suppress(FileNotFoundError):
+            prepared.parquet_path.unlink()
+
+
+def save_prepared_render_result(
+    workflow: Workflow, wf_module: WfModule, prepared: PreparedRenderResult
+) -> None:
+    """
+    Make an uploaded `prepared` result `wf_module`'s cached render result.
+
+    This writes to the database and deletes the step's other cached files.
+    It never uploads or encodes, so it's quick.
+
+    Raise AssertionError if `prepared.delta_id` is not what we expect.
+
+    Since this alters data, be sure to call it within a lock:
+
+        with workflow.cooperative_lock():
+            wf_module.refresh_from_db()  # may change delta_id
+            save_prepared_render_result(workflow, wf_module, prepared)
+    """
+    assert prepared.delta_id == wf_module.last_relevant_delta_id
+    assert prepared.workflow_id == workflow.id
+    assert prepared.wf_module_id == wf_module.id
+
+    for name, value in prepared.fields.items():
+        setattr(wf_module, name, value)
+    wf_module.save(update_fields=WF_MODULE_FIELDS)
+    _delete_parquet_files_for_wf_module_except(
+        workflow.id,
+        wf_module.id,
+        None if prepared.parquet_path is None else prepared.key,
+    )
+
+
+def discard_prepared_render_result(prepared: PreparedRenderResult) -> None:
+    """
+    Delete everything `prepared` wrote: it won't become a cached result.
+
+    Only call this if `save_prepared_render_result()` did not succeed: it
+    deletes the uploaded file.
+    """
+    if prepared.parquet_path is None:
+        return
+
+    with contextlib.suppress(FileNotFoundError):
+        prepared.parquet_path.unlink()
+    LOCAL_CACHE.remove(prepared.key)
+    ARROW_CACHE.remove(prepared.key)
+    minio.remove(BUCKET, prepared.key)
+
+
 def cache_render_result(
-    workflow: Workflow, wf_module: WfModule, delta_id: int, result: RenderResult
+    workflow: Workflow,
+    wf_module: WfModule,
+    delta_id: int,
+    result: RenderResult,
+    *,
+    input_fingerprint: Optional[str] = None,
 ) -> None:
     """
     Save `result` for later viewing.
 
+    `input_fingerprint` describes what produced `result`. If a later render
+    has the same input fingerprint, `restamp_cached_render_result()` can
+    replace it.
+
     Raise AssertionError if `delta_id` is not what we expect.
 
     Since this alters data, be sure to call it within a lock:
@@ -62,38 +325,122 @@ def cache_render_result(
         with workflow.cooperative_lock():
             wf_module.refresh_from_db()  # may change delta_id
             cache_render_result(workflow, wf_module, delta_id, result)
+
+    This encodes and uploads while holding that lock. The renderer holds the
+    lock for less time: it calls `prepare_render_result()` and
+    `upload_prepared_render_result()` first, then locks and calls
+    `save_prepared_render_result()`.
     """
     assert delta_id == wf_module.last_relevant_delta_id
-    assert result is not None
 
-    json_bytes = json_encode(result.json).encode("utf-8")
-    if not result.table.metadata.columns:
-        if result.errors:
-            status = "error"
-        else:
-            status = "unreachable"
-    else:
-        status = "ok"
+    prepared = prepare_render_result(
+        workflow.id,
+        wf_module.id,
+        delta_id,
+        result,
+        input_fingerprint=input_fingerprint,
+    )
+    try:
+        upload_prepared_render_result(prepared)
+        save_prepared_render_result(workflow, wf_module, prepared)
+    except BaseException:
+        discard_prepared_render_result(prepared)
+        raise
+
+
+def copy_stale_cached_render_result(crr: CachedRenderResult, delta_id: int) -> None:
+    """
+    Copy `crr`'s Parquet file to where `delta_id`'s result belongs.
+
+    Call this _outside_ of any lock: it is a minio round-trip. The copy isn't
+    anybody's cached result until `save_restamped_cached_render_result()`.
+    If the caller doesn't end up calling that, it must call
+    `discard_restamped_cached_render_result()`.
+
+    Raise CorruptCacheError if the Parquet file is missing.
+    """
+    if not crr.table_metadata.columns:
+        return  # zero-column tables have no Parquet file
+
+    old_key = crr_parquet_key(crr)
+    new_key = parquet_key(crr.workflow_id, crr.wf_module_id, delta_id)
+    try:
+        minio.copy(BUCKET, new_key, "%s/%s" % (BUCKET, old_key))
+    except minio.error.NoSuchKey:
+        raise CorruptCacheError
+
+
+def save_restamped_cached_render_result(
+    workflow: Workflow, wf_module: WfModule, crr: CachedRenderResult, delta_id: int
+) -> None:
+    """
+    Make `crr`'s copy (from `copy_stale_cached_render_result()`) the result
+    for `delta_id`.
+
+    This writes one database field and deletes the step's other files (`crr`'s
+    Parquet file and its exports), so it's quick.
+
+    Raise AssertionError if `delta_id` or `crr` are not what we expect.
+
+    Since this alters data, be sure to call it within a lock.
+    """
+    assert delta_id == wf_module.last_relevant_delta_id
+    assert crr.workflow_id == workflow.id
+    assert crr.wf_module_id == wf_module.id
+    assert crr.delta_id == wf_module.cached_render_result_delta_id
 
     wf_module.cached_render_result_delta_id = delta_id
-    wf_module.cached_render_result_errors = result.errors
-    wf_module.cached_render_result_status = status
-    wf_module.cached_render_result_json = json_bytes
-    wf_module.cached_render_result_columns = result.table.metadata.columns
-    wf_module.cached_render_result_nrows = result.table.metadata.n_rows
-
-    # Now we get to the part where things can end up inconsistent. Try to
-    # err on the side of not-caching when that happens.
-    delete_parquet_files_for_wf_module(
-        workflow.id, wf_module.id
-    )  # makes old cache inconsistent
-    wf_module.save(update_fields=WF_MODULE_FIELDS)  # makes new cache inconsistent
-    if result.table.metadata.columns:  # only write non-zero-column tables
-        with tempfile_context() as parquet_path:
-            cjwparquet.write(parquet_path, result.table.table)
-            minio.fput_file(
-                BUCKET, parquet_key(workflow.id, wf_module.id, delta_id), parquet_path
-            )  # makes new cache consistent
+    wf_module.save(update_fields=["cached_render_result_delta_id"])
+
+    if crr.table_metadata.columns:
+        old_key = crr_parquet_key(crr)
+        new_key = parquet_key(workflow.id, wf_module.id, delta_id)
+        LOCAL_CACHE.rename(old_key, new_key)
+        ARROW_CACHE.rename(old_key, new_key)
+    else:
+        new_key = None
+    _delete_parquet_files_for_wf_module_except(workflow.id, wf_module.id, new_key)
+
+
+def discard_restamped_cached_render_result(
+    crr: CachedRenderResult, delta_id: int
+) -> None:
+    """
+    Delete the copy `copy_stale_cached_render_result()` made.
+
+    Only call this if `save_restamped_cached_render_result()` did not happen.
+    """
+    if crr.table_metadata.columns:
+        minio.remove(BUCKET, parquet_key(crr.workflow_id, crr.wf_module_id, delta_id))
+
+
+def restamp_cached_render_result(
+    workflow: Workflow, wf_module: WfModule, delta_id: int
+) -> None:
+    """
+    Make `wf_module`'s stale cached result the result for `delta_id`.
+
+    Call this instead of `cache_render_result()` when re-rendering would be
+    pointless: the step's input fingerprint hasn't changed. This copies the
+    Parquet file within minio; it doesn't download, encode or upload data.
+
+    Raise CorruptCacheError if the Parquet file is missing.
+
+    Since this alters data, be sure to call it within a lock, as with
+    `cache_render_result()`. The renderer holds the lock for less time: it
+    calls `copy_stale_cached_render_result()` first, then locks and calls
+    `save_restamped_cached_render_result()`.
+    """
+    assert delta_id == wf_module.last_relevant_delta_id
+    crr = wf_module.get_stale_cached_render_result()
+    assert crr is not None
+
+    copy_stale_cached_render_result(crr, delta_id)  # raise CorruptCacheError
+    try:
+        save_restamped_cached_render_result(workflow, wf_module, crr, delta_id)
+    except BaseException:
+        discard_restamped_cached_render_result(crr, delta_id)
+        raise
 
 
 @contextlib.contextmanager
@@ -104,6 +451,9 @@ def downloaded_parquet_file(crr: CachedRenderResult, dir=None) -> ContextManager
     This is cheaper than open_cached_render_result() because it does not parse
     the file. Use this function when you suspect you won't need the table data.
 
+    If this process wrote or read the file recently, we copy it from
+    `LOCAL_CACHE` instead of downloading it.
+
     Raise CorruptCacheError if the cached data is missing.
 
     Usage:
@@ -114,13 +464,14 @@ def downloaded_parquet_file(crr: CachedRenderResult, dir=None) -> ContextManager
         except rendercache.CorruptCacheError:
             # file does not exist....
     """
-    with contextlib.ExitStack() as ctx:
-        try:
-            path = ctx.enter_context(
-                minio.temporarily_download(BUCKET, crr_parquet_key(crr), dir=dir)
-            )
-        except FileNotFoundError:
-            raise CorruptCacheError
+    key = crr_parquet_key(crr)
+    with tempfile_context(prefix="rendercache-download-", dir=dir) as path:
+        if not LOCAL_CACHE.get(key, path):
+            try:
+                minio.download(BUCKET, key, path)
+            except FileNotFoundError:
+                raise CorruptCacheError
+            LOCAL_CACHE.put(key, path)
 
         yield path
 
@@ -141,6 +492,9 @@ def load_cached_render_result(crr: CachedRenderResult, path: Path) -> RenderResu
     The returned RenderResult is backed by an mmapped file on disk -- the one
     supplied as `path`. It doesn't require much physical RAM: the Linux kernel
     may page out data we aren't using.
+
+    If this process cached the result recently, we copy the Arrow file from
+    `ARROW_CACHE` instead of downloading and converting Parquet.
     """
     if not crr.table_metadata.columns:
         # Zero-column tables aren't written to cache
@@ -152,12 +506,19 @@ def load_cached_render_result(crr: CachedRenderResult, path: Path) -> RenderResu
             crr.json,
         )
 
+    if ARROW_CACHE.get(crr_parquet_key(crr), path):
+        # We wrote this file ourselves, in cache_render_result()
+        arrow_table = ArrowTable.from_trusted_file(path, crr.table_metadata)
+        return RenderResult(arrow_table, crr.errors, crr.json)
+
     # raises CorruptCacheError
     with downloaded_parquet_file(crr) as parquet_path:
         try:
             # raises ArrowIOError
             cjwparquet.convert_parquet_file_to_arrow_file(parquet_path, path)
         except pyarrow.ArrowIOError as err:
+            # Don't keep serving the corrupt file from our local cache
+            LOCAL_CACHE.remove(crr_parquet_key(crr))
             raise CorruptCacheError from err
     # TODO handle validation errors => CorruptCacheError
     arrow_table = ArrowTable.from_trusted_file(path, crr.table_metadata)
@@ -199,11 +560,65 @@ def open_cached_render_result(crr: CachedRenderResult) -> ContextManager[RenderR
         yield result
 
 
+@contextlib.contextmanager
+def _open_parquet_file(
+    crr: CachedRenderResult, read_dictionary: Optional[List[str]] = None
+) -> ContextManager[pyarrow.parquet.ParquetFile]:
+    """
+    Open the cached Parquet file for reading, without downloading it all.
+
+    If this process wrote or read the file recently, we read it from
+    `LOCAL_CACHE`. Otherwise, we read it from minio with ranged GETs: the
+    caller pays only for the footer and the column chunks it reads.
+
+    `read_dictionary` names columns to read dictionary-encoded.
+
+    Raise FileNotFoundError if the file is missing from minio.
+    """
+    key = crr_parquet_key(crr)
+    with tempfile_context(prefix="rendercache-read-") as path:
+        if LOCAL_CACHE.get(key, path):
+            yield pyarrow.parquet.ParquetFile(
+                str(path), read_dictionary=read_dictionary
+            )
+        else:
+            with minio.open_ranged(BUCKET, key) as f:
+                yield pyarrow.parquet.ParquetFile(f, read_dictionary=read_dictionary)
+
+
+def read_cached_render_result_column(
+    crr: CachedRenderResult, column_name: str
+) -> pyarrow.ChunkedArray:
+    """
+    Read a single column of the cached Parquet file into memory.
+
+    This is much cheaper than `open_cached_render_result()` on a wide table:
+    Parquet is columnar, so we only fetch and decode the one column we need.
+    Text columns are read dictionary-encoded.
+
+    Raise CorruptCacheError if the cached data is missing or corrupt, or if
+    `column_name` is not in it.
+    """
+    if column_name not in (c.name for c in crr.table_metadata.columns):
+        raise CorruptCacheError
+
+    try:
+        with _open_parquet_file(crr, read_dictionary=[column_name]) as parquet_file:
+            table = parquet_file.read(columns=[column_name], use_threads=False)
+    except (pyarrow.ArrowException, OSError, KeyError):
+        # Parquet file is missing or corrupt, or it's missing `column_name`
+        LOCAL_CACHE.remove(crr_parquet_key(crr))
+        raise CorruptCacheError
+    if table.num_columns != 1:
+        raise CorruptCacheError
+    return table.column(0)
+
+
 def read_cached_render_result_slice_as_text(
     crr: CachedRenderResult, format: str, only_columns: range, only_rows: range
 ) -> str:
     """
-    Call `parquet-to-text-stream` and return its output.
+    Format a slice of the cached table as `format` (`csv` or `json`) text.
 
     Ignore out-of-range rows and columns.
 
@@ -219,9 +634,9 @@ def read_cached_render_result_slice_as_text(
     To limit the amount of text stored in RAM, use relatively small ranges for
     `only_columns` and `only_rows`.
 
-    This uses `parquet-to-text-stream` with `--row-range` and `--column-range`.
-    Read `parquet-to-text-stream` documentation to see how nulls and floats are
-    handled in your chosen format (`csv` or `json`). (In a nutshell: it's
+    This runs in-process and reads only the Parquet row groups (and column
+    chunks) that overlap the slice, with ranged GETs. See `parquetslice` for
+    how nulls, floats and timestamps are formatted. (In a nutshell: it's
     mostly non-lossy, though CSV can't represent `null`.)
     """
     if not crr.table_metadata.columns:
@@ -229,14 +644,17 @@ def read_cached_render_result_slice_as_text(
         return {}
 
     try:
-        with downloaded_parquet_file(crr) as parquet_path:
-            return cjwparquet.read_slice_as_text(
-                parquet_path,
+        with _open_parquet_file(crr) as parquet_file:
+            return parquetslice.read_slice_as_text(
+                parquet_file,
                 format=format,
                 only_columns=only_columns,
                 only_rows=only_rows,
+                row_group_offsets=crr.row_group_offsets,
             )
-    except (pyarrow.ArrowIOError, FileNotFoundError):  # FIXME unit-test
+    except (pyarrow.ArrowException, OSError):
+        # OSError includes FileNotFoundError
+        LOCAL_CACHE.remove(crr_parquet_key(crr))
         raise CorruptCacheError
 
 
@@ -249,8 +667,33 @@ def delete_parquet_files_for_wf_module(workflow_id: int, wf_module_id: int) -> N
 
     This deletes from minio but not from the database. Beware -- this can leave
     the database in an inconsistent state.
+
+    This also deletes from this process's `LOCAL_CACHE` and `ARROW_CACHE`.
+    (Other processes' caches may keep stale entries; but those are keyed by
+    delta ID, so nobody will ask for them.)
     """
-    minio.remove_recursive(BUCKET, parquet_prefix(workflow_id, wf_module_id))
+    prefix = parquet_prefix(workflow_id, wf_module_id)
+    LOCAL_CACHE.remove_by_prefix(prefix)
+    ARROW_CACHE.remove_by_prefix(prefix)
+    minio.remove_recursive(BUCKET, prefix)
+
+
+def _delete_parquet_files_for_wf_module_except(
+    workflow_id: int, wf_module_id: int, keep_key: Optional[str]
+) -> None:
+    """
+    Like `delete_parquet_files_for_wf_module()`, but keep `keep_key`.
+    """
+    if keep_key is None:
+        delete_parquet_files_for_wf_module(workflow_id, wf_module_id)
+        return
+
+    prefix = parquet_prefix(workflow_id, wf_module_id)
+    LOCAL_CACHE.remove_by_prefix(prefix, except_key=keep_key)
+    ARROW_CACHE.remove_by_prefix(prefix, except_key=keep_key)
+    for key in minio.list_file_keys(BUCKET, prefix):
+        if key != keep_key:
+            minio.remove(BUCKET, key)
 
 
 def clear_cached_render_result_for_wf_module(wf_module: WfModule) -> None:
@@ -268,5 +711,9 @@ def clear_cached_render_result_for_wf_module(wf_module: WfModule) -> None:
     wf_module.cached_render_result_status = None
     wf_module.cached_render_result_columns = None
     wf_module.cached_render_result_nrows = None
+    wf_module.cached_render_result_fingerprint = None
+    wf_module.cached_render_result_input_fingerprint = None
+    wf_module.cached_render_result_column_stats = None
+    wf_module.cached_render_result_row_group_offsets = None
 
     wf_module.save(update_fields=WF_MODULE_FIELDS)
@@ -0,0 +1,194 @@
+"""
+Read a small slice of a Parquet file and format it as CSV or JSON text.
+
+This is what the table viewer calls for every scroll, so it must be cheap
+even when the cached table is huge. We use the Parquet footer as an index:
+each row group's `num_rows` tells us which row groups cover the rows we want,
+and Parquet is columnar, so we only read the column chunks we want from those
+row groups. On a file-like object backed by ranged GETs (see
+`minio.open_ranged()`), we never download the rest of the file.
+
+Output format (compatible with `parquet-to-text-stream`, which we used to
+call):
+
+* JSON: an Array of Objects, one per row, keyed by column name.
+* CSV: a header row, then one line per row. CSV can't represent `null`: it
+  becomes the empty string.
+* Timestamps are ISO8601 in UTC, with "Z" suffix and as many groups of three
+  fractional-second digits as needed (none, ms, us or ns).
+* Floats use their shortest round-tripping representation, without a ".0"
+  suffix. NaN and infinity become `null`.
+"""
+import csv
+import datetime
+import io
+import bisect
+import json
+import math
+from typing import Any, Callable, List, Optional, Tuple
+import pyarrow
+import pyarrow.parquet
+
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def _format_timestamp_ns(value: int) -> str:
+    seconds, ns = divmod(value, 1_000_000_000)
+    text = (_EPOCH + datetime.timedelta(seconds=seconds)).strftime("%Y-%m-%dT%H:%M:%S")
+    if ns:
+        fraction = "%09d" % ns
+        while fraction.endswith("000"):
+            fraction = fraction[:-3]
+        text += "." + fraction
+    return text + "Z"
+
+
+def _format_float(value: float) -> str:
+    text = repr(value)
+    if text.endswith(".0"):
+        text = text[:-2]
+    return text
+
+
+def _column_values(chunked_array: pyarrow.ChunkedArray) -> List[Any]:
+    """
+    Convert to a Python list of str/int/float/None.
+
+    Timestamps become ISO8601 str; non-finite floats become None.
+    """
+    data_type = chunked_array.type
+    if pyarrow.types.is_timestamp(data_type):
+        # Cast to int64 before to_pylist(): Python datetime has no nanoseconds
+        factor = {"s": 1_000_000_000, "ms": 1_000_000, "us": 1_000, "ns": 1}[
+            data_type.unit
+        ]
+        return [
+            None if v is None else _format_timestamp_ns(v * factor)
+            for chunk in chunked_array.chunks
+            for v in chunk.cast(pyarrow.int64()).to_pylist()
+        ]
+    elif pyarrow.types.is_floating(data_type):
+        return [
+            None if v is None or not math.isfinite(v) else v
+            for v in chunked_array.to_pylist()
+        ]
+    else:
+        return chunked_array.to_pylist()
+
+
+def _format_json(table: pyarrow.Table) -> str:
+    names = table.column_names
+    columns = [_column_values(column) for column in table.columns]
+    rows = [dict(zip(names, row)) for row in zip(*columns)]
+    return json.dumps(rows, ensure_ascii=False, separators=(",", ":"))
+
+
+def _csv_formatter(data_type: pyarrow.DataType) -> Callable[[Any], str]:
+    if pyarrow.types.is_floating(data_type):
+        return _format_float
+    else:
+        return str
+
+
+def _format_csv(table: pyarrow.Table) -> str:
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(table.column_names)
+    formatters = [_csv_formatter(field.type) for field in table.schema]
+    columns = [_column_values(column) for column in table.columns]
+    for row in zip(*columns):
+        writer.writerow(
+            [
+                "" if value is None else formatter(value)
+                for formatter, value in zip(formatters, row)
+            ]
+        )
+    return out.getvalue()
+
+
+def _first_row_group(
+    metadata: pyarrow.parquet.FileMetaData,
+    row_group_offsets: Optional[List[int]],
+    start_row: int,
+) -> Tuple[int, int]:
+    """
+    Find the row group that holds `start_row`: return (index, first_row).
+    """
+    if not row_group_offsets or len(row_group_offsets) != metadata.num_row_groups:
+        return 0, 0  # scan from the start, using metadata
+    index = max(0, bisect.bisect_right(row_group_offsets, start_row) - 1)
+    return index, row_group_offsets[index]
+
+
+def read_slice(
+    parquet_file: pyarrow.parquet.ParquetFile,
+    only_columns: range,
+    only_rows: range,
+    row_group_offsets: Optional[List[int]] = None,
+) -> pyarrow.Table:
+    """
+    Read `only_rows` x `only_columns` of `parquet_file`, ignoring out-of-range.
+
+    Only the row groups that overlap `only_rows` are read. If no rows are
+    selected, the returned columns are all of type `null`.
+
+    `row_group_offsets` (the first row of each row group, as written by
+    `cache_render_result()`) lets us jump straight to the first row group we
+    need. Without it, we walk the row-group metadata from the start.
+
+    Raise pyarrow.ArrowException (or OSError, from the underlying file) if the
+    file is invalid.
+    """
+    metadata = parquet_file.metadata
+    names = parquet_file.schema.to_arrow_schema().names
+    column_names = [names[i] for i in only_columns if 0 <= i < len(names)]
+
+    tables = []
+    first_group, group_start = _first_row_group(
+        metadata, row_group_offsets, only_rows.start
+    )
+    for i in range(first_group, metadata.num_row_groups):
+        group_stop = group_start + metadata.row_group(i).num_rows
+        start = max(only_rows.start, group_start)
+        stop = min(only_rows.stop, group_stop)
+        if start < stop:
+            table = parquet_file.read_row_group(
+                i, columns=column_names, use_threads=False
+            )
+            tables.append(table.slice(start - group_start, stop - start))
+        group_start = group_stop
+        if group_start >= only_rows.stop:
+            break
+
+    if tables:
+        return pyarrow.concat_tables(tables)
+    else:
+        # Zero rows: the caller only needs column names
+        return pyarrow.Table.from_arrays(
+            [pyarrow.array([], pyarrow.null()) for _ in column_names], column_names
+        )
+
+
+def read_slice_as_text(
+    parquet_file: pyarrow.parquet.ParquetFile,
+    format: str,
+    only_columns: range,
+    only_rows: range,
+    row_group_offsets: Optional[List[int]] = None,
+) -> str:
+    """
+    Format `only_rows` x `only_columns` of `parquet_file` as "csv" or "json".
+
+    See `read_slice()` for the meaning of `row_group_offsets`.
+
+    Raise pyarrow.ArrowException (or OSError, from the underlying file) if the
+    file is invalid.
+    """
+    table = read_slice(parquet_file, only_columns, only_rows, row_group_offsets)
+    if format == "csv":
+        return _format_csv(table)
+    elif format == "json":
+        return _format_json(table)
+    else:
+        raise ValueError("Unknown format %r" % format)
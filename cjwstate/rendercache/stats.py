@@ -0,0 +1,159 @@
+"""
+Per-column statistics, computed when we cache a render result.
+
+We store these in `wf_module.cached_render_result_column_stats`, so callers
+can answer questions like "what's this column's range?" without reading the
+table. Stats are a list with one dict per column, in column order:
+
+    {
+        "n_nulls": 3,
+        "n_distinct": 12,
+        "min": 1.5,  # Number and Datetime columns only (ISO8601 for Datetime)
+        "max": 9.0,  # Number and Datetime columns only (ISO8601 for Datetime)
+        "top_values": [["a", 10], ["b", 2]],  # Text columns only
+    }
+
+`min` and `max` are `None` when the column is all-null.
+
+Text columns with more than `MAX_N_DISTINCT_TEXT_VALUES` distinct values
+also have `"n_distinct_is_lower_bound": True`: their `n_distinct` is
+`MAX_N_DISTINCT_TEXT_VALUES` and their `top_values` are approximate.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import pyarrow
+from cjwkernel.types import ArrowTable, ColumnType
+
+
+N_TOP_VALUES = 10
+"""
+Number of most-common values we store for each text column.
+"""
+
+MAX_TOP_VALUE_N_CHARS = 200
+"""
+Longest value we'll store in `top_values`.
+
+Values can be 32kb long; we don't want to store 10 of those per column in
+the database. Longer values are left out of `top_values`.
+"""
+
+
+MAX_N_DISTINCT_TEXT_VALUES = 100_000
+"""
+Most distinct values we count in each text column when computing stats.
+
+Counting builds a dict of every distinct value. On a column of unique IDs,
+that dict costs more memory than the column itself. Past this many values,
+we only count values we've already seen.
+"""
+
+
+def _count_text_values(
+    chunked_array: pyarrow.ChunkedArray, max_n_values: Optional[int]
+) -> Tuple[Dict[str, int], bool]:
+    """
+    Count non-null values in a text column; return `(counts, truncated)`.
+
+    When `max_n_values` is set, `counts` has at most that many keys. If there
+    are more distinct values, `truncated` is `True` and `counts` omits values
+    we first saw after filling it.
+    """
+    value_counts = {}
+    truncated = False
+    # One chunk per record batch or row group. Each has its own dictionary.
+    for chunk in chunked_array.chunks:
+        if not pyarrow.types.is_dictionary(chunk.type):
+            chunk = chunk.dictionary_encode()
+        # pd.Series() accepts both a Categorical and a Series
+        codes = pd.Series(chunk.to_pandas()).cat.codes.values  # -1 means null
+        counts = np.bincount(codes[codes >= 0], minlength=len(chunk.dictionary))
+        for value, count in zip(chunk.dictionary.to_pylist(), counts.tolist()):
+            if not count:
+                continue
+            if value in value_counts:
+                value_counts[value] += count
+            elif max_n_values is not None and len(value_counts) >= max_n_values:
+                truncated = True
+            else:
+                value_counts[value] = count
+    return value_counts, truncated
+
+
+def count_text_values(chunked_array: pyarrow.ChunkedArray) -> Dict[str, int]:
+    """
+    Count each non-null value in a text column.
+
+    This is vectorized: we dictionary-encode each chunk (if it isn't already
+    encoded) and count its indices with numpy.
+    """
+    return _count_text_values(chunked_array, None)[0]
+
+
+def _text_column_stats(chunked_array: pyarrow.ChunkedArray) -> Dict[str, Any]:
+    value_counts, truncated = _count_text_values(
+        chunked_array, MAX_N_DISTINCT_TEXT_VALUES
+    )
+    top_values = sorted(
+        (
+            (value, count)
+            for value, count in value_counts.items()
+            if len(value) <= MAX_TOP_VALUE_N_CHARS
+        ),
+        key=lambda pair: (-pair[1], pair[0]),
+    )[:N_TOP_VALUES]
+    stats = {
+        "n_distinct": len(value_counts),
+        "top_values": [list(pair) for pair in top_values],
+    }
+    if truncated:
+        stats["n_distinct_is_lower_bound"] = True
+    return stats
+
+
+def _number_column_stats(chunked_array: pyarrow.ChunkedArray) -> Dict[str, Any]:
+    values = pd.Series(chunked_array.to_pandas()).dropna()
+    if values.empty:
+        return {"n_distinct": 0, "min": None, "max": None}
+    else:
+        return {
+            "n_distinct": int(values.nunique()),
+            "min": values.min().item(),
+            "max": values.max().item(),
+        }
+
+
+def _datetime_column_stats(chunked_array: pyarrow.ChunkedArray) -> Dict[str, Any]:
+    values = pd.Series(chunked_array.to_pandas()).dropna()
+    if values.empty:
+        return {"n_distinct": 0, "min": None, "max": None}
+    else:
+        return {
+            "n_distinct": int(values.nunique()),
+            "min": values.min().isoformat() + "Z",
+            "max": values.max().isoformat() + "Z",
+        }
+
+
+def compute_column_stats(table: ArrowTable) -> List[Dict[str, Any]]:
+    """
+    Compute stats for each column of `table`.
+
+    This reads every value of every column, one column at a time.
+    """
+    if table.table is None:
+        return []
+
+    stats = []
+    for column, chunked_array in zip(table.metadata.columns, table.table.columns):
+        if isinstance(column.type, ColumnType.Text):
+            column_stats = _text_column_stats(chunked_array)
+        elif isinstance(column.type, ColumnType.Number):
+            column_stats = _number_column_stats(chunked_array)
+        elif isinstance(column.type, ColumnType.Datetime):
+            column_stats = _datetime_column_stats(chunked_array)
+        else:
+            raise NotImplementedError
+        stats.append({"n_nulls": chunked_array.null_count, **column_stats})
+    return stats
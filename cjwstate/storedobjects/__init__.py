@@ -1,3 +1,15 @@
-from .io import create_stored_object, downloaded_file, enforce_storage_limits
+from .io import (
+    create_stored_object,
+    download,
+    downloaded_file,
+    enforce_storage_limits,
+    hash_file,
+)
 
-__all__ = ("create_stored_object", "downloaded_file", "enforce_storage_limits")
+__all__ = (
+    "create_stored_object",
+    "download",
+    "downloaded_file",
+    "enforce_storage_limits",
+    "hash_file",
+)
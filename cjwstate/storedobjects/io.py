@@ -1,16 +1,51 @@
+import contextlib
+import hashlib
 from pathlib import Path
 from typing import ContextManager, Optional
-import uuid
 from django.conf import settings
 from django.utils import timezone
 from cjwkernel.util import tempfile_context
 from cjwstate import minio
+from cjwstate.localcache import LocalFileCache
 from cjwstate.models import StoredObject, WfModule
+from cjwstate.models.StoredObject import blob_key, locked_blob
 
 
 BUCKET = minio.StoredObjectsBucket
+_BUFFER_SIZE = 1024 * 1024
 
 
+LOCAL_CACHE = LocalFileCache(
+    "storedobjects", settings.STOREDOBJECTS_LOCAL_CACHE_MAX_BYTES, hardlink=False
+)
+"""
+Stored-object files we downloaded recently, keyed by minio key.
+
+A StoredObject's file never changes, so entries never go stale. The renderer
+reads the same fetch result on every render of a step; the fetcher reads the
+previous fetch result on every fetch.
+
+We never hard-link: callers hand these files to modules, which may write to
+them.
+"""
+
+
+def download(stored_object: StoredObject, path: Path) -> None:
+    """
+    Overwrite `path` with the StoredObject's file.
+
+    If this process downloaded the file recently, copy it from `LOCAL_CACHE`
+    instead of downloading it again.
+
+    Raise FileNotFoundError if the object is missing.
+    """
+    key = stored_object.key
+    if not LOCAL_CACHE.get(key, path):
+        minio.download(BUCKET, key, path)  # raise FileNotFoundError
+        LOCAL_CACHE.put(key, path)
+
+
+@contextlib.contextmanager
 def downloaded_file(stored_object: StoredObject, dir=None) -> ContextManager[Path]:
     """
     Context manager to download and yield `path`, the StoredObject's file.
@@ -28,17 +63,30 @@ def downloaded_file(stored_object: StoredObject, dir=None) -> ContextManager[Pat
     if stored_object.size == 0:
         # Some stored objects with size=0 do not have key. These are valid:
         # they represent empty files.
-        return tempfile_context(prefix="storedobjects-empty-file", dir=dir)
+        with tempfile_context(prefix="storedobjects-empty-file", dir=dir) as path:
+            yield path
     else:
-        # raises FileNotFoundError
-        return minio.temporarily_download(
-            minio.StoredObjectsBucket, stored_object.key, dir=dir
-        )
+        with tempfile_context(prefix="storedobjects-download-", dir=dir) as path:
+            download(stored_object, path)  # raise FileNotFoundError
+            yield path
 
 
-def _build_key(workflow_id: int, wf_module_id: int) -> str:
-    """Build a helpful S3 key."""
-    return f"{workflow_id}/{wf_module_id}/{uuid.uuid1()}.dat"
+def hash_file(path: Path) -> str:
+    """
+    Return the SHA-256 hex digest of `path`'s contents.
+
+    We read in chunks, so this uses constant memory on huge files.
+    """
+    hasher = hashlib.sha256()
+    buffer = bytearray(_BUFFER_SIZE)
+    view = memoryview(buffer)
+    with path.open("rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            hasher.update(view[:n])
+    return hasher.hexdigest()
 
 
 def create_stored_object(
@@ -46,29 +94,41 @@ def create_stored_object(
     wf_module_id: int,
     path: Path,
     stored_at: Optional[timezone.datetime] = None,
+    hash: Optional[str] = None,
 ) -> StoredObject:
     """
     Write and return a new StoredObject.
 
+    `workflow_id` is unused: files are shared across workflows.
+
+    `hash` must be `hash_file(path)`. Pass it if you already computed it;
+    otherwise, we'll compute it.
+
+    The file is content-addressed: if another StoredObject (in any workflow)
+    has the same contents, we reference its file instead of uploading.
+
     The caller should call enforce_storage_limits() after calling this.
 
     Raise IntegrityError if a database race prevents saving this. Raise a minio
-    error if writing to minio failed. In case of partial completion, a
-    StoredObject will exist in the database but no file will be saved in minio.
+    error if writing to minio failed. In case of partial completion, a file
+    will exist in minio with no StoredObject referencing it.
     """
     if stored_at is None:
         stored_at = timezone.now()
-    key = _build_key(workflow_id, wf_module_id)
     size = path.stat().st_size
-    stored_object = StoredObject.objects.create(
-        stored_at=stored_at,
-        wf_module_id=wf_module_id,
-        key=key,
-        size=size,
-        hash="unhashed",
-    )
-    minio.fput_file(BUCKET, key, path)
-    return stored_object
+    if hash is None:
+        hash = hash_file(path)
+    key = blob_key(hash)
+    with locked_blob(key):
+        if not minio.exists(BUCKET, key):
+            minio.fput_file(BUCKET, key, path)
+        return StoredObject.objects.create(
+            stored_at=stored_at,
+            wf_module_id=wf_module_id,
+            key=key,
+            size=size,
+            hash=hash,
+        )
 
 
 def enforce_storage_limits(wf_module: WfModule) -> None:
@@ -55,12 +55,10 @@ class WfModuleTests(DbTestCase):
         self.assertEqual(step1d.stored_objects.count(), 1)
         self.assertEqual(step1d.stored_data_version, step1.stored_data_version)
         so2d = step1d.stored_objects.first()
-        # The StoredObject was copied byte for byte into a different file
-        self.assertNotEqual(so2d.key, so2.key)
-        self.assertEqual(
-            minio.get_object_with_data(minio.StoredObjectsBucket, so2d.key)["Body"],
-            minio.get_object_with_data(minio.StoredObjectsBucket, so2.key)["Body"],
-        )
+        # The StoredObject shares the original's (content-addressed) file
+        self.assertEqual(so2d.key, so2.key)
+        self.assertEqual(so2d.hash, so2.hash)
+        self.assertTrue(minio.exists(minio.StoredObjectsBucket, so2d.key))
 
     def test_wf_module_duplicate_disable_auto_update(self):
         """
@@ -1,9 +1,13 @@
+import importlib
 import logging
 import unittest
 from unittest.mock import patch
 import uuid
 from django.contrib.auth.models import User
+from cjwkernel.errors import ModuleError
 from cjwstate import commands, minio
+from cjwstate.models import StoredObject
+from cjwstate.storedobjects import create_stored_object
 from cjwstate.models.workflow import Workflow, DependencyGraph
 from cjwstate.models.commands import (
     InitWorkflowCommand,
@@ -14,6 +18,7 @@ from cjwstate.tests.utils import (
     DbTestCaseWithModuleRegistryAndMockKernel,
     create_module_zipfile,
 )
+from cjwkernel.tests.util import tempfile_context
 
 
 async def async_noop(*args, **kwargs):
@@ -68,6 +73,38 @@ class WorkflowTests(DbTestCaseWithModuleRegistryAndMockKernel):
             wf1.tabs.first().wf_modules.count(), wf2.tabs.first().wf_modules.count()
         )
 
+    def test_workflow_duplicate_locks_blobs_up_front(self):
+        wf1 = Workflow.create_and_init(name="Foo")
+        tab = wf1.tabs.first()
+        keys = []
+        for order, data in enumerate([b"b", b"a"]):
+            wf_module = tab.wf_modules.create(
+                order=order, slug="step-%d" % order, module_id_name="x"
+            )
+            with tempfile_context() as path:
+                path.write_bytes(data)
+                so = create_stored_object(wf1.id, wf_module.id, path)
+            wf_module.stored_data_version = so.stored_at
+            wf_module.save(update_fields=["stored_data_version"])
+            keys.append(so.key)
+
+        # cjwstate.models.StoredObject is the class; we want the module
+        storedobject_module = importlib.import_module("cjwstate.models.StoredObject")
+        with patch.object(
+            storedobject_module,
+            "locked_blobs",
+            wraps=storedobject_module.locked_blobs,
+        ) as locked_blobs:
+            wf2 = wf1.duplicate(self.bob)
+        self.assertEqual(sorted(locked_blobs.call_args_list[0][0][0]), sorted(keys))
+        self.assertEqual(
+            sorted(
+                so.key
+                for so in StoredObject.objects.filter(wf_module__tab__workflow=wf2)
+            ),
+            sorted(keys),
+        )
+
     def test_auth_shared_workflow(self):
         wf = Workflow.objects.create(owner=self.alice, public=True)
 
@@ -282,3 +319,21 @@ class DependencyGraphTests(DbTestCaseWithModuleRegistryAndMockKernel):
                 step3.id: DependencyGraph.Step(set()),
             },
         )
+
+    def test_read_graph_migrate_params_error_migrates_once(self):
+        workflow = Workflow.objects.create()
+        tab1 = workflow.tabs.create(position=0, slug="tab-1")
+        create_module_zipfile(
+            "tabby", spec_kwargs={"parameters": [{"id_name": "tab", "type": "tab"}]}
+        )
+        tab1.wf_modules.create(
+            order=0, slug="step-1", module_id_name="tabby", params={"tab": "tab-2"}
+        )
+
+        self.kernel.migrate_params.side_effect = ModuleError
+        with self.assertLogs(level=logging.INFO):
+            with self.assertRaises(ModuleError):
+                DependencyGraph.load_from_workflow(workflow)
+        # We re-raise the batch call's error; we don't migrate again to find it
+        self.kernel.migrate_params_many.assert_called_once()
+        self.kernel.migrate_params.assert_called_once()
@@ -1,5 +1,8 @@
+from pathlib import Path
 import unittest
-from cjwstate.modules.types import ModuleSpec
+import zipfile
+from cjwkernel.util import tempdir_context
+from cjwstate.modules.types import ModuleSpec, ModuleZipfile
 from cjwstate.modules.param_dtype import ParamDType
 
 
@@ -108,3 +111,39 @@ class ModuleSpecTest(unittest.TestCase):
         )
 
         self.assertEqual(spec.default_params, {"foo": "X"})
+
+
+class ModuleZipfileTest(unittest.TestCase):
+    def _write_zipfile(self, path: Path, files) -> ModuleZipfile:
+        with zipfile.ZipFile(path, mode="w") as zf:
+            for name, date_time, data in files:
+                zf.writestr(zipfile.ZipInfo(name, date_time), data)
+        return ModuleZipfile(path)
+
+    def test_content_hash_ignores_timestamps_and_order(self):
+        with tempdir_context() as tempdir:
+            zf1 = self._write_zipfile(
+                tempdir / "a.internal.zip",
+                [
+                    ("a.py", (2020, 1, 1, 0, 0, 0), b"x"),
+                    ("a.yaml", (2020, 1, 1, 0, 0, 0), b"y"),
+                ],
+            )
+            zf2 = self._write_zipfile(
+                tempdir / "a.abc123.zip",
+                [
+                    ("a.yaml", (2020, 2, 2, 0, 0, 0), b"y"),
+                    ("a.py", (2020, 2, 2, 0, 0, 0), b"x"),
+                ],
+            )
+            self.assertEqual(zf1.get_content_hash(), zf2.get_content_hash())
+
+    def test_content_hash_changes_with_content(self):
+        with tempdir_context() as tempdir:
+            zf1 = self._write_zipfile(
+                tempdir / "a.internal.zip", [("a.py", (2020, 1, 1, 0, 0, 0), b"x")]
+            )
+            zf2 = self._write_zipfile(
+                tempdir / "a.develop.zip", [("a.py", (2020, 1, 1, 0, 0, 0), b"xx")]
+            )
+            self.assertNotEqual(zf1.get_content_hash(), zf2.get_content_hash())
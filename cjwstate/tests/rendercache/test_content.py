@@ -0,0 +1,86 @@
+from cjwkernel.tests.util import arrow_table, assert_render_result_equals
+from cjwkernel.types import (
+    Column,
+    ColumnType,
+    I18nMessage,
+    RenderError,
+    RenderResult,
+    TableMetadata,
+)
+from cjwkernel.tests.util import tempfile_context
+from cjwstate import minio
+from cjwstate.tests.utils import DbTestCase
+from cjwstate.rendercache.content import (
+    BUCKET,
+    cache_content_render_result,
+    delete_parsed_fetch_results,
+    load_content_render_result,
+    parsed_fetch_result_content_key,
+)
+
+
+class RendercacheContentTests(DbTestCase):
+    def test_cache_and_load(self):
+        result = RenderResult(
+            arrow_table({"A": [1, 2]}),
+            [RenderError(I18nMessage("e1", [1, "x"]))],
+            {"foo": "bar"},
+        )
+        cache_content_render_result("abc123", result)
+        with tempfile_context() as arrow_path:
+            assert_render_result_equals(
+                load_content_render_result("abc123", arrow_path), result
+            )
+
+    def test_cache_and_load_zero_columns(self):
+        result = RenderResult(errors=[RenderError(I18nMessage("e1", []))])
+        cache_content_render_result("abc123", result)
+        self.assertFalse(minio.exists(BUCKET, "content/abc123.dat"))
+        with tempfile_context() as arrow_path:
+            assert_render_result_equals(
+                load_content_render_result("abc123", arrow_path), result
+            )
+
+    def test_load_missing_is_none(self):
+        with tempfile_context() as arrow_path:
+            self.assertIsNone(load_content_render_result("abc123", arrow_path))
+
+    def test_load_missing_parquet_is_none(self):
+        cache_content_render_result("abc123", RenderResult(arrow_table({"A": [1]})))
+        minio.remove(BUCKET, "content/abc123.dat")
+        with tempfile_context() as arrow_path:
+            with self.assertLogs("cjwstate.rendercache.content"):
+                self.assertIsNone(load_content_render_result("abc123", arrow_path))
+
+    def test_load_uses_cached_column_metadata(self):
+        cache_content_render_result(
+            "abc123",
+            RenderResult(
+                arrow_table(
+                    {"A": [1]},
+                    columns=[Column("A", ColumnType.Number("{:,.2f}"))],
+                )
+            ),
+        )
+        with tempfile_context() as arrow_path:
+            result = load_content_render_result("abc123", arrow_path)
+        self.assertEqual(
+            result.table.metadata,
+            TableMetadata(1, [Column("A", ColumnType.Number("{:,.2f}"))]),
+        )
+
+    def test_delete_parsed_fetch_results(self):
+        result = RenderResult(arrow_table({"A": [1]}))
+        key1 = parsed_fetch_result_content_key("aaa", "p1")
+        key2 = parsed_fetch_result_content_key("aaa", "p2")
+        other_key = parsed_fetch_result_content_key("bbb", "p1")
+        cache_content_render_result(key1, result)
+        cache_content_render_result(key2, result)
+        cache_content_render_result(other_key, result)
+        delete_parsed_fetch_results("aaa")
+        with tempfile_context() as arrow_path:
+            self.assertIsNone(load_content_render_result(key1, arrow_path))
+            self.assertIsNone(load_content_render_result(key2, arrow_path))
+            assert_render_result_equals(
+                load_content_render_result(other_key, arrow_path), result
+            )
@@ -0,0 +1,109 @@
+import gzip
+from cjwkernel.tests.util import arrow_table
+from cjwkernel.types import RenderResult
+from cjwstate import minio
+from cjwstate.models import Workflow
+from cjwstate.models.commands import InitWorkflowCommand
+from cjwstate.tests.utils import DbTestCase
+from cjwstate.rendercache.io import (
+    BUCKET,
+    CorruptCacheError,
+    cache_render_result,
+    crr_parquet_key,
+    restamp_cached_render_result,
+)
+from cjwstate.rendercache.export import (
+    discard_export,
+    export_etag,
+    export_key,
+    iter_export_bytes,
+    materialize_export,
+)
+
+
+class RendercacheExportTests(DbTestCase):
+    def setUp(self):
+        super().setUp()
+        self.workflow = Workflow.objects.create()
+        self.delta = InitWorkflowCommand.create(self.workflow)
+        self.tab = self.workflow.tabs.create(position=0)
+        self.wf_module = self.tab.wf_modules.create(
+            order=0, slug="step-1", last_relevant_delta_id=self.delta.id
+        )
+
+    def _cache(self, table):
+        cache_render_result(
+            self.workflow, self.wf_module, self.delta.id, RenderResult(table)
+        )
+        return self.wf_module.cached_render_result
+
+    def test_materialize_csv(self):
+        crr = self._cache(arrow_table({"A": [1, 2]}))
+        size = materialize_export(crr, "csv", False)
+        data = b"".join(iter_export_bytes(crr, "csv", False, 0, size))
+        self.assertEqual(data, b"A\n1\n2\n")
+
+    def test_materialize_gzip(self):
+        crr = self._cache(arrow_table({"A": [1, 2]}))
+        size = materialize_export(crr, "json", True)
+        data = b"".join(iter_export_bytes(crr, "json", True, 0, size))
+        self.assertEqual(gzip.decompress(data), b'[{"A":1},{"A":2}]')
+
+    def test_materialize_gzip_is_deterministic(self):
+        crr = self._cache(arrow_table({"A": [1, 2]}))
+        size = materialize_export(crr, "json", True)
+        data = b"".join(iter_export_bytes(crr, "json", True, 0, size))
+        # FLG=0 (no filename) and MTIME=0, so re-exporting gives the same bytes
+        self.assertEqual(data[3:8], b"\x00\x00\x00\x00\x00")
+
+    def test_materialize_only_once(self):
+        crr = self._cache(arrow_table({"A": [1, 2]}))
+        materialize_export(crr, "csv", False)
+        # Prove the second call doesn't read Parquet
+        minio.remove(BUCKET, crr_parquet_key(crr))
+        self.assertEqual(materialize_export(crr, "csv", False), 6)
+
+    def test_materialize_missing_parquet_is_corrupt_cache_error(self):
+        crr = self._cache(arrow_table({"A": [1, 2]}))
+        minio.remove(BUCKET, crr_parquet_key(crr))
+        with self.assertRaises(CorruptCacheError):
+            materialize_export(crr, "csv", False)
+
+    def test_iter_range(self):
+        crr = self._cache(arrow_table({"A": [1, 2]}))
+        materialize_export(crr, "csv", False)
+        self.assertEqual(
+            b"".join(iter_export_bytes(crr, "csv", False, 2, 5, chunk_size=1)),
+            b"1\n2",
+        )
+
+    def test_new_render_invalidates_export(self):
+        crr = self._cache(arrow_table({"A": [1, 2]}))
+        materialize_export(crr, "csv", False)
+        self._cache(arrow_table({"A": [3]}))
+        self.assertFalse(minio.exists(BUCKET, export_key(crr, "csv", False)))
+
+    def test_restamp_invalidates_export(self):
+        crr = self._cache(arrow_table({"A": [1, 2]}))
+        materialize_export(crr, "csv", False)
+        self.wf_module.last_relevant_delta_id = self.delta.id + 1
+        self.wf_module.save(update_fields=["last_relevant_delta_id"])
+        restamp_cached_render_result(self.workflow, self.wf_module, self.delta.id + 1)
+        self.assertFalse(minio.exists(BUCKET, export_key(crr, "csv", False)))
+
+    def test_discard_export(self):
+        crr = self._cache(arrow_table({"A": [1, 2]}))
+        materialize_export(crr, "csv", False)
+        discard_export(crr, "csv", False)
+        self.assertFalse(minio.exists(BUCKET, export_key(crr, "csv", False)))
+        self.assertTrue(minio.exists(BUCKET, crr_parquet_key(crr)))
+
+    def test_etag_depends_on_format_and_encoding(self):
+        crr = self._cache(arrow_table({"A": [1, 2]}))
+        etags = {
+            export_etag(crr, "csv", False),
+            export_etag(crr, "csv", True),
+            export_etag(crr, "json", False),
+            export_etag(crr, "json", True),
+        }
+        self.assertEqual(len(etags), 4)
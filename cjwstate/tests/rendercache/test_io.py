@@ -1,6 +1,7 @@
 import datetime
 import numpy as np
 import pyarrow as pa
+from django.test import override_settings
 from cjwkernel.tests.util import arrow_table, assert_render_result_equals
 from cjwkernel.types import (
     RenderError,
@@ -18,14 +19,26 @@ from cjwstate.models import Workflow, WfModule
 from cjwstate.models.commands import InitWorkflowCommand
 from cjwstate.tests.utils import DbTestCase
 from cjwstate.rendercache.io import (
+    ARROW_CACHE,
     BUCKET,
+    LOCAL_CACHE,
     CorruptCacheError,
     cache_render_result,
     load_cached_render_result,
     open_cached_render_result,
     clear_cached_render_result_for_wf_module,
+    copy_stale_cached_render_result,
     crr_parquet_key,
+    discard_prepared_render_result,
+    discard_restamped_cached_render_result,
+    fingerprint_render_result,
+    parquet_key,
+    prepare_render_result,
+    read_cached_render_result_column,
     read_cached_render_result_slice_as_text,
+    restamp_cached_render_result,
+    save_prepared_render_result,
+    upload_prepared_render_result,
 )
 
 
@@ -86,6 +99,53 @@ class RendercacheIoTests(DbTestCase):
 
         self.assertFalse(minio.exists(BUCKET, parquet_key))
 
+    def test_prepare_upload_and_save_render_result(self):
+        cache_render_result(
+            self.workflow,
+            self.wf_module,
+            self.delta.id,
+            RenderResult(arrow_table({"A": [1]})),
+        )
+        old_key = crr_parquet_key(self.wf_module.cached_render_result)
+        self.wf_module.last_relevant_delta_id = self.delta.id + 1
+        self.wf_module.save(update_fields=["last_relevant_delta_id"])
+
+        result = RenderResult(arrow_table({"A": [2]}))
+        prepared = prepare_render_result(
+            self.workflow.id, self.wf_module.id, self.delta.id + 1, result
+        )
+        upload_prepared_render_result(prepared)
+        self.assertFalse(prepared.parquet_path.exists())
+        # The old result is still readable until we save
+        self.assertTrue(minio.exists(BUCKET, old_key))
+        self.assertEqual(
+            WfModule.objects.get(id=self.wf_module.id).cached_render_result_delta_id,
+            self.delta.id,
+        )
+
+        save_prepared_render_result(self.workflow, self.wf_module, prepared)
+        self.assertFalse(minio.exists(BUCKET, old_key))
+        crr = WfModule.objects.get(id=self.wf_module.id).cached_render_result
+        self.assertEqual(crr.delta_id, self.delta.id + 1)
+        with open_cached_render_result(crr) as result2:
+            assert_render_result_equals(result2, result)
+
+    def test_discard_prepared_render_result(self):
+        prepared = prepare_render_result(
+            self.workflow.id,
+            self.wf_module.id,
+            self.delta.id,
+            RenderResult(arrow_table({"A": [1]})),
+        )
+        upload_prepared_render_result(prepared)
+        discard_prepared_render_result(prepared)
+        key = parquet_key(self.workflow.id, self.wf_module.id, self.delta.id)
+        self.assertFalse(minio.exists(BUCKET, key))
+        self.assertFalse(LOCAL_CACHE.get(key, prepared.parquet_path))
+        self.assertIsNone(
+            WfModule.objects.get(id=self.wf_module.id).cached_render_result
+        )
+
     def test_metadata_comes_from_db_columns(self):
         columns = [
             Column("A", ColumnType.Number(format="{:,.2f}")),
@@ -117,10 +177,178 @@ class RendercacheIoTests(DbTestCase):
         cache_render_result(self.workflow, self.wf_module, self.delta.id, result)
         crr = self.wf_module.cached_render_result
         minio.put_bytes(BUCKET, crr_parquet_key(crr), b"NOT PARQUET")
+        # Make sure we read from minio, not from this process's local caches
+        LOCAL_CACHE.clear()
+        ARROW_CACHE.clear()
         with tempfile_context() as arrow_path:
             with self.assertRaises(CorruptCacheError):
                 load_cached_render_result(crr, arrow_path)
 
+    def test_load_from_arrow_cache_without_minio(self):
+        result = RenderResult(arrow_table({"A": [1]}))
+        cache_render_result(self.workflow, self.wf_module, self.delta.id, result)
+        crr = self.wf_module.cached_render_result
+        # Delete from minio entirely, to prove we did not read.
+        minio.remove(BUCKET, crr_parquet_key(crr))
+        with tempfile_context() as arrow_path:
+            assert_render_result_equals(
+                load_cached_render_result(crr, arrow_path), result
+            )
+
+    def test_read_slice_from_local_cache_without_minio(self):
+        result = RenderResult(arrow_table({"A": [1]}))
+        cache_render_result(self.workflow, self.wf_module, self.delta.id, result)
+        crr = self.wf_module.cached_render_result
+        # Delete from minio entirely, to prove we did not read.
+        minio.remove(BUCKET, crr_parquet_key(crr))
+        self.assertEqual(
+            read_cached_render_result_slice_as_text(crr, "csv", range(1), range(1)),
+            "A\n1\n",
+        )
+
+    def test_load_text_and_dictionary_columns_from_parquet(self):
+        result = RenderResult(
+            arrow_table(
+                {
+                    "A": pa.array(["x", None, "x"]),
+                    "B": pa.array(["y", "z", None]).dictionary_encode(),
+                }
+            )
+        )
+        cache_render_result(self.workflow, self.wf_module, self.delta.id, result)
+        crr = self.wf_module.cached_render_result
+        ARROW_CACHE.clear()  # read Parquet
+        with tempfile_context() as arrow_path:
+            loaded = load_cached_render_result(crr, arrow_path)
+            # Only "B" was dictionary-encoded in Parquet, so only "B" comes
+            # back as a dictionary.
+            self.assertEqual(loaded.table.table.column(0).type, pa.string())
+            self.assertTrue(pa.types.is_dictionary(loaded.table.table.column(1).type))
+            assert_render_result_equals(loaded, result)
+
+    def test_read_column(self):
+        result = RenderResult(arrow_table({"A": [1, 2], "B": ["x", None]}))
+        cache_render_result(self.workflow, self.wf_module, self.delta.id, result)
+        crr = self.wf_module.cached_render_result
+        column = read_cached_render_result_column(crr, "B")
+        self.assertEqual(column.to_pylist(), ["x", None])
+        self.assertTrue(pa.types.is_dictionary(column.type))
+
+    def test_read_column_missing_file_is_corrupt_cache_error(self):
+        result = RenderResult(arrow_table({"A": [1]}))
+        cache_render_result(self.workflow, self.wf_module, self.delta.id, result)
+        crr = self.wf_module.cached_render_result
+        clear_cached_render_result_for_wf_module(self.wf_module)
+        with self.assertRaises(CorruptCacheError):
+            read_cached_render_result_column(crr, "A")
+
+    def test_clear_evicts_local_caches(self):
+        result = RenderResult(arrow_table({"A": [1]}))
+        cache_render_result(self.workflow, self.wf_module, self.delta.id, result)
+        crr = self.wf_module.cached_render_result
+        clear_cached_render_result_for_wf_module(self.wf_module)
+        with tempfile_context() as arrow_path:
+            with self.assertRaises(CorruptCacheError):
+                load_cached_render_result(crr, arrow_path)
+
+    def test_fingerprint(self):
+        result = RenderResult(arrow_table({"A": [1]}), [], {"foo": "bar"})
+        self.assertEqual(
+            fingerprint_render_result(result),
+            fingerprint_render_result(
+                RenderResult(arrow_table({"A": [1]}), [], {"foo": "bar"})
+            ),
+        )
+        self.assertNotEqual(
+            fingerprint_render_result(result),
+            fingerprint_render_result(
+                RenderResult(arrow_table({"A": [2]}), [], {"foo": "bar"})
+            ),
+        )
+        self.assertNotEqual(
+            fingerprint_render_result(result),
+            fingerprint_render_result(
+                RenderResult(arrow_table({"A": [1]}), [], {"foo": "baz"})
+            ),
+        )
+
+    def test_cache_render_result_stores_fingerprints(self):
+        result = RenderResult(arrow_table({"A": [1]}))
+        cache_render_result(
+            self.workflow,
+            self.wf_module,
+            self.delta.id,
+            result,
+            input_fingerprint="abc123",
+        )
+        self.wf_module.refresh_from_db()
+        self.assertEqual(
+            self.wf_module.cached_render_result.fingerprint,
+            fingerprint_render_result(result),
+        )
+        self.assertEqual(
+            self.wf_module.cached_render_result_input_fingerprint, "abc123"
+        )
+
+    def test_cache_render_result_stores_column_stats(self):
+        result = RenderResult(arrow_table({"A": [1, 3]}))
+        cache_render_result(self.workflow, self.wf_module, self.delta.id, result)
+        self.wf_module.refresh_from_db()
+        self.assertEqual(
+            self.wf_module.cached_render_result.column_stats,
+            [{"n_nulls": 0, "n_distinct": 2, "min": 1, "max": 3}],
+        )
+
+    def test_restamp(self):
+        result = RenderResult(arrow_table({"A": [1]}))
+        cache_render_result(self.workflow, self.wf_module, self.delta.id, result)
+        old_crr = self.wf_module.cached_render_result
+        self.wf_module.last_relevant_delta_id = self.delta.id + 1
+        self.wf_module.save(update_fields=["last_relevant_delta_id"])
+
+        restamp_cached_render_result(self.workflow, self.wf_module, self.delta.id + 1)
+
+        self.wf_module.refresh_from_db()
+        crr = self.wf_module.cached_render_result
+        self.assertEqual(crr.delta_id, self.delta.id + 1)
+        self.assertEqual(crr.fingerprint, old_crr.fingerprint)
+        self.assertFalse(minio.exists(BUCKET, crr_parquet_key(old_crr)))
+        LOCAL_CACHE.clear()
+        ARROW_CACHE.clear()  # read from minio
+        with tempfile_context() as arrow_path:
+            assert_render_result_equals(
+                load_cached_render_result(crr, arrow_path), result
+            )
+
+    def test_restamp_missing_file_is_corrupt_cache_error(self):
+        result = RenderResult(arrow_table({"A": [1]}))
+        cache_render_result(self.workflow, self.wf_module, self.delta.id, result)
+        minio.remove(BUCKET, crr_parquet_key(self.wf_module.cached_render_result))
+        self.wf_module.last_relevant_delta_id = self.delta.id + 1
+        self.wf_module.save(update_fields=["last_relevant_delta_id"])
+
+        with self.assertRaises(CorruptCacheError):
+            restamp_cached_render_result(
+                self.workflow, self.wf_module, self.delta.id + 1
+            )
+
+    def test_restamp_copy_then_discard(self):
+        result = RenderResult(arrow_table({"A": [1]}))
+        cache_render_result(self.workflow, self.wf_module, self.delta.id, result)
+        crr = self.wf_module.cached_render_result
+        self.wf_module.last_relevant_delta_id = self.delta.id + 1
+        self.wf_module.save(update_fields=["last_relevant_delta_id"])
+
+        copy_stale_cached_render_result(crr, self.delta.id + 1)
+        new_key = parquet_key(self.workflow.id, self.wf_module.id, self.delta.id + 1)
+        self.assertTrue(minio.exists(BUCKET, new_key))
+        discard_restamped_cached_render_result(crr, self.delta.id + 1)
+
+        self.assertFalse(minio.exists(BUCKET, new_key))
+        self.assertTrue(minio.exists(BUCKET, crr_parquet_key(crr)))
+        self.wf_module.refresh_from_db()
+        self.assertEqual(self.wf_module.cached_render_result_delta_id, self.delta.id)
+
     def test_read_cached_render_result_slice_as_text_datetime(self):
         result = RenderResult(
             arrow_table(
@@ -132,5 +360,48 @@ class RendercacheIoTests(DbTestCase):
         crr = self.wf_module.cached_render_result
         self.assertEqual(
             read_cached_render_result_slice_as_text(crr, "csv", range(2), range(3)),
-            "A\n2037-08-18T13:03:32.341232967Z\n",
+            'A\n2037-08-18T13:03:32.341232967Z\n""\n',
+        )
+
+    def test_read_cached_render_result_slice_as_text_json(self):
+        result = RenderResult(
+            arrow_table({"A": [1, 2, 3], "B": ["x", None, "z"], "C": [1.5, 2, None]})
+        )
+        cache_render_result(self.workflow, self.wf_module, self.delta.id, result)
+        crr = self.wf_module.cached_render_result
+        self.assertEqual(
+            read_cached_render_result_slice_as_text(crr, "json", range(2), range(1, 5)),
+            '[{"A":2,"B":null},{"A":3,"B":"z"}]',
+        )
+
+    def test_read_cached_render_result_slice_as_text_ranged_from_minio(self):
+        result = RenderResult(arrow_table({"A": [1, 2]}))
+        cache_render_result(self.workflow, self.wf_module, self.delta.id, result)
+        crr = self.wf_module.cached_render_result
+        LOCAL_CACHE.remove(crr_parquet_key(crr))
+        self.assertEqual(
+            read_cached_render_result_slice_as_text(crr, "csv", range(1), range(2)),
+            "A\n1\n2\n",
         )
+
+    @override_settings(RENDERCACHE_PARQUET_ROW_GROUP_SIZE=2)
+    def test_cache_render_result_row_group_offsets(self):
+        result = RenderResult(arrow_table({"A": [1, 2, 3, 4, 5]}))
+        cache_render_result(self.workflow, self.wf_module, self.delta.id, result)
+        self.wf_module.refresh_from_db()
+        crr = self.wf_module.cached_render_result
+        self.assertEqual(crr.row_group_offsets, [0, 2, 4])
+        LOCAL_CACHE.remove(crr_parquet_key(crr))  # read from minio
+        self.assertEqual(
+            read_cached_render_result_slice_as_text(crr, "csv", range(1), range(3, 5)),
+            "A\n4\n5\n",
+        )
+
+    def test_read_cached_render_result_slice_as_text_missing_file(self):
+        result = RenderResult(arrow_table({"A": [1]}))
+        cache_render_result(self.workflow, self.wf_module, self.delta.id, result)
+        crr = self.wf_module.cached_render_result
+        LOCAL_CACHE.remove(crr_parquet_key(crr))
+        minio.remove(BUCKET, crr_parquet_key(crr))
+        with self.assertRaises(CorruptCacheError):
+            read_cached_render_result_slice_as_text(crr, "csv", range(1), range(1))
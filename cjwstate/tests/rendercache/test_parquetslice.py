@@ -0,0 +1,98 @@
+import unittest
+import pyarrow as pa
+import pyarrow.parquet
+from cjwkernel.tests.util import tempfile_context
+from cjwstate.rendercache.parquetslice import read_slice, read_slice_as_text
+
+
+class ParquetSliceTests(unittest.TestCase):
+    def _read_text(self, table, format, only_columns, only_rows, row_group_size=None):
+        with tempfile_context(suffix=".parquet") as path:
+            pyarrow.parquet.write_table(table, str(path), row_group_size=row_group_size)
+            return read_slice_as_text(
+                pyarrow.parquet.ParquetFile(str(path)), format, only_columns, only_rows
+            )
+
+    def test_json(self):
+        table = pa.table({"A": [1, 2], "B": ["x", None], "C": [1.5, 2.0]})
+        self.assertEqual(
+            self._read_text(table, "json", range(3), range(2)),
+            '[{"A":1,"B":"x","C":1.5},{"A":2,"B":null,"C":2.0}]',
+        )
+
+    def test_csv(self):
+        table = pa.table({"A": [1, 2], "B": ['x,"y"', None], "C": [1.5, 2.0]})
+        self.assertEqual(
+            self._read_text(table, "csv", range(3), range(2)),
+            'A,B,C\n1,"x,""y""",1.5\n2,,2\n',
+        )
+
+    def test_non_finite_floats_are_null(self):
+        table = pa.table({"A": [float("nan"), float("inf")]})
+        self.assertEqual(
+            self._read_text(table, "json", range(1), range(2)),
+            '[{"A":null},{"A":null}]',
+        )
+
+    def test_timestamp_precision(self):
+        table = pa.table(
+            {
+                "A": pa.array(
+                    [1_000_000_000, 1_001_000_000, 1_000_001_000, 1_000_000_001],
+                    pa.timestamp("ns"),
+                )
+            }
+        )
+        self.assertEqual(
+            self._read_text(table, "csv", range(1), range(4)),
+            (
+                "A\n"
+                "1970-01-01T00:00:01Z\n"
+                "1970-01-01T00:00:01.001Z\n"
+                "1970-01-01T00:00:01.000001Z\n"
+                "1970-01-01T00:00:01.000000001Z\n"
+            ),
+        )
+
+    def test_ignore_out_of_range(self):
+        table = pa.table({"A": [1, 2]})
+        self.assertEqual(self._read_text(table, "csv", range(3), range(1, 5)), "A\n2\n")
+
+    def test_zero_rows(self):
+        table = pa.table({"A": [1, 2], "B": ["x", "y"]})
+        self.assertEqual(self._read_text(table, "json", range(2), range(2, 2)), "[]")
+        self.assertEqual(self._read_text(table, "csv", range(2), range(2, 2)), "A,B\n")
+
+    def test_read_only_overlapping_row_groups(self):
+        table = pa.table({"A": list(range(10)), "B": list(range(10, 20))})
+        with tempfile_context(suffix=".parquet") as path:
+            pyarrow.parquet.write_table(table, str(path), row_group_size=3)
+            parquet_file = pyarrow.parquet.ParquetFile(str(path))
+            read_row_group = parquet_file.read_row_group
+            calls = []
+
+            def spy(i, *args, **kwargs):
+                calls.append(i)
+                return read_row_group(i, *args, **kwargs)
+
+            parquet_file.read_row_group = spy
+            result = read_slice(parquet_file, range(1, 2), range(4, 7))
+        self.assertEqual(calls, [1, 2])  # row groups [3,6) and [6,9)
+        self.assertEqual(result.column_names, ["B"])
+        self.assertEqual(result.column(0).to_pylist(), [14, 15, 16])
+
+    def test_row_group_offsets_skip_metadata_scan(self):
+        table = pa.table({"A": list(range(10))})
+        with tempfile_context(suffix=".parquet") as path:
+            pyarrow.parquet.write_table(table, str(path), row_group_size=3)
+            parquet_file = pyarrow.parquet.ParquetFile(str(path))
+            result = read_slice(parquet_file, range(1), range(7, 8), [0, 3, 6, 9])
+        self.assertEqual(result.column(0).to_pylist(), [7])
+
+    def test_row_group_offsets_wrong_length_are_ignored(self):
+        table = pa.table({"A": list(range(10))})
+        with tempfile_context(suffix=".parquet") as path:
+            pyarrow.parquet.write_table(table, str(path), row_group_size=3)
+            parquet_file = pyarrow.parquet.ParquetFile(str(path))
+            result = read_slice(parquet_file, range(1), range(7, 8), [0, 5])
+        self.assertEqual(result.column(0).to_pylist(), [7])
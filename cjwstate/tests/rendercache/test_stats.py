@@ -0,0 +1,109 @@
+import datetime
+import unittest
+from unittest.mock import patch
+import pyarrow as pa
+from cjwkernel.tests.util import arrow_table
+from cjwkernel.types import Column, ColumnType
+from cjwstate.rendercache import stats
+from cjwstate.rendercache.stats import compute_column_stats, count_text_values
+
+
+class CountTextValuesTests(unittest.TestCase):
+    def test_text(self):
+        self.assertEqual(
+            count_text_values(pa.chunked_array([["a", "b", None, "a"]])),
+            {"a": 2, "b": 1},
+        )
+
+    def test_dictionary_many_chunks(self):
+        self.assertEqual(
+            count_text_values(
+                pa.chunked_array(
+                    [
+                        pa.array(["a", None]).dictionary_encode(),
+                        pa.array(["b", "a"]).dictionary_encode(),
+                    ]
+                )
+            ),
+            {"a": 2, "b": 1},
+        )
+
+
+class ComputeColumnStatsTests(unittest.TestCase):
+    def test_zero_columns(self):
+        self.assertEqual(compute_column_stats(arrow_table({})), [])
+
+    def test_text(self):
+        self.assertEqual(
+            compute_column_stats(arrow_table({"A": ["b", "a", "b", None, "c"]})),
+            [
+                {
+                    "n_nulls": 1,
+                    "n_distinct": 3,
+                    "top_values": [["b", 2], ["a", 1], ["c", 1]],
+                }
+            ],
+        )
+
+    def test_text_skip_long_top_values(self):
+        self.assertEqual(
+            compute_column_stats(arrow_table({"A": ["x" * 201, "y"]}))[0]["top_values"],
+            [["y", 1]],
+        )
+
+    @patch.object(stats, "MAX_N_DISTINCT_TEXT_VALUES", 2)
+    def test_text_too_many_distinct_values(self):
+        self.assertEqual(
+            compute_column_stats(arrow_table({"A": ["a", "b", "c", "a", "d"]})),
+            [
+                {
+                    "n_nulls": 0,
+                    "n_distinct": 2,
+                    "n_distinct_is_lower_bound": True,
+                    "top_values": [["a", 2], ["b", 1]],
+                }
+            ],
+        )
+
+    def test_number(self):
+        self.assertEqual(
+            compute_column_stats(arrow_table({"A": [3, 1, None, 3]})),
+            [{"n_nulls": 1, "n_distinct": 2, "min": 1, "max": 3}],
+        )
+
+    def test_number_all_null(self):
+        self.assertEqual(
+            compute_column_stats(
+                arrow_table(
+                    {"A": pa.array([None], pa.float64())},
+                    columns=[Column("A", ColumnType.Number())],
+                )
+            ),
+            [{"n_nulls": 1, "n_distinct": 0, "min": None, "max": None}],
+        )
+
+    def test_datetime(self):
+        self.assertEqual(
+            compute_column_stats(
+                arrow_table(
+                    {
+                        "A": pa.array(
+                            [
+                                datetime.datetime(2020, 3, 8, 1, 2, 3),
+                                None,
+                                datetime.datetime(2019, 1, 1),
+                            ],
+                            pa.timestamp("ns"),
+                        )
+                    }
+                )
+            ),
+            [
+                {
+                    "n_nulls": 1,
+                    "n_distinct": 2,
+                    "min": "2019-01-01T00:00:00Z",
+                    "max": "2020-03-08T01:02:03Z",
+                }
+            ],
+        )
@@ -1,10 +1,146 @@
+from django.db import transaction
 from django.test.utils import override_settings
+from cjwstate import minio
 from cjwstate.models import Workflow
-from cjwstate.storedobjects.io import create_stored_object, enforce_storage_limits
+from cjwstate.storedobjects.io import (
+    BUCKET,
+    create_stored_object,
+    download,
+    enforce_storage_limits,
+    hash_file,
+)
 from cjwstate.tests.utils import DbTestCase
 from cjwkernel.tests.util import tempfile_context
 
 
+class CreateStoredObjectTests(DbTestCase):
+    def test_hash(self):
+        workflow = Workflow.create_and_init()
+        wf_module = workflow.tabs.first().wf_modules.create(order=1, module_id_name="x")
+
+        with tempfile_context() as path:
+            path.write_bytes(b"abc")
+            stored_object = create_stored_object(workflow.id, wf_module.id, path)
+
+        self.assertEqual(
+            stored_object.hash,
+            "ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad",
+        )
+
+    def test_hash_given(self):
+        workflow = Workflow.create_and_init()
+        wf_module = workflow.tabs.first().wf_modules.create(order=1, module_id_name="x")
+
+        with tempfile_context() as path:
+            path.write_bytes(b"abc")
+            stored_object = create_stored_object(
+                workflow.id, wf_module.id, path, hash=hash_file(path)
+            )
+
+        stored_object.refresh_from_db()
+        self.assertEqual(
+            stored_object.hash,
+            "ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad",
+        )
+
+    def test_deduplicate_identical_files(self):
+        workflow = Workflow.create_and_init()
+        wf_module = workflow.tabs.first().wf_modules.create(order=1, module_id_name="x")
+        workflow2 = Workflow.create_and_init()
+        wf_module2 = workflow2.tabs.first().wf_modules.create(
+            order=1, module_id_name="x"
+        )
+
+        with tempfile_context() as path:
+            path.write_bytes(b"abc")
+            so1 = create_stored_object(workflow.id, wf_module.id, path)
+            so2 = create_stored_object(workflow2.id, wf_module2.id, path)
+
+        self.assertEqual(so1.key, so2.key)
+        self.assertEqual(list(minio.list_file_keys(BUCKET, "sha256/")), [so1.key])
+
+    def test_delete_file_with_last_reference(self):
+        workflow = Workflow.create_and_init()
+        wf_module = workflow.tabs.first().wf_modules.create(order=1, module_id_name="x")
+
+        with tempfile_context() as path:
+            path.write_bytes(b"abc")
+            so1 = create_stored_object(workflow.id, wf_module.id, path)
+            so2 = create_stored_object(workflow.id, wf_module.id, path)
+
+        so1.delete()
+        self.assertTrue(minio.exists(BUCKET, so2.key))  # so2 still references it
+        so2.delete()
+        self.assertFalse(minio.exists(BUCKET, so2.key))
+
+    def test_delete_many_references_at_once(self):
+        workflow = Workflow.create_and_init()
+        wf_module = workflow.tabs.first().wf_modules.create(order=1, module_id_name="x")
+
+        with tempfile_context() as path:
+            path.write_bytes(b"abc")
+            so = create_stored_object(workflow.id, wf_module.id, path)
+            create_stored_object(workflow.id, wf_module.id, path)
+
+        wf_module.stored_objects.all().delete()
+        self.assertFalse(minio.exists(BUCKET, so.key))
+
+    def test_delete_rolled_back_keeps_file(self):
+        workflow = Workflow.create_and_init()
+        wf_module = workflow.tabs.first().wf_modules.create(order=1, module_id_name="x")
+
+        with tempfile_context() as path:
+            path.write_bytes(b"abc")
+            so = create_stored_object(workflow.id, wf_module.id, path)
+
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                so.delete()
+                self.assertTrue(minio.exists(BUCKET, so.key))  # not yet
+                raise RuntimeError("roll back")
+        self.assertTrue(minio.exists(BUCKET, so.key))
+
+
+class DownloadTests(DbTestCase):
+    def test_download(self):
+        workflow = Workflow.create_and_init()
+        wf_module = workflow.tabs.first().wf_modules.create(order=1, module_id_name="x")
+        with tempfile_context() as path:
+            path.write_bytes(b"abc")
+            so = create_stored_object(workflow.id, wf_module.id, path)
+
+        with tempfile_context() as path:
+            download(so, path)
+            self.assertEqual(path.read_bytes(), b"abc")
+
+    def test_download_from_local_cache_without_minio(self):
+        workflow = Workflow.create_and_init()
+        wf_module = workflow.tabs.first().wf_modules.create(order=1, module_id_name="x")
+        with tempfile_context() as path:
+            path.write_bytes(b"abc")
+            so = create_stored_object(workflow.id, wf_module.id, path)
+
+        with tempfile_context() as path:
+            download(so, path)  # fill the cache
+        # Delete from minio entirely, to prove we did not read.
+        minio.remove(BUCKET, so.key)
+        with tempfile_context() as path:
+            download(so, path)
+            self.assertEqual(path.read_bytes(), b"abc")
+
+    def test_download_missing_file(self):
+        workflow = Workflow.create_and_init()
+        wf_module = workflow.tabs.first().wf_modules.create(order=1, module_id_name="x")
+        with tempfile_context() as path:
+            path.write_bytes(b"abc")
+            so = create_stored_object(workflow.id, wf_module.id, path)
+        minio.remove(BUCKET, so.key)
+
+        with tempfile_context() as path:
+            with self.assertRaises(FileNotFoundError):
+                download(so, path)
+
+
 class EnforceStorageLimitsTests(DbTestCase):
     @override_settings(MAX_STORAGE_PER_MODULE=99999999)
     def test_common_case_no_op(self):
@@ -0,0 +1,108 @@
+from pathlib import Path
+import unittest
+from cjwkernel.util import tempdir_context
+from cjwstate.localcache import LocalFileCache
+
+
+class LocalFileCacheTests(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.ctx = tempdir_context()
+        self.basedir = self.ctx.__enter__()
+
+    def tearDown(self):
+        self.ctx.__exit__(None, None, None)
+        super().tearDown()
+
+    def _file(self, name: str, data: bytes) -> Path:
+        path = self.basedir / name
+        path.write_bytes(data)
+        return path
+
+    def test_get_missing(self):
+        cache = LocalFileCache("test", 100)
+        dest = self._file("dest", b"untouched")
+        self.assertFalse(cache.get("key", dest))
+        self.assertEqual(dest.read_bytes(), b"untouched")
+
+    def test_put_get(self):
+        cache = LocalFileCache("test", 100)
+        cache.put("key", self._file("src", b"abc"))
+        dest = self.basedir / "dest"
+        self.assertTrue(cache.get("key", dest))
+        self.assertEqual(dest.read_bytes(), b"abc")
+        self.assertEqual(cache.n_bytes, 3)
+
+    def test_get_survives_deleting_source(self):
+        cache = LocalFileCache("test", 100)
+        src = self._file("src", b"abc")
+        cache.put("key", src)
+        src.unlink()
+        dest = self.basedir / "dest"
+        self.assertTrue(cache.get("key", dest))
+        self.assertEqual(dest.read_bytes(), b"abc")
+
+    def test_get_survives_eviction(self):
+        cache = LocalFileCache("test", 100)
+        cache.put("key", self._file("src", b"abc"))
+        dest = self.basedir / "dest"
+        cache.get("key", dest)
+        cache.clear()
+        self.assertEqual(dest.read_bytes(), b"abc")
+
+    def test_put_overwrites(self):
+        cache = LocalFileCache("test", 100)
+        cache.put("key", self._file("src1", b"abc"))
+        cache.put("key", self._file("src2", b"defg"))
+        dest = self.basedir / "dest"
+        cache.get("key", dest)
+        self.assertEqual(dest.read_bytes(), b"defg")
+        self.assertEqual(cache.n_bytes, 4)
+
+    def test_evict_least_recently_used(self):
+        cache = LocalFileCache("test", 10)
+        cache.put("a", self._file("a", b"aaaa"))
+        cache.put("b", self._file("b", b"bbbb"))
+        cache.get("a", self.basedir / "dest")  # "b" is now least-recently used
+        cache.put("c", self._file("c", b"cccc"))
+        self.assertTrue(cache.get("a", self.basedir / "dest"))
+        self.assertFalse(cache.get("b", self.basedir / "dest"))
+        self.assertTrue(cache.get("c", self.basedir / "dest"))
+        self.assertEqual(cache.n_bytes, 8)
+
+    def test_skip_file_larger_than_max_bytes(self):
+        cache = LocalFileCache("test", 2)
+        cache.put("key", self._file("src", b"abc"))
+        self.assertFalse(cache.get("key", self.basedir / "dest"))
+        self.assertEqual(cache.n_bytes, 0)
+
+    def test_remove_by_prefix(self):
+        cache = LocalFileCache("test", 100)
+        cache.put("wf-1/wfm-1/delta-1.dat", self._file("a", b"a"))
+        cache.put("wf-1/wfm-2/delta-1.dat", self._file("b", b"b"))
+        cache.remove_by_prefix("wf-1/wfm-1/")
+        self.assertFalse(cache.get("wf-1/wfm-1/delta-1.dat", self.basedir / "dest"))
+        self.assertTrue(cache.get("wf-1/wfm-2/delta-1.dat", self.basedir / "dest"))
+        self.assertEqual(cache.n_bytes, 1)
+
+    def test_rename(self):
+        cache = LocalFileCache("test", 100)
+        cache.put("a", self._file("a", b"aaa"))
+        cache.put("b", self._file("b", b"bb"))
+        cache.rename("a", "b")
+        self.assertFalse(cache.get("a", self.basedir / "dest"))
+        self.assertTrue(cache.get("b", self.basedir / "dest"))
+        self.assertEqual((self.basedir / "dest").read_bytes(), b"aaa")
+        self.assertEqual(cache.n_bytes, 3)
+
+    def test_hardlink_false_isolates_inodes(self):
+        cache = LocalFileCache("test", 100, hardlink=False)
+        src = self._file("src", b"abc")
+        cache.put("key", src)
+        src.write_bytes(b"")  # truncate in place
+        dest = self.basedir / "dest"
+        cache.get("key", dest)
+        with dest.open("wb") as f:
+            f.write(b"xyz")  # overwrite in place
+        self.assertTrue(cache.get("key", dest))
+        self.assertEqual(dest.read_bytes(), b"abc")
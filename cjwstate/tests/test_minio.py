@@ -104,3 +104,18 @@ class UploadTest(_MinioTest):
             Config=TransferConfig(multipart_threshold=5 * 1024 * 1024),
         )
         self.assertEqual(minio.get_object_with_data(Bucket, "key")["Body"], data)
+
+
+class OpenRangedTest(_MinioTest):
+    def test_seek_and_read(self):
+        _put(b"0123456789")
+        with minio.open_ranged(Bucket, Key, buffer_size=4) as f:
+            f.seek(-3, io.SEEK_END)
+            self.assertEqual(f.read(), b"789")
+            f.seek(2)
+            self.assertEqual(f.read(5), b"23456")
+            self.assertEqual(f.tell(), 7)
+
+    def test_file_not_found(self):
+        with self.assertRaises(FileNotFoundError):
+            minio.open_ranged(Bucket, Key)
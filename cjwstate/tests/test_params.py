@@ -1,7 +1,7 @@
 import logging
 from cjwkernel.errors import ModuleError
 from cjwstate.models import Workflow
-from cjwstate.params import get_migrated_params
+from cjwstate.params import get_migrated_params, get_migrated_params_many
 from cjwstate.tests.utils import (
     DbTestCaseWithModuleRegistryAndMockKernel,
     create_module_zipfile,
@@ -217,3 +217,111 @@ class GetMigratedParamsTest(DbTestCaseWithModuleRegistryAndMockKernel):
             wf_module.cached_migrated_params_module_version, module_zipfile.version
         )
         # ... even though the WfModule does not exist in the database
+
+
+class GetMigratedParamsManyTest(DbTestCaseWithModuleRegistryAndMockKernel):
+    def test_one_kernel_call_per_module(self):
+        workflow = Workflow.create_and_init()
+        module_zipfile = create_module_zipfile(
+            "yay", spec_kwargs={"parameters": [{"id_name": "foo", "type": "string"}]}
+        )
+        tab = workflow.tabs.first()
+        wf_module1 = tab.wf_modules.create(
+            order=0, module_id_name="yay", params={"foo": "a"}
+        )
+        wf_module2 = tab.wf_modules.create(
+            order=1, module_id_name="yay", params={"foo": "b"}
+        )
+        wf_module3 = tab.wf_modules.create(
+            order=2,
+            module_id_name="yay",
+            params={},
+            cached_migrated_params={"foo": "c"},
+            cached_migrated_params_module_version=module_zipfile.version,
+        )
+
+        self.kernel.migrate_params_many.side_effect = None
+        self.kernel.migrate_params_many.return_value = [{"foo": "A"}, {"foo": "B"}]
+        with self.assertLogs(level=logging.INFO):
+            result = get_migrated_params_many(
+                [
+                    (wf_module1, module_zipfile),
+                    (wf_module2, module_zipfile),
+                    (wf_module3, module_zipfile),
+                ]
+            )
+        self.assertEqual(
+            result,
+            {
+                wf_module1.id: {"foo": "A"},
+                wf_module2.id: {"foo": "B"},
+                wf_module3.id: {"foo": "c"},
+            },
+        )
+        self.kernel.migrate_params_many.assert_called_once()
+        self.kernel.migrate_params.assert_not_called()
+        # and assert we've cached things
+        wf_module2.refresh_from_db()
+        self.assertEqual(wf_module2.cached_migrated_params, {"foo": "B"})
+        self.assertEqual(
+            wf_module2.cached_migrated_params_module_version, module_zipfile.version
+        )
+
+    def test_module_error_returns_error_for_only_failed_wf_module(self):
+        workflow = Workflow.create_and_init()
+        module_zipfile = create_module_zipfile(
+            "yay", spec_kwargs={"parameters": [{"id_name": "foo", "type": "string"}]}
+        )
+        tab = workflow.tabs.first()
+        wf_module1 = tab.wf_modules.create(
+            order=0, module_id_name="yay", params={"foo": "ok"}
+        )
+        wf_module2 = tab.wf_modules.create(
+            order=1, module_id_name="yay", params={"foo": "bad"}
+        )
+
+        def migrate_params(compiled_module, params):
+            if params["foo"] == "bad":
+                raise ModuleError
+            return params
+
+        self.kernel.migrate_params.side_effect = migrate_params
+        with self.assertLogs(level=logging.INFO):
+            result = get_migrated_params_many(
+                [(wf_module1, module_zipfile), (wf_module2, module_zipfile)]
+            )
+        self.assertEqual(result[wf_module1.id], {"foo": "ok"})
+        self.assertIsInstance(result[wf_module2.id], ModuleError)
+        # One kernel call -- no per-step retries
+        self.kernel.migrate_params_many.assert_called_once()
+        wf_module2.refresh_from_db()
+        self.assertIsNone(wf_module2.cached_migrated_params)
+
+    def test_kernel_error_bisects_to_failed_wf_module(self):
+        workflow = Workflow.create_and_init()
+        module_zipfile = create_module_zipfile(
+            "yay", spec_kwargs={"parameters": [{"id_name": "foo", "type": "string"}]}
+        )
+        tab = workflow.tabs.first()
+        wf_modules = [
+            tab.wf_modules.create(order=i, module_id_name="yay", params={"foo": foo})
+            for i, foo in enumerate(["a", "b", "bad", "d"])
+        ]
+
+        def migrate_params_many(compiled_module, params_list):
+            # Simulate a timeout: the whole child dies
+            if {"foo": "bad"} in params_list:
+                raise ModuleError
+            return params_list
+
+        self.kernel.migrate_params_many.side_effect = migrate_params_many
+        with self.assertLogs(level=logging.INFO):
+            result = get_migrated_params_many(
+                [(wf_module, module_zipfile) for wf_module in wf_modules]
+            )
+        self.assertEqual(result[wf_modules[0].id], {"foo": "a"})
+        self.assertEqual(result[wf_modules[1].id], {"foo": "b"})
+        self.assertIsInstance(result[wf_modules[2].id], ModuleError)
+        self.assertEqual(result[wf_modules[3].id], {"foo": "d"})
+        # [a, b, bad, d] => [a, b] + [bad, d] => [bad] + [d]
+        self.assertEqual(self.kernel.migrate_params_many.call_count, 5)
@@ -10,7 +10,8 @@ from django.db import connection, connections
 from django.contrib.auth.models import User
 from django.test import SimpleTestCase
 from cjworkbench.sync import WorkbenchDatabaseSyncToAsync
-from cjwstate import minio
+from cjwkernel.errors import ModuleError
+from cjwstate import minio, rendercache, storedobjects
 from cjwstate.models.module_version import ModuleVersion
 from cjwstate.models.module_registry import MODULE_REGISTRY
 import cjwstate.modules
@@ -121,6 +122,19 @@ class DbTestCaseWithModuleRegistryAndMockKernel(DbTestCase):
         # `self.kernel.migrate_params.side_effect = lambda m, p: p`, then
         # callers couldn't use `self.kernel.migrate_params.return_value = ...`
         self.kernel.migrate_params.return_value = {}
+        # migrate_params_many() delegates to migrate_params(), so tests need
+        # only mock the latter. Like the real kernel, it returns (rather than
+        # raises) each params' ModuleError.
+        def migrate_params_many(compiled_module, params_list):
+            results = []
+            for params in params_list:
+                try:
+                    results.append(self.kernel.migrate_params(compiled_module, params))
+                except ModuleError as err:
+                    results.append(err)
+            return results
+
+        self.kernel.migrate_params_many.side_effect = migrate_params_many
         # No default implementation of self.kernel.fetch
         # No default implementation of self.kernel.render
 
@@ -241,3 +255,8 @@ def clear_minio():
 
     for bucket in buckets:
         minio.remove_recursive(bucket, "/", force=True)
+
+    # Local caches mirror minio. Reset them, too.
+    rendercache.io.LOCAL_CACHE.clear()
+    rendercache.io.ARROW_CACHE.clear()
+    storedobjects.io.LOCAL_CACHE.clear()
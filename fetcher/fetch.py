@@ -9,8 +9,9 @@ from typing import Any, ContextManager, Dict, List, NamedTuple, Optional, Union
 from django.conf import settings
 from django.db import DatabaseError, InterfaceError
 from django.utils import timezone
-from cjwkernel.chroot import EDITABLE_CHROOT, ChrootContext
+from cjwkernel.chroot import EDITABLE_CHROOT_POOL, ChrootContext
 from cjwkernel.errors import ModuleError, format_for_user_debugging
+from cjwkernel.kernel import KernelTiming
 from cjwkernel.types import FetchResult, I18nMessage, Params, RenderError, TableMetadata
 from cjworkbench.sync import database_sync_to_async
 from cjwstate.models import CachedRenderResult, StoredObject, WfModule, Workflow
@@ -52,6 +53,7 @@ def invoke_fetch(
     logger.info("%s:fetch() begin", module_zipfile.path.name)
     compiled_module = module_zipfile.compile_code_without_executing()
 
+    timing = KernelTiming()
     try:
         ret = cjwstate.modules.kernel.fetch(
             compiled_module=compiled_module,
@@ -62,6 +64,7 @@ def invoke_fetch(
             last_fetch_result=last_fetch_result,
             input_parquet_filename=input_parquet_filename,
             output_filename=output_filename,
+            timing=timing,
         )
         status = "%0.1fMB" % (ret.path.stat().st_size / 1024 / 1024)
         return ret
@@ -72,10 +75,12 @@ def invoke_fetch(
     finally:
         time2 = time.time()
         logger.info(
-            "%s:fetch() => %s in %dms",
+            "%s:fetch() => %s in %dms [%s]",
             module_zipfile.path.name,
             status,
             int((time2 - time1) * 1000),
+            timing,
+            extra={"metrics": {"kernel_fetch": timing.as_metrics()}},
         )
 
 
@@ -95,7 +100,7 @@ DatabaseObjects = NamedTuple(
 def load_database_objects(workflow_id: int, wf_module_id: int) -> DatabaseObjects:
     """
     Query WfModule info.
-    
+
     Raise `WfModule.DoesNotExist` or `Workflow.DoesNotExist` if the step was
     deleted.
 
@@ -350,21 +355,21 @@ def crash_on_database_error() -> ContextManager[None]:
     Yield, and if the inner block crashes, sys._exit(1).
 
     DatabaseError and InterfaceError from Django can mean:
-    
+
     1. There's a bug in fetch() or its deps. Such bugs can permanently break
     the event loop's executor thread's database connection.
     [2018-11-06 saw this on production.] The best way to clear up the leaked,
     broken connection is to die. (Our parent process should restart us, and
     RabbitMQ will give the job to someone else.)
-    
+
     2. The database connection died (e.g., Postgres went away.) This should
     be rare -- e.g., when upgrading the database -- and it's okay to email us
     and die in this case. (Our parent process should restart us, and RabbitMQ
     will give the job to someone else.)
-    
+
     3. There's some design flaw we haven't thought of, and we shouldn't ever
     render this workflow. If this is the case, we're doomed.
-    
+
     If you're seeing this error that means there's a bug somewhere _else_. If
     you're staring at a case-3 situation, please remember that cases 1 and 2
     are important, too.
@@ -427,46 +432,59 @@ async def fetch(
     if now is None:
         now = timezone.now()
 
-    with contextlib.ExitStack() as ctx:
-        chroot_context = ctx.enter_context(EDITABLE_CHROOT.acquire_context())
-        basedir = ctx.enter_context(chroot_context.tempdir_context(prefix="fetch-"))
-        output_path = ctx.enter_context(
-            chroot_context.tempfile_context(prefix="fetch-result-", dir=basedir)
-        )
-        # get last_fetch_result (This can't error.)
-        last_fetch_result = _stored_object_to_fetch_result(
-            ctx, stored_object, wf_module.fetch_errors, dir=basedir
-        )
-        result = await asyncio.get_event_loop().run_in_executor(
-            None,
-            fetch_or_wrap_error,
-            ctx,
-            chroot_context,
-            basedir,
-            wf_module.module_id_name,
-            module_zipfile,
-            migrated_params,
-            secrets,
-            last_fetch_result,
-            input_crr,
-            output_path,
-        )
+    async with EDITABLE_CHROOT_POOL.acquire_context_async() as chroot_context:
+        with contextlib.ExitStack() as ctx:
+            basedir = ctx.enter_context(chroot_context.tempdir_context(prefix="fetch-"))
+            output_path = ctx.enter_context(
+                chroot_context.tempfile_context(prefix="fetch-result-", dir=basedir)
+            )
+            # get last_fetch_result (This can't error.)
+            last_fetch_result = _stored_object_to_fetch_result(
+                ctx, stored_object, wf_module.fetch_errors, dir=basedir
+            )
+            result = await asyncio.get_event_loop().run_in_executor(
+                None,
+                fetch_or_wrap_error,
+                ctx,
+                chroot_context,
+                basedir,
+                wf_module.module_id_name,
+                module_zipfile,
+                migrated_params,
+                secrets,
+                last_fetch_result,
+                input_crr,
+                output_path,
+            )
 
-        try:
-            with crash_on_database_error():
-                if last_fetch_result is not None and versions.are_fetch_results_equal(
-                    last_fetch_result, result
-                ):
-                    await save.mark_result_unchanged(workflow_id, wf_module, now)
-                else:
-                    await save.create_result(workflow_id, wf_module, result, now)
-        except asyncio.CancelledError:
-            raise
-        except Exception:
-            # Log exceptions but keep going.
-            # TODO [adamhooper, 2019-09-12] really? I think we don't want this.
-            # Make `fetch.save() robust, then nix this handler
-            logger.exception(f"Error fetching {wf_module}")
+            # Hash once: we use it to compare and we store it.
+            result_hash = await asyncio.get_event_loop().run_in_executor(
+                None, storedobjects.hash_file, result.path
+            )
+
+            try:
+                with crash_on_database_error():
+                    if (
+                        last_fetch_result is not None
+                        and versions.are_fetch_results_equal(
+                            result,
+                            last_fetch_result,
+                            new_hash=result_hash,
+                            old_hash=stored_object.hash,
+                        )
+                    ):
+                        await save.mark_result_unchanged(workflow_id, wf_module, now)
+                    else:
+                        await save.create_result(
+                            workflow_id, wf_module, result, now, hash=result_hash
+                        )
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Log exceptions but keep going.
+                # TODO [adamhooper, 2019-09-12] really? I think we don't want this.
+                # Make `fetch.save() robust, then nix this handler
+                logger.exception(f"Error fetching {wf_module}")
 
     with crash_on_database_error():
         await update_next_update_time(workflow_id, wf_module, now)
@@ -1,4 +1,5 @@
 import contextlib
+from typing import Optional
 from django.utils import timezone
 from cjworkbench.sync import database_sync_to_async
 from cjwkernel.types import FetchResult
@@ -42,7 +43,11 @@ async def _notify_websockets(workflow_id: int, wf_module: WfModule) -> None:
 
 @database_sync_to_async
 def _do_create_result(
-    workflow_id: int, wf_module: WfModule, result: FetchResult, now: timezone.datetime
+    workflow_id: int,
+    wf_module: WfModule,
+    result: FetchResult,
+    now: timezone.datetime,
+    hash: Optional[str],
 ) -> None:
     """
     Do database manipulations for create_result().
@@ -56,7 +61,7 @@ def _do_create_result(
     """
     with _locked_wf_module(workflow_id, wf_module):
         storedobjects.create_stored_object(
-            workflow_id, wf_module.id, result.path, stored_at=now
+            workflow_id, wf_module.id, result.path, stored_at=now, hash=hash
         )
         storedobjects.enforce_storage_limits(wf_module)
 
@@ -67,11 +72,19 @@ def _do_create_result(
 
 
 async def create_result(
-    workflow_id: int, wf_module: WfModule, result: FetchResult, now: timezone.datetime
+    workflow_id: int,
+    wf_module: WfModule,
+    result: FetchResult,
+    now: timezone.datetime,
+    *,
+    hash: Optional[str] = None,
 ) -> None:
     """
     Store fetched table as storedobject..
 
+    `hash` is `storedobjects.hash_file(result.path)`, if the caller computed
+    it already.
+
     Set `fetch_errors` to `result.errors`. Set `is_busy` to `False`. Set
     `last_update_check`.
 
@@ -84,7 +97,7 @@ async def create_result(
     No-op if `workflow` or `wf_module` has been deleted.
     """
     try:
-        await _do_create_result(workflow_id, wf_module, result, now)
+        await _do_create_result(workflow_id, wf_module, result, now, hash)
     except (WfModule.DoesNotExist, Workflow.DoesNotExist):
         return  # there's nothing more to do
 
@@ -10,7 +10,7 @@ from unittest.mock import patch
 from dateutil import parser
 from django.utils import timezone
 import pyarrow.parquet
-from cjwkernel.chroot import EDITABLE_CHROOT
+from cjwkernel.chroot import EDITABLE_CHROOT_POOL
 from cjwkernel.errors import ModuleExitedError
 from cjwkernel.types import (
     Column,
@@ -210,7 +210,9 @@ class FetchOrWrapErrorTests(DbTestCaseWithModuleRegistryAndMockKernel):
     def setUp(self):
         super().setUp()
         self.ctx = contextlib.ExitStack()
-        self.chroot_context = self.ctx.enter_context(EDITABLE_CHROOT.acquire_context())
+        self.chroot_context = self.ctx.enter_context(
+            EDITABLE_CHROOT_POOL.acquire_context()
+        )
         self.basedir = self.ctx.enter_context(self.chroot_context.tempdir_context())
         self.output_path = self.ctx.enter_context(
             self.chroot_context.tempfile_context(dir=self.basedir)
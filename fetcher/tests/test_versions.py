@@ -88,3 +88,51 @@ class DiffTest(unittest.TestCase):
                 FetchResult(self.old_path), FetchResult(self.new_path)
             )
         )
+
+    def test_same_hash_does_not_read_files(self):
+        # Files differ (one is missing, even), but hashes say they're equal
+        self.old_path.unlink()
+        self.assertTrue(
+            are_fetch_results_equal(
+                FetchResult(self.old_path),
+                FetchResult(self.new_path),
+                new_hash="a" * 64,
+                old_hash="a" * 64,
+            )
+        )
+
+    def test_different_hash_does_not_read_files(self):
+        self.old_path.unlink()
+        self.assertFalse(
+            are_fetch_results_equal(
+                FetchResult(self.old_path),
+                FetchResult(self.new_path),
+                new_hash="a" * 64,
+                old_hash="b" * 64,
+            )
+        )
+
+    def test_different_hash_parquet_compares_values(self):
+        # Legacy Parquet files may hold equal values with different bytes
+        cjwparquet.write(self.old_path, arrow_table({"A": [1]}).table)
+        cjwparquet.write(self.new_path, arrow_table({"A": [1]}).table)
+        self.assertTrue(
+            are_fetch_results_equal(
+                FetchResult(self.old_path),
+                FetchResult(self.new_path),
+                new_hash="a" * 64,
+                old_hash="b" * 64,
+            )
+        )
+
+    def test_unhashed_compares_bytes(self):
+        self.old_path.write_bytes(b"12304987kljnmfe092394hkljdfs")
+        self.new_path.write_bytes(b"12304987kljnmfe092394hkljdfs")
+        self.assertTrue(
+            are_fetch_results_equal(
+                FetchResult(self.old_path),
+                FetchResult(self.new_path),
+                new_hash="a" * 64,
+                old_hash="unhashed",
+            )
+        )
@@ -1,4 +1,6 @@
 from pathlib import Path
+import re
+from typing import Optional
 import cjwparquet
 from cjwkernel.types import FetchResult
 
@@ -9,6 +11,9 @@ _BUFFER_SIZE = 1024 * 1024
 _is_parquet_path = cjwparquet.file_has_parquet_magic_number
 
 
+_SHA256_HEX = re.compile(r"\A[0-9a-f]{64}\Z")
+
+
 def _are_file_contents_equal(path1: Path, path2: Path) -> bool:
     """
     Return whether both paths are byte-for-byte equal.
@@ -30,7 +35,13 @@ def _are_file_contents_equal(path1: Path, path2: Path) -> bool:
                     return True
 
 
-def are_fetch_results_equal(new_result: FetchResult, old_result: FetchResult) -> bool:
+def are_fetch_results_equal(
+    new_result: FetchResult,
+    old_result: FetchResult,
+    *,
+    new_hash: Optional[str] = None,
+    old_hash: Optional[str] = None,
+) -> bool:
     """
     Determine whether `new_result` is worth saving in the database.
 
@@ -59,19 +70,40 @@ def are_fetch_results_equal(new_result: FetchResult, old_result: FetchResult) ->
     save. Basically, we _guess_ whether the render result given `new_result` as
     input will be the same as the render result given `old_result` as input.
 
+    `new_hash` and `old_hash` are `storedobjects.hash_file()` digests, if
+    known. (`old_hash` comes from `StoredObject.hash`, which is not a digest
+    for objects stored long ago.)
+
     Heuristics:
 
         1. If errors are different, the results are different.
-        2. If the render result is a Parquet file (legacy fetch retval),
+        2. If the hashes are equal, the results are equal.
+        3. If the render result is a Parquet file (legacy fetch retval),
            compare schemas and values in the two Parquet files; return the
-           result.
-        3. Otherwise, compare file contents of the two files on disk; return
+           result. (Equal values can have different bytes.)
+        4. If both hashes are known, they differ: the results are different.
+        5. Otherwise, compare file contents of the two files on disk; return
            the result.
+
+    With hashes, the common cases -- "same bytes" and "different bytes" --
+    don't read either file.
     """
     if new_result.errors != old_result.errors:
         return False
 
+    hashes_known = (
+        new_hash is not None
+        and old_hash is not None
+        and _SHA256_HEX.match(new_hash) is not None
+        and _SHA256_HEX.match(old_hash) is not None
+    )
+
+    if hashes_known and new_hash == old_hash:
+        return True
+
     if _is_parquet_path(old_result.path) and _is_parquet_path(new_result.path):
         return cjwparquet.are_files_equal(old_result.path, new_result.path)
+    elif hashes_known:
+        return False
     else:
         return _are_file_contents_equal(old_result.path, new_result.path)
@@ -2,15 +2,24 @@ from dataclasses import dataclass
 from itertools import cycle
 import logging
 from pathlib import Path
-from typing import Any, Dict, List, Optional, FrozenSet
+from typing import Any, Dict, List, Optional, FrozenSet, Tuple
 from cjworkbench.sync import database_sync_to_async
 from cjwkernel.chroot import ChrootContext
 from cjwkernel.types import RenderResult, Tab
-from cjwstate.rendercache import load_cached_render_result, CorruptCacheError
+from cjwstate.rendercache import (
+    fingerprint_render_result,
+    load_cached_render_result,
+    CorruptCacheError,
+)
 from cjwstate.models import WfModule, Workflow
 from cjwstate.modules.param_dtype import ParamDType
 from cjwstate.modules.types import ModuleZipfile
-from .wf_module import execute_wfmodule, locked_wf_module
+from .wf_module import (
+    SavePipeline,
+    execute_wfmodule,
+    locked_wf_module,
+    restamp_wfmodule_if_input_unchanged,
+)
 
 
 logger = logging.getLogger(__name__)
@@ -117,14 +126,17 @@ class TabFlow:
 @database_sync_to_async
 def _load_step_output_from_rendercache(
     workflow: Workflow, step: WfModule, path: Path
-) -> RenderResult:
+) -> Tuple[RenderResult, Optional[str]]:
+    """
+    Return `(result, result_fingerprint)` from the render cache.
+    """
     # raises UnneededExecution
     with locked_wf_module(workflow, step) as safe_step:
         crr = safe_step.cached_render_result
         assert crr is not None  # otherwise we'd have raised UnneededExecution
 
         # Read the entire input Parquet file. Raise CorruptCacheError.
-        return load_cached_render_result(crr, path)
+        return load_cached_render_result(crr, path), crr.fingerprint
 
 
 async def execute_tab_flow(
@@ -204,7 +216,10 @@ async def execute_tab_flow(
                 wf_module = flow.steps[step_index].wf_module
                 try:
                     # raise CorruptCacheError, UnneededExecution
-                    last_result = await _load_step_output_from_rendercache(
+                    (
+                        last_result,
+                        last_fingerprint,
+                    ) = await _load_step_output_from_rendercache(
                         workflow, wf_module, step_output_path
                     )
                     # `last_result` will be the input into steps[step_index]
@@ -224,21 +239,46 @@ async def execute_tab_flow(
             # but if it did, it would be `next(step_output_paths)`.
             next(step_output_paths)
             last_result = RenderResult()
+            last_fingerprint = fingerprint_render_result(last_result)
             step_index = 0  # needed when there are no steps at all
 
-        for step, step_output_path in zip(flow.steps[step_index:], step_output_paths):
-            step_output_path.write_bytes(b"")  # don't leak data from two steps ago
-            next_result = await execute_wfmodule(
-                chroot_context=chroot_context,
-                workflow=workflow,
-                wf_module=step.wf_module,
-                module_zipfile=step.module_zipfile,
-                params=step.params,
-                tab=flow.tab,
-                input_result=last_result,
-                tab_results=tab_results,
-                output_path=step_output_path,
-            )
-            last_result = next_result
+        # Upload each step's output while rendering the next step.
+        async with SavePipeline() as save_pipeline:
+            for step, step_output_path in zip(
+                flow.steps[step_index:], step_output_paths
+            ):
+                step_output_path.write_bytes(b"")  # don't leak data from two steps ago
+
+                # If this step's input, params and such are unchanged since its
+                # last render, reuse that render's output. (Say an auto-update
+                # fetch returned the same data as last time: every step after it
+                # will be reused.)
+                if step.wf_module.cached_render_result_input_fingerprint is not None:
+                    reused = await restamp_wfmodule_if_input_unchanged(
+                        workflow=workflow,
+                        wf_module=step.wf_module,
+                        module_zipfile=step.module_zipfile,
+                        params=step.params,
+                        tab=flow.tab,
+                        input_result_fingerprint=last_fingerprint,
+                        output_path=step_output_path,
+                    )
+                    if reused is not None:
+                        last_result, last_fingerprint = reused
+                        continue
+
+                last_result, last_fingerprint = await execute_wfmodule(
+                    chroot_context=chroot_context,
+                    workflow=workflow,
+                    wf_module=step.wf_module,
+                    module_zipfile=step.module_zipfile,
+                    params=step.params,
+                    tab=flow.tab,
+                    input_result=last_result,
+                    tab_results=tab_results,
+                    output_path=step_output_path,
+                    input_result_fingerprint=last_fingerprint,
+                    save_pipeline=save_pipeline,
+                )
 
         return last_result
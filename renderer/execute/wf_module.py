@@ -2,14 +2,25 @@ import asyncio
 from collections import namedtuple
 import contextlib
 import datetime
-from functools import partial
+from functools import lru_cache, partial
+import hashlib
+import importlib.util
 import logging
 from pathlib import Path
 import time
-from typing import Any, Dict, NamedTuple, Optional
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+from django.conf import settings
+import numpy as np
+import pandas as pd
+import pyarrow
 from cjworkbench.sync import database_sync_to_async
 from cjwkernel.chroot import ChrootContext
-from cjwkernel.errors import ModuleError, format_for_user_debugging
+from cjwkernel.errors import (
+    ModuleError,
+    ModuleMemoryExceededError,
+    format_for_user_debugging,
+)
+from cjwkernel.kernel import KernelTiming
 from cjwkernel.types import (
     ArrowTable,
     FetchResult,
@@ -19,10 +30,12 @@ from cjwkernel.types import (
     RenderResult,
     Tab,
 )
-from cjwkernel.util import tempfile_context
-from cjwstate import clientside, minio, rabbitmq, rendercache
-from cjwstate.models import StoredObject, WfModule, Workflow
+from cjwkernel.util import json_encode, tempfile_context
+from cjwstate import clientside, rabbitmq, rendercache, storedobjects
+from cjwstate.models import CachedRenderResult, StoredObject, WfModule, Workflow
+from cjwstate.models.StoredObject import is_blob_key
 import cjwstate.modules
+from cjwstate.modules.param_dtype import ParamDType
 from cjwstate.modules.types import ModuleZipfile
 from renderer import notifications
 from .types import (
@@ -37,9 +50,107 @@ from . import renderprep
 logger = logging.getLogger(__name__)
 
 
+KERNEL_SOURCE_PACKAGES = ["cjwkernel", "cjwmodule", "cjwparse"]
+"""
+Packages outside module zipfiles whose code shapes render() output.
+
+`cjwkernel.pandas` calls render() and coerces its return value; modules
+call `cjwmodule` and `cjwparse` helpers. See `kernel_version()`.
+"""
+
+
+@lru_cache(1)
+def kernel_version() -> str:
+    """
+    Hash the code, outside module zipfiles, that shapes render() output.
+
+    That's the source of `KERNEL_SOURCE_PACKAGES` plus the versions of
+    numpy, pandas and pyarrow. Every render-cache key includes this, so a
+    deploy that fixes a bug in the kernel or a parser never reuses output
+    the buggy code produced. (Old "content/" entries are never read again;
+    the bucket's expiry rule deletes them.)
+    """
+    sha1 = hashlib.sha1()
+    sha1.update(
+        json_encode([np.__version__, pd.__version__, pyarrow.__version__]).encode(
+            "utf-8"
+        )
+    )
+    for package in KERNEL_SOURCE_PACKAGES:
+        spec = importlib.util.find_spec(package)
+        if spec is None or spec.origin is None:
+            sha1.update(b"%s:missing" % package.encode("utf-8"))
+            continue
+        root = Path(spec.origin).parent
+        for path in sorted(root.rglob("*.py")):
+            relative_path = path.relative_to(root)
+            if "tests" in relative_path.parts:
+                continue
+            filename = ("%s/%s" % (package, relative_path)).encode("utf-8")
+            data = path.read_bytes()
+            sha1.update(b"%d:%s%d:" % (len(filename), filename, len(data)))
+            sha1.update(data)
+    return sha1.hexdigest()
+
+
 SaveResult = namedtuple("SaveResult", ["cached_render_result", "maybe_delta"])
 
 
+class SavePipeline:
+    """
+    Runs one step's cache upload in the background while the next renders.
+
+    Usage:
+
+        async with SavePipeline() as save_pipeline:
+            for step in steps:
+                await execute_wfmodule(..., save_pipeline=save_pipeline)
+
+    At most one save runs at a time, so saves happen in step order and we
+    never have more than one step's Parquet file waiting on disk.
+
+    When the block exits normally, we wait for the last save and raise its
+    error (usually UnneededExecution). When the block raises, we still wait
+    for the last save -- it holds tempfiles -- but we log its error instead.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Future] = None
+
+    async def start(self, coroutine) -> None:
+        """
+        Wait for the previous save (raising its error); then start `coroutine`.
+        """
+        try:
+            await self.wait()
+        except BaseException:
+            coroutine.close()  # never awaited
+            raise
+        self._task = asyncio.ensure_future(coroutine)
+
+    async def wait(self) -> None:
+        """
+        Wait for the current save, if there is one; raise its error.
+        """
+        task, self._task = self._task, None
+        if task is not None:
+            await task
+
+    async def __aenter__(self) -> "SavePipeline":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            await self.wait()
+        else:
+            try:
+                await self.wait()
+            except UnneededExecution:
+                pass
+            except Exception:
+                logger.exception("Ignoring error from background save")
+
+
 @contextlib.contextmanager
 def locked_wf_module(workflow, wf_module):
     """
@@ -73,8 +184,21 @@ def locked_wf_module(workflow, wf_module):
     return retval
 
 
+def _get_selected_stored_object(wf_module: WfModule) -> Optional[StoredObject]:
+    """
+    Return the user-selected StoredObject, or `None` if there isn't one.
+    """
+    try:
+        return wf_module.stored_objects.get(stored_at=wf_module.stored_data_version)
+    except StoredObject.DoesNotExist:
+        return None
+
+
 def _load_fetch_result(
-    wf_module: WfModule, basedir: Path, exit_stack: contextlib.ExitStack
+    wf_module: WfModule,
+    stored_object: Optional[StoredObject],
+    basedir: Path,
+    exit_stack: contextlib.ExitStack,
 ) -> Optional[FetchResult]:
     """
     Download user-selected StoredObject to `basedir`, so render() can read it.
@@ -88,13 +212,7 @@ def _load_fetch_result(
     The caller should ensure "leave `path` alone" means "return an empty
     FetchResult". The FetchResult may still have an error.
     """
-    try:
-        stored_object = wf_module.stored_objects.get(
-            stored_at=wf_module.stored_data_version
-        )
-    except StoredObject.DoesNotExist:
-        return None
-    if not stored_object.key:
+    if stored_object is None or not stored_object.key:
         return None
 
     with contextlib.ExitStack() as inner_stack:
@@ -103,7 +221,7 @@ def _load_fetch_result(
         )
 
         try:
-            minio.download(minio.StoredObjectsBucket, stored_object.key, path)
+            storedobjects.download(stored_object, path)
             # Download succeeded, so we no longer want to delete `path`
             # right _now_ ("now" means, "in inner_stack.close()"). Instead,
             # transfer ownership of `path` to exit_stack.
@@ -126,25 +244,184 @@ def _load_fetch_result(
     return FetchResult(path, wf_module.fetch_errors)
 
 
-def _wrap_render_errors(render_call):
+def fingerprint_render_input(
+    wf_module: WfModule,
+    module_zipfile: Optional[ModuleZipfile],
+    params: Dict[str, Any],
+    tab: Tab,
+    input_result_fingerprint: Optional[str],
+) -> Optional[str]:
+    """
+    Hash everything `wf_module`'s render() will read.
+
+    If two renders have the same input fingerprint, the second render is
+    pointless: it will produce the same output as the first.
+
+    Return `None` if we can't tell what render() will read. That happens when
+    the step has tab params (we don't fingerprint other tabs' outputs), when
+    the module is deleted, when the module's code can change without its
+    version changing ("develop"), or when we don't know the input's
+    fingerprint.
+    """
+    if (
+        input_result_fingerprint is None
+        or module_zipfile is None
+        or module_zipfile.version == "develop"
+    ):
+        return None
+
+    schema = module_zipfile.get_spec().get_param_schema()
+    if any(
+        isinstance(dtype, (ParamDType.Tab, ParamDType.Multitab))
+        for dtype in schema.iter_dfs_dtypes()
+    ):
+        return None
+
     try:
-        return render_call()
-    except ModuleError as err:
+        json_bytes = json_encode(
+            [
+                input_result_fingerprint,
+                kernel_version(),
+                module_zipfile.get_content_hash(),
+                params,
+                tab.slug,
+                tab.name,
+                (
+                    None
+                    if wf_module.stored_data_version is None
+                    else wf_module.stored_data_version.isoformat()
+                ),
+                repr(wf_module.fetch_errors),
+            ]
+        ).encode("utf-8")
+    except (TypeError, ValueError):
+        return None  # params aren't JSON-serializable. Weird, but legal.
+    return hashlib.sha1(json_bytes).hexdigest()
+
+
+def content_key_for_render(
+    wf_module: WfModule,
+    module_zipfile: ModuleZipfile,
+    params: Dict[str, Any],
+    tab: Tab,
+    input_result_fingerprint: Optional[str],
+    fetch_result_key: Optional[str],
+) -> Optional[str]:
+    """
+    Hash everything render() will read and run, in a way any workflow can share.
+
+    Unlike `fingerprint_render_input()`, this doesn't mention the workflow:
+    two steps in different workflows (or the same step, before an undo and
+    after a redo) have the same content key if they run the same module code
+    (on the same `kernel_version()`) with the same params on the same input
+    and fetch result.
+
+    `fetch_result_key` is the minio key of the fetch result render() will
+    read, or `None` if there is none.
+
+    Return `None` if we can't tell what render() will read. That happens when
+    the step has tab params or when we don't know the input's fingerprint.
+    """
+    if input_result_fingerprint is None:
+        return None
+
+    schema = module_zipfile.get_spec().get_param_schema()
+    if any(
+        isinstance(dtype, (ParamDType.Tab, ParamDType.Multitab))
+        for dtype in schema.iter_dfs_dtypes()
+    ):
+        return None
+
+    try:
+        json_bytes = json_encode(
+            [
+                kernel_version(),
+                module_zipfile.get_content_hash(),
+                params,
+                input_result_fingerprint,
+                fetch_result_key,
+                None if fetch_result_key is None else repr(wf_module.fetch_errors),
+                tab.name,
+            ]
+        ).encode("utf-8")
+    except (TypeError, ValueError):
+        return None  # params aren't JSON-serializable. Weird, but legal.
+    return hashlib.sha1(json_bytes).hexdigest()
+
+
+def parse_key_for_render(
+    wf_module: WfModule,
+    module_zipfile: ModuleZipfile,
+    params: Dict[str, Any],
+    stored_object: Optional[StoredObject],
+) -> Optional[str]:
+    """
+    Hash everything a parse-only render() will read.
+
+    Some modules' render() just parses their fetch result (CSV, XLSX, JSON)
+    and ignores the input table. They declare `parse_fetch_result_params` in
+    their spec. Their output depends only on module code, kernel code (which
+    includes the cjwparse parsers -- see `kernel_version()`), those params and
+    the fetch result, so we can parse each fetched file once and reuse the
+    output across renders, undo/redo and duplicated workflows.
+
+    Return `None` if the module doesn't declare itself parse-only, or if the
+    fetch result isn't content-addressed (legacy keys have no `hash`).
+    """
+    parse_params = module_zipfile.get_spec().parse_fetch_result_params
+    if (
+        parse_params is None
+        or stored_object is None
+        or not stored_object.key
+        or not is_blob_key(stored_object.key)
+    ):
+        return None
+
+    try:
+        json_bytes = json_encode(
+            [
+                kernel_version(),
+                module_zipfile.get_content_hash(),
+                {name: params.get(name) for name in parse_params},
+                repr(wf_module.fetch_errors),
+            ]
+        ).encode("utf-8")
+    except (TypeError, ValueError):
+        return None  # params aren't JSON-serializable. Weird, but legal.
+    return rendercache.parsed_fetch_result_content_key(
+        stored_object.hash, hashlib.sha1(json_bytes).hexdigest()
+    )
+
+
+def _module_error_to_render_result(err: ModuleError) -> RenderResult:
+    if isinstance(err, ModuleMemoryExceededError):
+        # Not a bug: the user asked for more than we can handle
         return RenderResult(
             errors=[
                 RenderError(
                     I18nMessage.trans(
-                        "py.renderer.execute.wf_module.user_visible_bug_during_render",
-                        default="Something unexpected happened. We have been notified and are "
-                        "working to fix it. If this persists, contact us. Error code: {message}",
-                        args={"message": format_for_user_debugging(err)},
+                        "py.renderer.execute.wf_module.ModuleMemoryExceededError",
+                        default="This step ran out of memory: its data is too big. "
+                        "Try removing rows or columns in earlier steps.",
                     )
                 )
             ]
         )
+    return RenderResult(
+        errors=[
+            RenderError(
+                I18nMessage.trans(
+                    "py.renderer.execute.wf_module.user_visible_bug_during_render",
+                    default="Something unexpected happened. We have been notified and are "
+                    "working to fix it. If this persists, contact us. Error code: {message}",
+                    args={"message": format_for_user_debugging(err)},
+                )
+            )
+        ]
+    )
 
 
-def invoke_render(
+async def invoke_render(
     module_zipfile: ModuleZipfile,
     *,
     chroot_context: ChrootContext,
@@ -162,8 +439,8 @@ def invoke_render(
 
     Log any ModuleError. Also log success.
 
-    This synchronous method can be slow for complex modules or large
-    datasets. Consider calling it from an executor.
+    This can be slow for complex modules or large datasets. We await the
+    module on the event loop, so other work can proceed meanwhile.
     """
     time1 = time.time()
     begin_status_format = "%s:render() (%d rows, %d cols, %0.1fMB)"
@@ -175,8 +452,9 @@ def invoke_render(
     )
     logger.info(begin_status_format + " begin", *begin_status_args)
     status = "???"
+    timing = KernelTiming()
     try:
-        result = cjwstate.modules.kernel.render(
+        result = await cjwstate.modules.kernel.render_async(
             module_zipfile.compile_code_without_executing(),
             chroot_context=chroot_context,
             basedir=basedir,
@@ -185,6 +463,7 @@ def invoke_render(
             tab=tab,
             fetch_result=fetch_result,
             output_filename=output_filename,
+            timing=timing,
         )
         status = "(%drows, %dcols, %0.1fMB)" % (
             result.table.metadata.n_rows,
@@ -200,16 +479,22 @@ def invoke_render(
         time2 = time.time()
 
         logger.info(
-            begin_status_format + " => %s in %dms",
+            begin_status_format + " => %s in %dms [%s]",
             *begin_status_args,
             status,
             int((time2 - time1) * 1000),
+            timing,
+            extra={"metrics": {"kernel_render": timing.as_metrics()}},
         )
 
 
 class ExecuteStepPreResult(NamedTuple):
     fetch_result: Optional[FetchResult]
     params: Dict[str, Any]
+    content_key: Optional[str]
+    """
+    Key for `rendercache.load_content_render_result()`, or `None`.
+    """
 
 
 @database_sync_to_async
@@ -220,7 +505,9 @@ def _execute_wfmodule_pre(
     wf_module: WfModule,
     module_zipfile: ModuleZipfile,
     raw_params: Dict[str, Any],
+    tab: Tab,
     input_table: ArrowTable,
+    input_result_fingerprint: Optional[str],
     tab_results: Dict[Tab, Optional[RenderResult]],
 ) -> ExecuteStepPreResult:
     """
@@ -242,7 +529,10 @@ def _execute_wfmodule_pre(
     """
     # raises UnneededExecution
     with locked_wf_module(workflow, wf_module) as safe_wf_module:
-        fetch_result = _load_fetch_result(safe_wf_module, basedir, exit_stack)
+        stored_object = _get_selected_stored_object(safe_wf_module)
+        fetch_result = _load_fetch_result(
+            safe_wf_module, stored_object, basedir, exit_stack
+        )
 
         module_spec = module_zipfile.get_spec()
         param_schema = module_spec.get_param_schema()
@@ -257,25 +547,50 @@ def _execute_wfmodule_pre(
         # raise TabCycleError, TabOutputUnreachableError, PromptingError
         params = renderprep.get_param_values(param_schema, raw_params, render_context)
 
-        return ExecuteStepPreResult(fetch_result, params)
+        if fetch_result is not None:
+            content_key = parse_key_for_render(
+                safe_wf_module, module_zipfile, raw_params, stored_object
+            )
+        else:
+            content_key = None
+        if content_key is None and settings.RENDERCACHE_CONTENT_ADDRESSED:
+            content_key = content_key_for_render(
+                safe_wf_module,
+                module_zipfile,
+                raw_params,
+                tab,
+                input_result_fingerprint,
+                None if fetch_result is None else stored_object.key,
+            )
+
+        return ExecuteStepPreResult(fetch_result, params, content_key)
 
 
 @database_sync_to_async
 def _execute_wfmodule_save(
-    workflow: Workflow, wf_module: WfModule, result: RenderResult
+    workflow: Workflow,
+    wf_module: WfModule,
+    prepared: rendercache.PreparedRenderResult,
+    result: Optional[RenderResult],
 ) -> SaveResult:
     """
-    Call rendercache.cache_render_result() and build notifications.OutputDelta.
+    Call rendercache.save_prepared_render_result() and build
+    notifications.OutputDelta.
+
+    `prepared` must already be uploaded. `result` is the RenderResult it was
+    prepared from, or `None` if its file may have been overwritten since (in
+    which case we won't compare it with the stale result, so we won't notify).
 
     All this runs synchronously within a database lock. (It's a separate
     function so that when we're done awaiting it, we can continue executing in
-    a context that doesn't use a database thread.)
+    a context that doesn't use a database thread.) The lock is short: we
+    don't encode or upload anything while holding it.
 
     Raise UnneededExecution if the WfModule has changed in the interim.
     """
     # raises UnneededExecution
     with locked_wf_module(workflow, wf_module) as safe_wf_module:
-        if safe_wf_module.notifications:
+        if safe_wf_module.notifications and result is not None:
             stale_crr = safe_wf_module.get_stale_cached_render_result()
             if stale_crr is None:
                 stale_result = None
@@ -298,9 +613,7 @@ def _execute_wfmodule_save(
         else:
             stale_result = None
 
-        rendercache.cache_render_result(
-            workflow, safe_wf_module, wf_module.last_relevant_delta_id, result
-        )
+        rendercache.save_prepared_render_result(workflow, safe_wf_module, prepared)
 
         if (
             safe_wf_module.notifications
@@ -331,12 +644,18 @@ async def _render_wfmodule(
     input_result: RenderResult,
     tab_results: Dict[Tab, Optional[RenderResult]],
     output_path: Path,
+    input_result_fingerprint: Optional[str],
 ) -> RenderResult:
     """
     Prepare and call `wf_module`'s `render()`; return a RenderResult.
 
     The actual render runs in a background thread so the event loop can process
     other events.
+
+    If `settings.RENDERCACHE_CONTENT_ADDRESSED`, skip the render when another
+    step already rendered the same content; and share this step's result
+    with later steps. Parse-only modules (see `parse_key_for_render()`) get
+    this treatment regardless of the setting.
     """
     basedir = output_path.parent
 
@@ -360,14 +679,16 @@ async def _render_wfmodule(
         try:
             # raise UnneededExecution, TabCycleError, TabOutputUnreachableError,
             # PromptingError
-            fetch_result, params = await _execute_wfmodule_pre(
+            fetch_result, params, content_key = await _execute_wfmodule_pre(
                 basedir,
                 exit_stack,
                 workflow,
                 wf_module,
                 module_zipfile,
                 raw_params,
+                tab,
                 input_result.table,
+                input_result_fingerprint,
                 tab_results,
             )
         except TabCycleError:
@@ -395,14 +716,24 @@ async def _render_wfmodule(
         except PromptingError as err:
             return RenderResult(errors=err.as_render_errors())
 
-        # Render may take a while. run_in_executor to push that slowdown to a
-        # thread and keep our event loop responsive.
         loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            None,
-            _wrap_render_errors,
-            partial(
-                invoke_render,
+
+        if content_key is not None:
+            cached_result = await loop.run_in_executor(
+                None, rendercache.load_content_render_result, content_key, output_path
+            )
+            if cached_result is not None:
+                logger.info(
+                    "%s:render() skipped: content key %s is cached",
+                    module_zipfile.path.name,
+                    content_key,
+                )
+                return cached_result
+
+        # Render may take a while. invoke_render() awaits the module on our
+        # event loop, so the loop stays responsive.
+        try:
+            result = await invoke_render(
                 module_zipfile,
                 chroot_context=chroot_context,
                 basedir=basedir,
@@ -411,8 +742,17 @@ async def _render_wfmodule(
                 tab=tab,
                 fetch_result=fetch_result,
                 output_filename=output_path.name,
-            ),
-        )
+            )
+        except ModuleError as err:
+            # Don't share this result: the error may be transient (e.g., the
+            # module ran out of memory or time).
+            return _module_error_to_render_result(err)
+
+        if content_key is not None:
+            await loop.run_in_executor(
+                None, rendercache.cache_content_render_result, content_key, result
+            )
+        return result
 
 
 async def execute_wfmodule(
@@ -425,10 +765,26 @@ async def execute_wfmodule(
     input_result: RenderResult,
     tab_results: Dict[Tab, Optional[RenderResult]],
     output_path: Path,
-) -> RenderResult:
+    *,
+    input_result_fingerprint: Optional[str] = None,
+    save_pipeline: Optional[SavePipeline] = None,
+) -> Tuple[RenderResult, str]:
     """
     Render a single WfModule; cache, broadcast and return output.
 
+    Return `(result, result_fingerprint)`, like
+    `restamp_wfmodule_if_input_unchanged()`. We hash `result` anyway to cache
+    it, so the caller needn't read its Arrow file again to fingerprint it.
+
+    `input_result_fingerprint` is `input_result`'s fingerprint, if the caller
+    knows it. We store it (mixed with params and such) so a later render can
+    call `restamp_wfmodule_if_input_unchanged()` instead of rendering. It also
+    keys the (optional) content-addressed render cache.
+
+    If `save_pipeline` is set, we may return before the output is uploaded
+    and saved: the upload runs in the background while the caller renders the
+    next step. The caller must wait for `save_pipeline` to finish.
+
     CONCURRENCY NOTES: This function is reasonably concurrency-friendly:
 
     * It returns a valid cache result immediately.
@@ -441,6 +797,8 @@ async def execute_wfmodule(
       sequence of `execute_wfmodule` -- and then change a param in a prior
       module, making all those calls obsolete.
     * It locks the workflow while collecting `render()` input data.
+    * It encodes and uploads results _before_ locking the workflow, so the lock
+      only covers a few database writes.
     * When writing results to the database, it avoids writing if the module has
       changed.
 
@@ -465,10 +823,68 @@ async def execute_wfmodule(
         input_result=input_result,
         tab_results=tab_results,
         output_path=output_path,
+        input_result_fingerprint=input_result_fingerprint,
     )
 
-    # may raise UnneededExecution
-    crr, output_delta = await _execute_wfmodule_save(workflow, wf_module, result)
+    # We compute this outside of the database lock. It uses the WfModule's
+    # fetch-result fields as they were when we queued the render; if they've
+    # changed since, so has last_relevant_delta_id, and we won't save.
+    input_fingerprint = fingerprint_render_input(
+        wf_module, module_zipfile, params, tab, input_result_fingerprint
+    )
+
+    # Encode Parquet outside of the database lock. After this, we don't read
+    # `output_path` any more.
+    loop = asyncio.get_event_loop()
+    prepared = await loop.run_in_executor(
+        None,
+        partial(
+            rendercache.prepare_render_result,
+            workflow.id,
+            wf_module.id,
+            wf_module.last_relevant_delta_id,
+            result,
+            input_fingerprint=input_fingerprint,
+        ),
+    )
+
+    if save_pipeline is None or wf_module.notifications:
+        # Notifications compare `result` with the stale result, so we can't
+        # let the caller overwrite `output_path` until we've saved.
+        await _upload_and_save(workflow, wf_module, prepared, result)
+    else:
+        # may raise UnneededExecution (from the _previous_ step's save)
+        await save_pipeline.start(_upload_and_save(workflow, wf_module, prepared))
+
+    return result, prepared.fields["cached_render_result_fingerprint"]
+
+
+async def _upload_and_save(
+    workflow: Workflow,
+    wf_module: WfModule,
+    prepared: rendercache.PreparedRenderResult,
+    result: Optional[RenderResult] = None,
+) -> None:
+    """
+    Upload `prepared`; make it the cached result; broadcast and notify.
+
+    Raise UnneededExecution if `wf_module` has changed. Either way, `prepared`
+    is cleaned up.
+    """
+    loop = asyncio.get_event_loop()
+    try:
+        await loop.run_in_executor(
+            None, rendercache.upload_prepared_render_result, prepared
+        )
+        # may raise UnneededExecution
+        crr, output_delta = await _execute_wfmodule_save(
+            workflow, wf_module, prepared, result
+        )
+    except BaseException:
+        await loop.run_in_executor(
+            None, rendercache.discard_prepared_render_result, prepared
+        )
+        raise
 
     update = clientside.Update(
         steps={
@@ -483,7 +899,6 @@ async def execute_wfmodule(
     # lock, because SMTP can be slow, and Django's email backend is
     # synchronous.
     if output_delta:
-        loop = asyncio.get_event_loop()
         await loop.run_in_executor(
             None,
             notifications.email_output_delta,
@@ -491,7 +906,118 @@ async def execute_wfmodule(
             datetime.datetime.now(),
         )
 
-    # TODO if there's no change, is it possible for us to skip the render
-    # of future modules, setting their cached_render_result_delta_id =
-    # last_relevant_delta_id?  Investigate whether this is worthwhile.
-    return result
+
+@database_sync_to_async
+def _restamp_wfmodule_if_input_unchanged(
+    workflow: Workflow,
+    wf_module: WfModule,
+    module_zipfile: Optional[ModuleZipfile],
+    params: Dict[str, Any],
+    tab: Tab,
+    input_result_fingerprint: Optional[str],
+    output_path: Path,
+) -> Optional[Tuple[RenderResult, CachedRenderResult]]:
+    input_fingerprint = fingerprint_render_input(
+        wf_module, module_zipfile, params, tab, input_result_fingerprint
+    )
+    if (
+        input_fingerprint is None
+        or input_fingerprint != wf_module.cached_render_result_input_fingerprint
+    ):
+        return None
+
+    stale_crr = wf_module.get_stale_cached_render_result()
+    if stale_crr is None:
+        return None
+    delta_id = wf_module.last_relevant_delta_id
+
+    # Download and copy outside of the database lock: they can be slow. If
+    # `wf_module` changes meanwhile, we'll notice under the lock.
+    try:
+        # raise CorruptCacheError
+        result = rendercache.load_cached_render_result(stale_crr, output_path)
+        rendercache.copy_stale_cached_render_result(stale_crr, delta_id)
+    except rendercache.CorruptCacheError:
+        logger.exception(
+            "Re-rendering wf-%d/wfm-%d after CorruptCacheError",
+            workflow.id,
+            wf_module.id,
+        )
+        return None
+
+    try:
+        # raises UnneededExecution
+        with locked_wf_module(workflow, wf_module) as safe_wf_module:
+            if (
+                safe_wf_module.cached_render_result_delta_id == stale_crr.delta_id
+                and safe_wf_module.cached_render_result_fingerprint
+                == stale_crr.fingerprint
+                and fingerprint_render_input(
+                    safe_wf_module,
+                    module_zipfile,
+                    params,
+                    tab,
+                    input_result_fingerprint,
+                )
+                == input_fingerprint
+            ):
+                rendercache.save_restamped_cached_render_result(
+                    workflow, safe_wf_module, stale_crr, delta_id
+                )
+                return result, safe_wf_module.cached_render_result
+    except BaseException:
+        rendercache.discard_restamped_cached_render_result(stale_crr, delta_id)
+        raise
+
+    # The cached result or fetch result changed while we were copying.
+    rendercache.discard_restamped_cached_render_result(stale_crr, delta_id)
+    return None
+
+
+async def restamp_wfmodule_if_input_unchanged(
+    workflow: Workflow,
+    wf_module: WfModule,
+    module_zipfile: Optional[ModuleZipfile],
+    params: Dict[str, Any],
+    tab: Tab,
+    input_result_fingerprint: Optional[str],
+    output_path: Path,
+) -> Optional[Tuple[RenderResult, Optional[str]]]:
+    """
+    Reuse `wf_module`'s stale output, if rendering again would reproduce it.
+
+    That's the case when its input (the previous step's output) has the same
+    fingerprint as last render, and so do its params, module and fetch
+    result. For instance: an auto-update fetch returned the same data as
+    before, so every step after it would render exactly what it did before.
+
+    Return `(result, result_fingerprint)` and broadcast the now-fresh result
+    if we reused it. Return `None` if the caller should call
+    `execute_wfmodule()`.
+
+    Raise `UnneededExecution` if `wf_module` has changed.
+    """
+    # may raise UnneededExecution
+    reused = await _restamp_wfmodule_if_input_unchanged(
+        workflow,
+        wf_module,
+        module_zipfile,
+        params,
+        tab,
+        input_result_fingerprint,
+        output_path,
+    )
+    if reused is None:
+        return None
+    result, crr = reused
+
+    update = clientside.Update(
+        steps={
+            wf_module.id: clientside.StepUpdate(
+                render_result=crr, module_slug=wf_module.module_id_name
+            )
+        }
+    )
+    await rabbitmq.send_update_to_workflow_clients(workflow.id, update)
+
+    return result, crr.fingerprint
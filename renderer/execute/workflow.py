@@ -1,13 +1,20 @@
+import asyncio
+import contextlib
+from dataclasses import replace
 import logging
-from typing import Any, Dict, List, Optional, Tuple
+from pathlib import Path
+import shutil
+from typing import Any, Dict, List, Optional, Tuple, Union
+from django.conf import settings
 from cjworkbench.sync import database_sync_to_async
-from cjwkernel.chroot import EDITABLE_CHROOT
+from cjwkernel.chroot import EDITABLE_CHROOT_POOL, ChrootContext
 from cjwkernel.errors import ModuleError
-from cjwkernel.types import RenderResult, Tab
+from cjwkernel.types import ArrowTable, RenderResult, Tab
+from cjwkernel.util import tempdir_context, tempfile_context
 from cjwstate.models import WfModule, Workflow
 from cjwstate.models.module_registry import MODULE_REGISTRY
 from cjwstate.modules.types import ModuleZipfile
-from cjwstate.params import get_migrated_params
+from cjwstate.params import get_migrated_params_many
 from .tab import ExecuteStep, TabFlow, execute_tab_flow
 from .types import UnneededExecution
 
@@ -16,12 +23,15 @@ logger = logging.getLogger(__name__)
 
 
 def _get_migrated_params(
-    wf_module: WfModule, module_zipfile: ModuleZipfile
+    wf_module: WfModule,
+    module_zipfile: ModuleZipfile,
+    migrated_params: Dict[int, Union[Dict[str, Any], ModuleError]],
 ) -> Dict[str, Any]:
     """
     Build the Params dict which will be passed to render().
 
-    Call LoadedModule.migrate_params() to ensure the params are up-to-date.
+    Read `migrated_params` (from `get_migrated_params_many()`), which holds
+    up-to-date params -- or a ModuleError -- for every step.
 
     On ModuleError or ValueError, log the error and return default params. This
     will render the "wrong" thing ... but the front-end should show the migrate
@@ -40,10 +50,9 @@ def _get_migrated_params(
     module_spec = module_zipfile.get_spec()
     param_schema = module_spec.get_param_schema()
 
-    try:
-        result = get_migrated_params(wf_module, module_zipfile=module_zipfile)
-    except ModuleError:
-        # LoadedModule logged this error; no need to log it again.
+    result = migrated_params[wf_module.id]
+    if isinstance(result, ModuleError):
+        # get_migrated_params_many() logged it; no need to log it again.
         return param_schema.coerce(None)
 
     # Is the module buggy? It might be. Log that error, and return a valid
@@ -61,12 +70,12 @@ def _get_migrated_params(
 
 
 def _build_execute_step(
-    step: WfModule, *, module_zipfiles: Dict[str, ModuleZipfile]
+    step: WfModule,
+    *,
+    module_zipfiles: Dict[str, ModuleZipfile],
+    migrated_params: Dict[int, Union[Dict[str, Any], ModuleError]],
 ) -> ExecuteStep:
-    try:
-        module_zipfile = module_zipfiles[step.module_id_name]
-    except KeyError:
-        module_zipfile = None
+    module_zipfile = module_zipfiles.get(step.module_id_name)
 
     return ExecuteStep(
         step,
@@ -75,7 +84,7 @@ def _build_execute_step(
         # params (WfModule.get_params), because we can only check
         # for tab cycles after migrating (and before calling any
         # render()).
-        _get_migrated_params(step, module_zipfile=module_zipfile),
+        _get_migrated_params(step, module_zipfile, migrated_params),
     )
 
 
@@ -93,13 +102,32 @@ def _load_tab_flows(workflow: Workflow, delta_id: int) -> List[TabFlow]:
             raise UnneededExecution
 
         module_zipfiles = MODULE_REGISTRY.all_latest()
+        tabs_and_steps = [
+            (tab_model, list(tab_model.live_wf_modules.all()))
+            for tab_model in workflow.live_tabs.all()
+        ]
+
+        # Migrate all steps' params at once: one kernel call per module, not
+        # one per step.
+        migrated_params = get_migrated_params_many(
+            [
+                (step, module_zipfiles[step.module_id_name])
+                for _, steps in tabs_and_steps
+                for step in steps
+                if step.module_id_name in module_zipfiles
+            ]
+        )
 
-        for tab_model in workflow.live_tabs.all():
-            steps = [
-                _build_execute_step(step, module_zipfiles=module_zipfiles)
-                for step in tab_model.live_wf_modules.all()
+        for tab_model, steps in tabs_and_steps:
+            execute_steps = [
+                _build_execute_step(
+                    step,
+                    module_zipfiles=module_zipfiles,
+                    migrated_params=migrated_params,
+                )
+                for step in steps
             ]
-            ret.append(TabFlow(Tab(tab_model.slug, tab_model.name), steps))
+            ret.append(TabFlow(Tab(tab_model.slug, tab_model.name), execute_steps))
     return ret
 
 
@@ -131,6 +159,69 @@ def partition_ready_and_dependent(
     return (ready, dependent)
 
 
+def _copy_tab_result_into_dir(
+    result: Optional[RenderResult], dir: Path, exit_stack: contextlib.ExitStack
+) -> Optional[RenderResult]:
+    """
+    Return a RenderResult equivalent to `result`, with its file in `dir`.
+
+    Modules only read files in their own basedir. A tab rendered in another
+    sandbox (or saved outside of any sandbox) must be copied in before a step
+    can read it as a Tab parameter.
+
+    The copy is deleted when `exit_stack` closes.
+    """
+    if result is None or result.table.path is None or result.table.path.parent == dir:
+        return result
+
+    path = exit_stack.enter_context(
+        tempfile_context(prefix="tab-output-", suffix=".arrow", dir=dir)
+    )
+    path.chmod(0o644)  # readable by module code
+    shutil.copyfile(result.table.path, path)
+    return replace(
+        result, table=ArrowTable.from_trusted_file(path, result.table.metadata)
+    )
+
+
+async def _execute_tab_flow_in_chroot(
+    chroot_context: ChrootContext,
+    workflow: Workflow,
+    tab_flow: TabFlow,
+    tab_results: Dict[Tab, Optional[RenderResult]],
+    save_dir: Optional[Path],
+    save_exit_stack: contextlib.ExitStack,
+) -> RenderResult:
+    """
+    Render `tab_flow` in a new basedir in `chroot_context`.
+
+    The basedir is deleted when we return. If `save_dir` is set, the returned
+    RenderResult's file is a copy in `save_dir` (deleted when `save_exit_stack`
+    closes), so other tabs can read it. Otherwise, the file is deleted; the
+    table is mmapped, so its data and metadata are still readable.
+    """
+    with chroot_context.tempdir_context("render-") as basedir:
+        with contextlib.ExitStack() as exit_stack:
+            # Tab parameters point to files in this tab's basedir
+            flow_tab_results = {
+                tab: (
+                    _copy_tab_result_into_dir(result, basedir, exit_stack)
+                    if tab.slug in tab_flow.input_tab_slugs
+                    else result
+                )
+                for tab, result in tab_results.items()
+            }
+            output_path = basedir / (
+                "tab-output-%s.arrow" % tab_flow.tab_slug.replace("/", "-")
+            )
+            result = await execute_tab_flow(
+                chroot_context, workflow, tab_flow, flow_tab_results, output_path
+            )
+        if save_dir is not None:
+            result = _copy_tab_result_into_dir(result, save_dir, save_exit_stack)
+        return result
+
+
 async def execute_workflow(workflow: Workflow, delta_id: int) -> None:
     """
     Ensure all `workflow.tabs[*].live_wf_modules` cache fresh render results.
@@ -138,6 +229,13 @@ async def execute_workflow(workflow: Workflow, delta_id: int) -> None:
     Raise UnneededExecution if the inputs become stale (at which point we don't
     care about results any more).
 
+    Tabs are rendered in "waves": first all tabs that don't depend on other
+    tabs, then all tabs that depend only on those, and so on. Tabs within a
+    wave render concurrently, up to
+    `settings.RENDERER_MAX_PARALLEL_TABS_PER_WORKFLOW` at a time. Each tab
+    leases its own chroot from `EDITABLE_CHROOT_POOL` (and makes its own
+    basedir), so one tab's module can't see another's data.
+
     WEBSOCKET NOTES: each wf_module is executed in turn. After each execution,
     we notify clients of its new columns and status.
     """
@@ -155,44 +253,68 @@ async def execute_workflow(workflow: Workflow, delta_id: int) -> None:
     tab_results: Dict[Tab, Optional[RenderResult]] = {
         flow.tab: None for flow in pending_tab_flows
     }
-    output_paths = []
+    # Tabs whose outputs other tabs read. We'll copy these outputs out of their
+    # chroots, because each chroot is wiped when its tab finishes rendering.
+    input_tab_slugs = frozenset().union(
+        *(flow.input_tab_slugs for flow in pending_tab_flows)
+    )
+    semaphore = asyncio.Semaphore(settings.RENDERER_MAX_PARALLEL_TABS_PER_WORKFLOW)
 
-    # Execute one tab_flow at a time.
-    #
     # We don't hold a DB lock throughout the loop: the loop can take a long
     # time; it might be run multiple times simultaneously (even on different
     # computers); and `await` doesn't work with locks.
 
-    with EDITABLE_CHROOT.acquire_context() as chroot_context:
-        with chroot_context.tempdir_context("render-") as basedir:
-
-            async def execute_tab_flow_into_new_file(tab_flow: TabFlow) -> RenderResult:
-                nonlocal workflow, tab_results, output_paths
-                output_path = basedir / (
-                    "tab-output-%s.arrow" % tab_flow.tab_slug.replace("/", "-")
-                )
-                return await execute_tab_flow(
-                    chroot_context, workflow, tab_flow, tab_results, output_path
-                )
-
-            while pending_tab_flows:
-                ready_flows, dependent_flows = partition_ready_and_dependent(
-                    pending_tab_flows
-                )
-
-                if not ready_flows:
-                    # All flows are dependent -- meaning they all have cycles. Execute
-                    # them last; they can detect their cycles through `tab_results`.
-                    break
-
-                for tab_flow in ready_flows:
-                    result = await execute_tab_flow_into_new_file(tab_flow)
-                    tab_results[tab_flow.tab] = result
-
-                pending_tab_flows = dependent_flows  # iterate
+    with contextlib.ExitStack() as exit_stack:
+        tab_outputs_dir = exit_stack.enter_context(
+            tempdir_context(prefix="render-tab-outputs-")
+        )
 
-            # Now, `pending_tab_flows` only contains flows with cycles. Execute
-            # them. No need to update `tab_results`: If tab1 and tab 2 depend on
-            # each other, they should have the same error ("Cycle").
-            for tab_flow in pending_tab_flows:
-                await execute_tab_flow_into_new_file(tab_flow)
+        async def execute_tab_flow_into_new_file(tab_flow: TabFlow) -> RenderResult:
+            nonlocal workflow, tab_results
+            async with semaphore:
+                async with EDITABLE_CHROOT_POOL.acquire_context_async() as chroot_context:
+                    return await _execute_tab_flow_in_chroot(
+                        chroot_context,
+                        workflow,
+                        tab_flow,
+                        tab_results,
+                        save_dir=(
+                            tab_outputs_dir
+                            if tab_flow.tab_slug in input_tab_slugs
+                            else None
+                        ),
+                        save_exit_stack=exit_stack,
+                    )
+
+        async def execute_tab_flows(tab_flows: List[TabFlow]) -> List[RenderResult]:
+            # Wait for _all_ flows to finish, even if one raises: the others
+            # are using tempfiles we're about to delete.
+            results = await asyncio.gather(
+                *(execute_tab_flow_into_new_file(flow) for flow in tab_flows),
+                return_exceptions=True,
+            )
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+            return results
+
+        while pending_tab_flows:
+            ready_flows, dependent_flows = partition_ready_and_dependent(
+                pending_tab_flows
+            )
+
+            if not ready_flows:
+                # All flows are dependent -- meaning they all have cycles. Execute
+                # them last; they can detect their cycles through `tab_results`.
+                break
+
+            results = await execute_tab_flows(ready_flows)
+            for tab_flow, result in zip(ready_flows, results):
+                tab_results[tab_flow.tab] = result
+
+            pending_tab_flows = dependent_flows  # iterate
+
+        # Now, `pending_tab_flows` only contains flows with cycles. Execute
+        # them. No need to update `tab_results`: If tab1 and tab 2 depend on
+        # each other, they should have the same error ("Cycle").
+        await execute_tab_flows(pending_tab_flows)
@@ -3,7 +3,7 @@ from dataclasses import replace
 import logging
 import shutil
 from unittest.mock import patch
-from cjwkernel.chroot import EDITABLE_CHROOT
+from cjwkernel.chroot import EDITABLE_CHROOT_POOL
 from cjwkernel.kernel import Kernel
 from cjwkernel.types import RenderResult
 from cjwkernel.tests.util import (
@@ -15,6 +15,7 @@ from cjwstate import minio, rabbitmq, rendercache
 from cjwstate.models import Workflow
 from cjwstate.tests.utils import DbTestCaseWithModuleRegistry, create_module_zipfile
 from renderer.execute.tab import execute_tab_flow, ExecuteStep, TabFlow
+from renderer.execute.wf_module import fingerprint_render_input
 
 
 async def fake_send(*args, **kwargs):
@@ -22,7 +23,7 @@ async def fake_send(*args, **kwargs):
 
 
 def mock_render(arrow_table_dict):
-    def inner(
+    async def inner(
         module_zipfile,
         *,
         chroot_context,
@@ -32,6 +33,7 @@ def mock_render(arrow_table_dict):
         tab,
         fetch_result,
         output_filename,
+        timing=None,
     ):
         output_path = basedir / output_filename
         with arrow_table_context(arrow_table_dict) as arrow_table:
@@ -44,7 +46,7 @@ def mock_render(arrow_table_dict):
 class TabTests(DbTestCaseWithModuleRegistry):
     @contextlib.contextmanager
     def _execute(self, workflow, flow, tab_results, expect_log_level=logging.DEBUG):
-        with EDITABLE_CHROOT.acquire_context() as chroot_context:
+        with EDITABLE_CHROOT_POOL.acquire_context() as chroot_context:
             with chroot_context.tempdir_context(prefix="test_tab") as tempdir:
                 with chroot_context.tempfile_context(
                     prefix="execute-tab-output", suffix=".arrow", dir=tempdir
@@ -96,7 +98,9 @@ class TabTests(DbTestCaseWithModuleRegistry):
             ],
         )
 
-        with patch.object(Kernel, "render", side_effect=mock_render({"No": ["bad"]})):
+        with patch.object(
+            Kernel, "render_async", side_effect=mock_render({"No": ["bad"]})
+        ):
             with self._execute(workflow, tab_flow, {}) as result:
                 assert_render_result_equals(
                     result, RenderResult(arrow_table({"B": [2]}), [])
@@ -128,15 +132,15 @@ class TabTests(DbTestCaseWithModuleRegistry):
             ],
         )
 
-        with patch.object(Kernel, "render", side_effect=mock_render({"B": [2]})):
+        with patch.object(Kernel, "render_async", side_effect=mock_render({"B": [2]})):
             with self._execute(workflow, tab_flow, {}) as result:
                 expected = RenderResult(arrow_table({"B": [2]}))
                 assert_render_result_equals(result, expected)
 
-            self.assertEqual(Kernel.render.call_count, 2)  # step2, not step1
+            self.assertEqual(Kernel.render_async.call_count, 2)  # step2, not step1
             self.assertRegex(
                 # Output is to the correct file
-                Kernel.render.call_args[1]["output_filename"],
+                Kernel.render_async.call_args[1]["output_filename"],
                 r"execute-tab-output.*\.arrow",
             )
 
@@ -182,19 +186,83 @@ class TabTests(DbTestCaseWithModuleRegistry):
             ],
         )
 
-        with patch.object(Kernel, "render", side_effect=mock_render({"B": [3]})):
+        with patch.object(Kernel, "render_async", side_effect=mock_render({"B": [3]})):
             with self._execute(workflow, tab_flow, {}) as result:
                 expected = RenderResult(arrow_table({"B": [3]}))
                 assert_render_result_equals(result, expected)
 
-            Kernel.render.assert_called_once()  # step2, not step1
+            Kernel.render_async.assert_called_once()  # step2, not step1
 
             self.assertRegex(
                 # Output is to the correct file
-                Kernel.render.call_args[1]["output_filename"],
+                Kernel.render_async.call_args[1]["output_filename"],
                 r"execute-tab-output.*\.arrow",
             )
 
+    @patch.object(rabbitmq, "send_update_to_workflow_clients", fake_send)
+    def test_execute_restamp_when_input_unchanged(self):
+        module_zipfile = create_module_zipfile("mod")
+        workflow = Workflow.create_and_init()
+        tab = workflow.tabs.first()
+        # step1: cached result is stale; re-rendering gives the same output
+        step1 = tab.wf_modules.create(
+            order=0,
+            slug="step-1",
+            module_id_name="mod",
+            last_relevant_delta_id=workflow.last_delta_id - 1,
+        )
+        rendercache.cache_render_result(
+            workflow,
+            step1,
+            workflow.last_delta_id - 1,
+            RenderResult(arrow_table({"A": [1]})),
+        )
+        step1.last_relevant_delta_id = workflow.last_delta_id
+        step1.save(update_fields=["last_relevant_delta_id"])
+        # step2: cached result is stale; but its input will be unchanged
+        step2 = tab.wf_modules.create(
+            order=1,
+            slug="step-2",
+            module_id_name="mod",
+            last_relevant_delta_id=workflow.last_delta_id - 1,
+        )
+        rendercache.cache_render_result(
+            workflow,
+            step2,
+            workflow.last_delta_id - 1,
+            RenderResult(arrow_table({"B": [2]})),
+            input_fingerprint=fingerprint_render_input(
+                step2,
+                module_zipfile,
+                {},
+                tab.to_arrow(),
+                rendercache.fingerprint_render_result(
+                    RenderResult(arrow_table({"A": [1]}))
+                ),
+            ),
+        )
+        step2.last_relevant_delta_id = workflow.last_delta_id
+        step2.save(update_fields=["last_relevant_delta_id"])
+
+        tab_flow = TabFlow(
+            tab.to_arrow(),
+            [
+                ExecuteStep(step1, module_zipfile, {}),
+                ExecuteStep(step2, module_zipfile, {}),
+            ],
+        )
+
+        with patch.object(Kernel, "render_async", side_effect=mock_render({"A": [1]})):
+            with self._execute(workflow, tab_flow, {}) as result:
+                assert_render_result_equals(
+                    result, RenderResult(arrow_table({"B": [2]}))
+                )
+
+            Kernel.render_async.assert_called_once()  # step1, not step2
+
+        step2.refresh_from_db()
+        self.assertEqual(step2.cached_render_result.delta_id, workflow.last_delta_id)
+
     @patch.object(rabbitmq, "send_update_to_workflow_clients", fake_send)
     def test_resume_backtrack_on_corrupt_cache_error(self):
         module_zipfile = create_module_zipfile("mod")
@@ -219,6 +287,9 @@ class TabTests(DbTestCaseWithModuleRegistry):
             rendercache.io.crr_parquet_key(step1.cached_render_result),
             b"CORRUPT",
         )
+        # ... and make sure we read the corrupt data, not a local copy
+        rendercache.io.LOCAL_CACHE.clear()
+        rendercache.io.ARROW_CACHE.clear()
         # step2: no cached result -- must re-render
         step2 = tab.wf_modules.create(order=1, slug="step-2", module_id_name="mod")
 
@@ -230,7 +301,7 @@ class TabTests(DbTestCaseWithModuleRegistry):
             ],
         )
 
-        with patch.object(Kernel, "render", side_effect=mock_render({"B": [2]})):
+        with patch.object(Kernel, "render_async", side_effect=mock_render({"B": [2]})):
             with self._execute(
                 workflow, tab_flow, {}, expect_log_level=logging.ERROR
             ) as result:
@@ -239,11 +310,11 @@ class TabTests(DbTestCaseWithModuleRegistry):
 
             self.assertEqual(
                 # called with step1, then step2
-                Kernel.render.call_count,
+                Kernel.render_async.call_count,
                 2,
             )
             self.assertRegex(
                 # Output is to the correct file
-                Kernel.render.call_args[1]["output_filename"],
+                Kernel.render_async.call_args[1]["output_filename"],
                 r"execute-tab-output.*\.arrow",
             )
@@ -2,16 +2,26 @@ import contextlib
 import logging
 import textwrap
 from unittest.mock import patch
+from django.test import override_settings
 from django.utils import timezone
-from cjwkernel.chroot import EDITABLE_CHROOT
+from cjwkernel.chroot import EDITABLE_CHROOT_POOL
 from cjwkernel.types import I18nMessage, RenderError, RenderResult, Tab
 from cjwkernel.tests.util import arrow_table, parquet_file
 from cjwstate import minio, rabbitmq, rendercache
+import cjwstate.modules
 from cjwstate.storedobjects import create_stored_object
 from cjwstate.models import Workflow
 from cjwstate.tests.utils import DbTestCaseWithModuleRegistry, create_module_zipfile
 from renderer import notifications
-from renderer.execute.wf_module import execute_wfmodule
+from renderer.execute import wf_module as execute_wf_module
+from renderer.execute.types import UnneededExecution
+from renderer.execute.wf_module import (
+    SavePipeline,
+    content_key_for_render,
+    execute_wfmodule,
+    fingerprint_render_input,
+    parse_key_for_render,
+)
 
 
 async def noop(*args, **kwargs):
@@ -22,7 +32,9 @@ class WfModuleTests(DbTestCaseWithModuleRegistry):
     def setUp(self):
         super().setUp()
         self.ctx = contextlib.ExitStack()
-        self.chroot_context = self.ctx.enter_context(EDITABLE_CHROOT.acquire_context())
+        self.chroot_context = self.ctx.enter_context(
+            EDITABLE_CHROOT_POOL.acquire_context()
+        )
         basedir = self.ctx.enter_context(
             self.chroot_context.tempdir_context(prefix="test_wf_module-")
         )
@@ -44,7 +56,7 @@ class WfModuleTests(DbTestCaseWithModuleRegistry):
             module_id_name="deleted_module",
             last_relevant_delta_id=workflow.last_delta_id,
         )
-        result = self.run_with_async_db(
+        result, _ = self.run_with_async_db(
             execute_wfmodule(
                 self.chroot_context,
                 workflow,
@@ -401,7 +413,7 @@ class WfModuleTests(DbTestCaseWithModuleRegistry):
         )
 
         with self.assertLogs(level=logging.INFO):
-            result = self.run_with_async_db(
+            result, _ = self.run_with_async_db(
                 execute_wfmodule(
                     self.chroot_context,
                     workflow,
@@ -429,3 +441,372 @@ class WfModuleTests(DbTestCaseWithModuleRegistry):
                 ]
             ),
         )
+
+    @patch.object(rabbitmq, "send_update_to_workflow_clients", noop)
+    def test_report_module_memory_exceeded_error(self):
+        workflow = Workflow.create_and_init()
+        tab = workflow.tabs.first()
+        wf_module = tab.wf_modules.create(
+            order=0,
+            slug="step-1",
+            module_id_name="x",
+            last_relevant_delta_id=workflow.last_delta_id,
+        )
+
+        module_zipfile = create_module_zipfile(
+            "x", python_code="def render(table, params):\n  raise MemoryError"
+        )
+
+        with patch.object(
+            cjwstate.modules.kernel, "render_max_memory_bytes", 1024 * 1024 * 1024
+        ):
+            with self.assertLogs(level=logging.INFO):
+                result, _ = self.run_with_async_db(
+                    execute_wfmodule(
+                        self.chroot_context,
+                        workflow,
+                        wf_module,
+                        module_zipfile,
+                        {},
+                        Tab(tab.slug, tab.name),
+                        RenderResult(),
+                        {},
+                        self.output_path,
+                    )
+                )
+        self.assertEqual(
+            result,
+            RenderResult(
+                errors=[
+                    RenderError(
+                        I18nMessage(
+                            "py.renderer.execute.wf_module.ModuleMemoryExceededError",
+                            {},
+                        )
+                    )
+                ]
+            ),
+        )
+
+    @override_settings(RENDERCACHE_CONTENT_ADDRESSED=True)
+    @patch.object(rabbitmq, "send_update_to_workflow_clients", noop)
+    def test_content_cache_shares_result_across_workflows(self):
+        module_zipfile = create_module_zipfile(
+            "x",
+            python_code=(
+                "import pandas as pd\n"
+                "def render(table, params):\n"
+                "  return pd.DataFrame({'A': [params['n']]})"
+            ),
+            spec_kwargs={"parameters": [{"id_name": "n", "type": "integer"}]},
+        )
+        input_result = RenderResult()
+        input_fingerprint = rendercache.fingerprint_render_result(input_result)
+
+        def render_in_new_workflow():
+            workflow = Workflow.create_and_init()
+            tab = workflow.tabs.first()
+            wf_module = tab.wf_modules.create(
+                order=0,
+                slug="step-1",
+                module_id_name="x",
+                last_relevant_delta_id=workflow.last_delta_id,
+            )
+            return self.run_with_async_db(
+                execute_wfmodule(
+                    self.chroot_context,
+                    workflow,
+                    wf_module,
+                    module_zipfile,
+                    {"n": 3},
+                    Tab(tab.slug, tab.name),
+                    input_result,
+                    {},
+                    self.output_path,
+                    input_result_fingerprint=input_fingerprint,
+                )
+            )
+
+        with patch.object(
+            execute_wf_module, "invoke_render", wraps=execute_wf_module.invoke_render
+        ) as invoke_render:
+            result1, _ = render_in_new_workflow()
+            result2, _ = render_in_new_workflow()
+            invoke_render.assert_called_once()
+
+        self.assertEqual(result2, result1)
+        self.assertEqual(result2.table.metadata.n_rows, 1)
+
+    @override_settings(RENDERCACHE_CONTENT_ADDRESSED=True)
+    @patch.object(rabbitmq, "send_update_to_workflow_clients", noop)
+    def test_content_cache_ignores_module_error(self):
+        workflow = Workflow.create_and_init()
+        tab = workflow.tabs.first()
+        wf_module = tab.wf_modules.create(
+            order=0,
+            slug="step-1",
+            module_id_name="x",
+            last_relevant_delta_id=workflow.last_delta_id,
+        )
+        module_zipfile = create_module_zipfile(
+            "x", python_code="def render(table, params):\n  undefined()"
+        )
+        input_result = RenderResult()
+
+        with patch.object(rendercache, "cache_content_render_result") as cache:
+            with self.assertLogs(level=logging.INFO):
+                self.run_with_async_db(
+                    execute_wfmodule(
+                        self.chroot_context,
+                        workflow,
+                        wf_module,
+                        module_zipfile,
+                        {},
+                        Tab(tab.slug, tab.name),
+                        input_result,
+                        {},
+                        self.output_path,
+                        input_result_fingerprint=rendercache.fingerprint_render_result(
+                            input_result
+                        ),
+                    )
+                )
+            cache.assert_not_called()
+
+    @patch.object(rabbitmq, "send_update_to_workflow_clients", noop)
+    def test_parse_cache_ignores_non_parse_params(self):
+        module_zipfile = create_module_zipfile(
+            "x",
+            python_code=(
+                "import pyarrow.parquet\n"
+                "def render(table, params, *, fetch_result, **kwargs):\n"
+                "  return pyarrow.parquet.read_table(str(fetch_result.path)).to_pandas()"
+            ),
+            spec_kwargs={
+                "parameters": [
+                    {"id_name": "url", "type": "string"},
+                    {"id_name": "has_header", "type": "checkbox"},
+                ],
+                "parse_fetch_result_params": ["has_header"],
+            },
+        )
+        workflow = Workflow.create_and_init()
+        tab = workflow.tabs.first()
+        wf_module = tab.wf_modules.create(
+            order=0,
+            slug="step-1",
+            module_id_name="x",
+            last_relevant_delta_id=workflow.last_delta_id,
+        )
+        with parquet_file({"A": [1]}) as path:
+            so = create_stored_object(workflow.id, wf_module.id, path)
+        wf_module.stored_data_version = so.stored_at
+        wf_module.save(update_fields=["stored_data_version"])
+
+        def render(params):
+            return self.run_with_async_db(
+                execute_wfmodule(
+                    self.chroot_context,
+                    workflow,
+                    wf_module,
+                    module_zipfile,
+                    params,
+                    Tab(tab.slug, tab.name),
+                    RenderResult(),
+                    {},
+                    self.output_path,
+                )
+            )
+
+        with patch.object(
+            execute_wf_module, "invoke_render", wraps=execute_wf_module.invoke_render
+        ) as invoke_render:
+            with self.assertLogs(level=logging.INFO):
+                result1, _ = render({"url": "https://a", "has_header": True})
+                result2, _ = render({"url": "https://b", "has_header": True})
+            invoke_render.assert_called_once()
+            with self.assertLogs(level=logging.INFO):
+                render({"url": "https://b", "has_header": False})
+            self.assertEqual(invoke_render.call_count, 2)
+
+        self.assertEqual(result2, result1)
+        self.assertEqual(result2.table.metadata.n_rows, 1)
+
+    @patch.object(rabbitmq, "send_update_to_workflow_clients", noop)
+    def test_save_pipeline_saves_before_exit(self):
+        workflow = Workflow.create_and_init()
+        tab = workflow.tabs.first()
+        wf_module = tab.wf_modules.create(
+            order=0,
+            slug="step-1",
+            module_id_name="x",
+            last_relevant_delta_id=workflow.last_delta_id,
+        )
+        module_zipfile = create_module_zipfile(
+            "x",
+            python_code=(
+                "import pandas as pd\n"
+                "def render(table, params):\n"
+                "  return pd.DataFrame({'A': [1]})"
+            ),
+        )
+
+        async def render():
+            async with SavePipeline() as save_pipeline:
+                return await execute_wfmodule(
+                    self.chroot_context,
+                    workflow,
+                    wf_module,
+                    module_zipfile,
+                    {},
+                    Tab(tab.slug, tab.name),
+                    RenderResult(),
+                    {},
+                    self.output_path,
+                    save_pipeline=save_pipeline,
+                )
+
+        with self.assertLogs(level=logging.INFO):
+            result, fingerprint = self.run_with_async_db(render())
+        wf_module.refresh_from_db()
+        crr = wf_module.cached_render_result
+        self.assertEqual(crr.fingerprint, fingerprint)
+        self.assertEqual(crr.delta_id, workflow.last_delta_id)
+        with rendercache.open_cached_render_result(crr) as cached_result:
+            self.assertEqual(cached_result, result)
+
+    @patch.object(rabbitmq, "send_update_to_workflow_clients", noop)
+    def test_save_pipeline_unneeded_execution_discards_upload(self):
+        workflow = Workflow.create_and_init()
+        tab = workflow.tabs.first()
+        wf_module = tab.wf_modules.create(
+            order=0,
+            slug="step-1",
+            module_id_name="x",
+            last_relevant_delta_id=workflow.last_delta_id,
+        )
+        module_zipfile = create_module_zipfile(
+            "x",
+            python_code=(
+                "import pandas as pd\n"
+                "def render(table, params):\n"
+                "  return pd.DataFrame({'A': [1]})"
+            ),
+        )
+
+        async def render():
+            async with SavePipeline() as save_pipeline:
+                await execute_wfmodule(
+                    self.chroot_context,
+                    workflow,
+                    wf_module,
+                    module_zipfile,
+                    {},
+                    Tab(tab.slug, tab.name),
+                    RenderResult(),
+                    {},
+                    self.output_path,
+                    save_pipeline=save_pipeline,
+                )
+                # The user edits the step while we upload
+                wf_module.last_relevant_delta_id += 1
+
+        with self.assertLogs(level=logging.INFO):
+            with self.assertRaises(UnneededExecution):
+                self.run_with_async_db(render())
+        wf_module.refresh_from_db()
+        self.assertIsNone(wf_module.cached_render_result)
+        self.assertEqual(
+            minio.list_file_keys(
+                rendercache.io.BUCKET, "wf-%d/wfm-%d/" % (workflow.id, wf_module.id)
+            ),
+            [],
+        )
+
+    def test_fingerprint_render_input_ignores_module_version(self):
+        # Internal modules' zipfiles get a new name on every deploy; only
+        # their contents matter.
+        workflow = Workflow.create_and_init()
+        tab = workflow.tabs.first()
+        wf_module = tab.wf_modules.create(
+            order=0,
+            slug="step-1",
+            module_id_name="x",
+            last_relevant_delta_id=workflow.last_delta_id,
+        )
+        python_code = "def render(table, params):\n  return table"
+        module_zipfile1 = create_module_zipfile(
+            "x", version="v1", python_code=python_code
+        )
+        module_zipfile2 = create_module_zipfile(
+            "x", version="v2", python_code=python_code
+        )
+        module_zipfile3 = create_module_zipfile(
+            "x", version="v3", python_code=python_code + "\n"
+        )
+        fingerprints = [
+            fingerprint_render_input(
+                wf_module, module_zipfile, {}, Tab(tab.slug, tab.name), "input"
+            )
+            for module_zipfile in (module_zipfile1, module_zipfile2, module_zipfile3)
+        ]
+        self.assertEqual(fingerprints[0], fingerprints[1])
+        self.assertNotEqual(fingerprints[0], fingerprints[2])
+
+    def test_render_keys_depend_on_kernel_version(self):
+        # A kernel bug fix must not reuse output the buggy kernel produced
+        workflow = Workflow.create_and_init()
+        tab = workflow.tabs.first()
+        wf_module = tab.wf_modules.create(
+            order=0,
+            slug="step-1",
+            module_id_name="x",
+            last_relevant_delta_id=workflow.last_delta_id,
+        )
+        module_zipfile = create_module_zipfile("x")
+        arrow_tab = Tab(tab.slug, tab.name)
+
+        def keys():
+            return (
+                fingerprint_render_input(
+                    wf_module, module_zipfile, {}, arrow_tab, "input"
+                ),
+                content_key_for_render(
+                    wf_module, module_zipfile, {}, arrow_tab, "input", None
+                ),
+            )
+
+        with patch.object(execute_wf_module, "kernel_version", return_value="v1"):
+            keys1 = keys()
+        with patch.object(execute_wf_module, "kernel_version", return_value="v2"):
+            keys2 = keys()
+        self.assertNotEqual(keys1[0], keys2[0])
+        self.assertNotEqual(keys1[1], keys2[1])
+
+    def test_parse_key_depends_on_kernel_version(self):
+        # A cjwparse bug fix must not reuse files the buggy parser produced
+        module_zipfile = create_module_zipfile(
+            "x",
+            spec_kwargs={
+                "parameters": [{"id_name": "has_header", "type": "checkbox"}],
+                "parse_fetch_result_params": ["has_header"],
+            },
+        )
+        workflow = Workflow.create_and_init()
+        tab = workflow.tabs.first()
+        wf_module = tab.wf_modules.create(
+            order=0,
+            slug="step-1",
+            module_id_name="x",
+            last_relevant_delta_id=workflow.last_delta_id,
+        )
+        with parquet_file({"A": [1]}) as path:
+            so = create_stored_object(workflow.id, wf_module.id, path)
+        params = {"has_header": True}
+
+        with patch.object(execute_wf_module, "kernel_version", return_value="v1"):
+            key1 = parse_key_for_render(wf_module, module_zipfile, params, so)
+        with patch.object(execute_wf_module, "kernel_version", return_value="v2"):
+            key2 = parse_key_for_render(wf_module, module_zipfile, params, so)
+        self.assertIsNotNone(key1)
+        self.assertNotEqual(key1, key2)
@@ -28,7 +28,7 @@ async def fake_send(*args, **kwargs):
 
 
 def mock_render(arrow_table_dict):
-    def inner(
+    async def inner(
         module_zipfile,
         *,
         chroot_context,
@@ -38,6 +38,7 @@ def mock_render(arrow_table_dict):
         tab,
         fetch_result,
         output_filename,
+        timing=None,
     ):
         output_path = basedir / output_filename
         with arrow_table_context(arrow_table_dict) as arrow_table:
@@ -104,9 +105,48 @@ class WorkflowTests(DbTestCaseWithModuleRegistry):
             module_id_name="mod",
         )
 
-        with patch.object(Kernel, "render", side_effect=mock_render({"B": [2]})):
+        with patch.object(Kernel, "render_async", side_effect=mock_render({"B": [2]})):
             self._execute(workflow)
-            self.assertRegex(str(Kernel.render.call_args[1]["basedir"]), r"/var/tmp/")
+            self.assertRegex(
+                str(Kernel.render_async.call_args[1]["basedir"]), r"/var/tmp/"
+            )
+
+    @patch.object(rabbitmq, "send_update_to_workflow_clients", fake_send)
+    def test_execute_tab_reads_other_tab_output(self):
+        workflow = Workflow.create_and_init()
+        tab1 = workflow.tabs.first()
+        tab2 = workflow.tabs.create(position=1, slug="tab-2", name="Tab 2")
+        create_module_zipfile(
+            "mod",
+            python_code='import pandas as pd\ndef render(table, params): return pd.DataFrame({"A": [1]})',
+        )
+        create_module_zipfile(
+            "readtab",
+            spec_kwargs={
+                "parameters": [{"id_name": "tab", "type": "tab", "name": "Tab"}]
+            },
+            python_code='def render(table, params): return params["tab"].dataframe',
+        )
+        # tab2 reads tab1. Each renders in its own basedir.
+        tab2_step = tab2.wf_modules.create(
+            order=0,
+            slug="step-2",
+            last_relevant_delta_id=workflow.last_delta_id,
+            module_id_name="readtab",
+            params={"tab": tab1.slug},
+        )
+        tab1.wf_modules.create(
+            order=0,
+            slug="step-1",
+            last_relevant_delta_id=workflow.last_delta_id,
+            module_id_name="mod",
+        )
+
+        self._execute(workflow)
+
+        tab2_step.refresh_from_db()
+        with open_cached_render_result(tab2_step.cached_render_result) as result:
+            assert_render_result_equals(result, RenderResult(arrow_table({"A": [1]})))
 
     def test_execute_race_delete_workflow(self):
         workflow = Workflow.create_and_init()
@@ -125,18 +165,18 @@ class WorkflowTests(DbTestCaseWithModuleRegistry):
             module_id_name="mod",
         )
 
-        def render_and_delete(*args, **kwargs):
+        async def render_and_delete(*args, **kwargs):
             # Render successfully. Then delete `workflow`, which should force
             # us to cancel before the next render().
-            ret = mock_render({"B": [2]})(*args, **kwargs)
+            ret = await mock_render({"B": [2]})(*args, **kwargs)
             Workflow.objects.filter(id=workflow.id).delete()
             return ret
 
-        with patch.object(Kernel, "render", side_effect=render_and_delete):
+        with patch.object(Kernel, "render_async", side_effect=render_and_delete):
             with self.assertRaises(UnneededExecution):
                 self._execute(workflow)
 
-            Kernel.render.assert_called_once()  # never called with step-2.
+            Kernel.render_async.assert_called_once()  # never called with step-2.
 
     @patch.object(rabbitmq, "send_update_to_workflow_clients")
     def test_execute_mark_unreachable(self, send_update):
@@ -291,9 +331,9 @@ class WorkflowTests(DbTestCaseWithModuleRegistry):
             workflow, wf_module2, delta.id, RenderResult(arrow_table({"B": [2]}))
         )
 
-        with patch.object(Kernel, "render", return_value=None):
+        with patch.object(Kernel, "render_async", return_value=None):
             self._execute(workflow)
-            Kernel.render.assert_not_called()
+            Kernel.render_async.assert_not_called()
 
     @patch.object(rabbitmq, "send_update_to_workflow_clients", fake_send)
     def test_resume_without_rerunning_unneeded_renders(self):
@@ -0,0 +1,21 @@
+# Generated by Django 2.2.10 on 2020-02-20 15:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("server", "0009_remove_wfmodule_fetch_error")]
+
+    operations = [
+        migrations.AddField(
+            model_name="wfmodule",
+            name="cached_render_result_fingerprint",
+            field=models.CharField(blank=True, max_length=40, null=True),
+        ),
+        migrations.AddField(
+            model_name="wfmodule",
+            name="cached_render_result_input_fingerprint",
+            field=models.CharField(blank=True, max_length=40, null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.10 on 2020-02-25 10:21
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("server", "0011_wfmodule_cached_render_result_column_stats")]
+
+    operations = [
+        migrations.AddField(
+            model_name="wfmodule",
+            name="cached_render_result_row_group_offsets",
+            field=django.contrib.postgres.fields.jsonb.JSONField(blank=True, null=True),
+        )
+    ]
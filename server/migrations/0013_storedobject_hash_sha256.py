@@ -0,0 +1,16 @@
+# Generated by Django 2.2.10 on 2020-02-26 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("server", "0012_wfmodule_cached_render_result_row_group_offsets")]
+
+    operations = [
+        migrations.AlterField(
+            model_name="storedobject",
+            name="hash",
+            field=models.CharField(max_length=64),
+        )
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.10 on 2020-02-27 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("server", "0013_storedobject_hash_sha256")]
+
+    operations = [
+        migrations.AlterField(
+            model_name="storedobject",
+            name="key",
+            field=models.CharField(
+                blank=True, db_index=True, default="", max_length=255
+            ),
+        )
+    ]
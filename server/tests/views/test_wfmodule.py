@@ -1,5 +1,6 @@
 from collections import namedtuple
 from datetime import datetime as dt
+import gzip
 import json
 from unittest.mock import patch
 from django.contrib.auth.models import User
@@ -10,12 +11,14 @@ from rest_framework import status
 from rest_framework.test import force_authenticate
 from cjwkernel.types import Column, ColumnType, RenderResult
 from cjwkernel.tests.util import arrow_table
-from cjwstate import commands
+from cjwstate import commands, minio, rabbitmq
+from cjwstate.rendercache.export import export_key, materialize_export
 from cjwstate.rendercache.io import (
+    BUCKET,
     cache_render_result,
     delete_parquet_files_for_wf_module,
 )
-from cjwstate.models import Workflow
+from cjwstate.models import WfModule, Workflow
 from cjwstate.tests.utils import LoggedInTestCase
 
 
@@ -226,6 +229,124 @@ class WfModuleTests(LoggedInTestCase):
         )
         self.assertIs(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_public_csv(self):
+        cache_render_result(
+            self.workflow,
+            self.wf_module2,
+            self.wf_module2.last_relevant_delta_id,
+            RenderResult(arrow_table({"A": [1, 2]})),
+        )
+        response = self.client.get(
+            "/public/moduledata/live/%d.csv" % self.wf_module2.id
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(response.streaming_content), b"A\n1\n2\n")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertTrue(response["ETag"].startswith('"'))
+
+    def test_public_csv_if_none_match(self):
+        cache_render_result(
+            self.workflow,
+            self.wf_module2,
+            self.wf_module2.last_relevant_delta_id,
+            RenderResult(arrow_table({"A": [1, 2]})),
+        )
+        url = "/public/moduledata/live/%d.csv" % self.wf_module2.id
+        etag = self.client.get(url)["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_public_csv_range(self):
+        cache_render_result(
+            self.workflow,
+            self.wf_module2,
+            self.wf_module2.last_relevant_delta_id,
+            RenderResult(arrow_table({"A": [1, 2]})),
+        )
+        response = self.client.get(
+            "/public/moduledata/live/%d.csv" % self.wf_module2.id,
+            HTTP_RANGE="bytes=2-",
+        )
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(response["Content-Range"], "bytes 2-5/6")
+        self.assertEqual(b"".join(response.streaming_content), b"1\n2\n")
+
+    def test_public_csv_range_not_satisfiable(self):
+        cache_render_result(
+            self.workflow,
+            self.wf_module2,
+            self.wf_module2.last_relevant_delta_id,
+            RenderResult(arrow_table({"A": [1, 2]})),
+        )
+        response = self.client.get(
+            "/public/moduledata/live/%d.csv" % self.wf_module2.id,
+            HTTP_RANGE="bytes=10-20",
+        )
+        self.assertEqual(
+            response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+        self.assertEqual(response["Content-Range"], "bytes */6")
+
+    def test_public_csv_range_invalid_is_ignored(self):
+        cache_render_result(
+            self.workflow,
+            self.wf_module2,
+            self.wf_module2.last_relevant_delta_id,
+            RenderResult(arrow_table({"A": [1, 2]})),
+        )
+        response = self.client.get(
+            "/public/moduledata/live/%d.csv" % self.wf_module2.id,
+            HTTP_RANGE="bytes=5-3",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.has_header("Content-Range"))
+        self.assertEqual(b"".join(response.streaming_content), b"A\n1\n2\n")
+
+    @patch.object(rabbitmq, "queue_render", async_noop)
+    def test_public_csv_discard_export_of_replaced_result(self):
+        cache_render_result(
+            self.workflow,
+            self.wf_module2,
+            self.wf_module2.last_relevant_delta_id,
+            RenderResult(arrow_table({"A": [1, 2]})),
+        )
+        crr = self.wf_module2.cached_render_result
+
+        def materialize_while_rendering(*args):
+            size = materialize_export(*args)
+            # A render saves a new result while we upload our export
+            WfModule.objects.filter(id=self.wf_module2.id).update(
+                cached_render_result_delta_id=crr.delta_id + 1
+            )
+            return size
+
+        with patch(
+            "server.views.WfModule.materialize_export", materialize_while_rendering
+        ):
+            response = self.client.get(
+                "/public/moduledata/live/%d.csv" % self.wf_module2.id
+            )
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(minio.exists(BUCKET, export_key(crr, "csv", False)))
+
+    def test_public_json_gzip(self):
+        cache_render_result(
+            self.workflow,
+            self.wf_module2,
+            self.wf_module2.last_relevant_delta_id,
+            RenderResult(arrow_table({"A": [1, 2]})),
+        )
+        response = self.client.get(
+            "/public/moduledata/live/%d.json" % self.wf_module2.id,
+            HTTP_ACCEPT_ENCODING="gzip, deflate",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(
+            json.loads(gzip.decompress(b"".join(response.streaming_content))),
+            [{"A": 1}, {"A": 2}],
+        )
+
     def test_value_counts_str(self):
         cache_render_result(
             self.workflow,
@@ -264,6 +385,97 @@ class WfModuleTests(LoggedInTestCase):
             json.loads(response.content), {"values": {"a": 2, "b": 2, "c": 1}}
         )
 
+    def test_value_counts_many_record_batches(self):
+        cache_render_result(
+            self.workflow,
+            self.wf_module2,
+            self.wf_module2.last_relevant_delta_id,
+            RenderResult(
+                arrow_table(
+                    pa.Table.from_batches(
+                        [
+                            pa.RecordBatch.from_arrays(
+                                [pa.array(["x", "y", None])], ["A"]
+                            ),
+                            pa.RecordBatch.from_arrays([pa.array(["y", "z"])], ["A"]),
+                        ]
+                    )
+                )
+            ),
+        )
+
+        response = self.client.get(
+            f"/api/wfmodules/{self.wf_module2.id}/value-counts?column=A"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            json.loads(response.content), {"values": {"x": 1, "y": 2, "z": 1}}
+        )
+
+    def test_value_counts_cached_by_fingerprint(self):
+        cache_render_result(
+            self.workflow,
+            self.wf_module2,
+            self.wf_module2.last_relevant_delta_id,
+            RenderResult(arrow_table({"A": ["cached", "cached"], "B": ["x", "y"]})),
+        )
+        self.client.get(f"/api/wfmodules/{self.wf_module2.id}/value-counts?column=A")
+        # Delete the data. The next request shouldn't need it.
+        delete_parquet_files_for_wf_module(self.workflow.id, self.wf_module2.id)
+
+        response = self.client.get(
+            f"/api/wfmodules/{self.wf_module2.id}/value-counts?column=A"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.content), {"values": {"cached": 2}})
+
+    def test_column_stats(self):
+        cache_render_result(
+            self.workflow,
+            self.wf_module2,
+            self.wf_module2.last_relevant_delta_id,
+            RenderResult(arrow_table({"A": ["a", "b", "a"], "B": [1, 2, None]})),
+        )
+        # Delete the data, to prove we don't read it.
+        delete_parquet_files_for_wf_module(self.workflow.id, self.wf_module2.id)
+
+        response = self.client.get(
+            f"/api/wfmodules/{self.wf_module2.id}/column-stats?column=B"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            json.loads(response.content),
+            {
+                "columns": [
+                    {
+                        "name": "B",
+                        "type": "number",
+                        "n_nulls": 1,
+                        "n_distinct": 2,
+                        "min": 1,
+                        "max": 2,
+                    }
+                ]
+            },
+        )
+
+    def test_column_stats_missing_column(self):
+        cache_render_result(
+            self.workflow,
+            self.wf_module2,
+            self.wf_module2.last_relevant_delta_id,
+            RenderResult(arrow_table({"A": ["a"]})),
+        )
+
+        response = self.client.get(
+            f"/api/wfmodules/{self.wf_module2.id}/column-stats?column=B"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_value_counts_corrupt_cache(self):
         # https://www.pivotaltracker.com/story/show/161988744
         cache_render_result(
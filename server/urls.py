@@ -94,6 +94,7 @@ urlpatterns = [
     path("api/wfmodules/<int:wf_module_id>/output", views.wfmodule_output),
     path("api/wfmodules/<int:wf_module_id>/embeddata", views.wfmodule_embeddata),
     path("api/wfmodules/<int:wf_module_id>/value-counts", views.wfmodule_value_counts),
+    path("api/wfmodules/<int:wf_module_id>/column-stats", views.wfmodule_column_stats),
     path("public/moduledata/live/<int:wf_module_id>.csv", views.wfmodule_public_csv),
     path("public/moduledata/live/<int:wf_module_id>.json", views.wfmodule_public_json),
     # Parameters
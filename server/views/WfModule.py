@@ -1,33 +1,43 @@
-import io
+import collections
 import json
-import selectors
-import subprocess
+import threading
+from typing import Dict, Optional, Tuple
 from asgiref.sync import async_to_sync
 from django.conf import settings
 from django.core.exceptions import PermissionDenied
-from django.http import FileResponse, HttpRequest, HttpResponse, Http404, JsonResponse
+from django.http import (
+    HttpRequest,
+    HttpResponse,
+    Http404,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404
 from django.utils.cache import add_never_cache_headers
 from django.views.decorators.clickjacking import xframe_options_exempt
-import numpy as np
-import pyarrow as pa
 from rest_framework import status
 from rest_framework.decorators import api_view, renderer_classes
 from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from cjwkernel.types import ColumnType
-from cjwstate import rabbitmq
+from cjwstate import minio, rabbitmq
 from cjwstate.rendercache import (
+    CachedRenderResult,
     CorruptCacheError,
-    downloaded_parquet_file,
-    open_cached_render_result,
+    discard_export,
+    export_etag,
+    iter_export_bytes,
+    materialize_export,
+    read_cached_render_result_column,
     read_cached_render_result_slice_as_text,
 )
+from cjwstate.rendercache.stats import count_text_values
 from cjwstate.models import Tab, WfModule, Workflow
 from cjwstate.models.module_registry import MODULE_REGISTRY
 
 
 _MaxNRowsPerRequest = 300
+_MaxValueCountsCacheNValues = 1_000_000
 
 
 def _with_wf_module_for_read(fn):
@@ -173,6 +183,51 @@ def wfmodule_embeddata(request: HttpRequest, wf_module: WfModule):
     return JsonResponse(result_json, safe=False)
 
 
+_value_counts_cache = collections.OrderedDict()  # (fingerprint, column) => dict
+_value_counts_cache_n_values = 0
+_value_counts_cache_lock = threading.Lock()
+
+
+def _get_value_counts(crr: CachedRenderResult, colname: str) -> Dict[str, int]:
+    """
+    Count values in a text column of `crr`, reusing a recent count if we can.
+
+    We cache by `crr.fingerprint`, a hash of the output data. A stale cache
+    entry can't be wrong: if the data changes, so does its fingerprint. (Old
+    results don't have fingerprints; we don't cache them.)
+
+    Raise CorruptCacheError if the cached data is missing or corrupt.
+    """
+    global _value_counts_cache_n_values
+
+    if crr.fingerprint is None:
+        key = None
+    else:
+        key = (crr.fingerprint, colname)
+        with _value_counts_cache_lock:
+            try:
+                value_counts = _value_counts_cache[key]
+                _value_counts_cache.move_to_end(key)
+                return value_counts
+            except KeyError:
+                pass
+
+    # raise CorruptCacheError
+    chunked_array = read_cached_render_result_column(crr, colname)
+    value_counts = count_text_values(chunked_array)
+
+    if key is not None and len(value_counts) <= _MaxValueCountsCacheNValues:
+        with _value_counts_cache_lock:
+            if key not in _value_counts_cache:
+                _value_counts_cache[key] = value_counts
+                _value_counts_cache_n_values += len(value_counts)
+                while _value_counts_cache_n_values > _MaxValueCountsCacheNValues:
+                    _, evicted = _value_counts_cache.popitem(last=False)
+                    _value_counts_cache_n_values -= len(evicted)
+
+    return value_counts
+
+
 @api_view(["GET"])
 @renderer_classes((JSONRenderer,))
 @_with_wf_module_for_read
@@ -192,10 +247,8 @@ def wfmodule_value_counts(request: HttpRequest, wf_module: WfModule):
         return JsonResponse({"values": {}})
 
     try:
-        column_index, column = next(
-            (i, c)
-            for i, c in enumerate(cached_result.table_metadata.columns)
-            if c.name == colname
+        column = next(
+            c for c in cached_result.table_metadata.columns if c.name == colname
         )
     except StopIteration:
         return JsonResponse({"error": f'column "{colname}" not found'}, status=404)
@@ -212,9 +265,7 @@ def wfmodule_value_counts(request: HttpRequest, wf_module: WfModule):
 
     try:
         # raise CorruptCacheError
-        with open_cached_render_result(cached_result) as result:
-            arrow_table = result.table.table
-            chunked_array = arrow_table.column(column_index)
+        value_counts = _get_value_counts(cached_result, colname)
     except CorruptCacheError:
         # We _could_ return an empty result set; but our only goal here is
         # "don't crash" and this 404 seems to be the simplest implementation.
@@ -222,97 +273,163 @@ def wfmodule_value_counts(request: HttpRequest, wf_module: WfModule):
         # and this response is going to be ignored.)
         return JsonResponse({"error": f'column "{colname}" not found'}, status=404)
 
-    if chunked_array.num_chunks == 0:
-        value_counts = {}
-    else:
-        assert chunked_array.num_chunks == 1
+    return JsonResponse({"values": value_counts})
 
-        # Assume type is text. (We checked column.type is ColumnType.Text above.)
-        chunk = chunked_array.chunks[0]
-        if not hasattr(chunk, "dictionary"):
-            chunk = chunk.dictionary_encode()
 
-        try:
-            max_index = max(v.as_py() for v in chunk.indices if v is not pa.NULL)
-        except ValueError:
-            # all nulls. Hack with "-1" makes the algorithm not-crash.
-            max_index = -1
-
-        counts = np.zeros(
-            max_index + 1, dtype=int
-        )  # if max_index = -1, counts is empty
-        for v in chunk.indices:
-            if v is not pa.NULL:
-                counts[v.as_py()] += 1
-        value_counts = {
-            value.as_py(): int(count) for value, count in zip(chunk.dictionary, counts)
-        }
+@api_view(["GET"])
+@renderer_classes((JSONRenderer,))
+@_with_wf_module_for_read
+def wfmodule_column_stats(request: HttpRequest, wf_module: WfModule):
+    """
+    Return stats about each column, computed when the output was cached.
 
-    return JsonResponse({"values": value_counts})
+    With a "column" parameter, return only that column's stats.
+    """
+    cached_result = wf_module.cached_render_result
+    if cached_result is None:
+        # assume we'll get another request after execute finishes
+        return JsonResponse({"columns": []})
 
+    if cached_result.column_stats is None:
+        # Cached before we computed stats. The next render will compute them.
+        return JsonResponse({"error": "column stats not computed"}, status=404)
 
-class SubprocessOutputFileLike(io.RawIOBase):
-    """
-    Run a subrocess; .read() reads its stdout and stderr (combined).
+    columns = [
+        {"name": column.name, "type": column.type.name, **stats}
+        for column, stats in zip(
+            cached_result.table_metadata.columns, cached_result.column_stats
+        )
+    ]
 
-    __init__() will only return after the process starts producing output.
-    This requirement lets us raise OSError during startup; it also means a
-    caller with knowledge of the subprocess's behavior may safely delete a file
-    the subprocess is reading from, before the subprocess is finished reading
-    it.
+    colname = request.GET.get("column")
+    if colname is not None:
+        columns = [column for column in columns if column["name"] == colname]
+        if not columns:
+            return JsonResponse({"error": f'column "{colname}" not found'}, status=404)
 
-    On close(), kill the subprocess (if it's still running) and wait for it.
+    return JsonResponse({"columns": columns})
 
-    close() is the only way to wait for the subprocess. Don't worry: __del__()
-    calls close().
 
-    If read() is called after the subprocess terminates and the subprocess's
-    exit code is not 0, raise IOError.
+def _accepts_gzip(request: HttpRequest) -> bool:
+    for coding in request.META.get("HTTP_ACCEPT_ENCODING", "").split(","):
+        name, *params = [part.strip() for part in coding.split(";")]
+        if name.lower() == "gzip":
+            return not any(p.replace(" ", "") in ("q=0", "q=0.0") for p in params)
+    return False
 
-    Not thread-safe.
+
+def _etag_matches(request: HttpRequest, etag: str) -> bool:
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or ("W/" + etag) in tags
+
+
+def _parse_range(request: HttpRequest, size: int) -> Optional[Tuple[int, int]]:
     """
+    Parse a single-range "Range: bytes=..." header into (start, stop).
 
-    def __init__(self, args):
-        super().__init__()
+    Return None if there is no (supported, valid) Range header: the caller
+    should serve the whole file. Raise ValueError if the range is valid but
+    unsatisfiable (it starts past the end of the file).
+    """
+    header = request.META.get("HTTP_RANGE", "")
+    if not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes=") :].strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            stop = int(last) + 1 if last else size
+        else:
+            start = size - int(last)  # suffix: "bytes=-500" means last 500
+            stop = size
+    except ValueError:
+        return None  # malformed: ignore it, as RFC 7233 says
+    if first and last and stop <= start:
+        return None  # "bytes=5-3" is invalid, not unsatisfiable: ignore it
+    start = max(0, start)
+    stop = min(stop, size)
+    if start >= stop:
+        raise ValueError("Range not satisfiable")
+    return start, stop
+
+
+def _public_export(
+    request: HttpRequest,
+    wf_module: WfModule,
+    format: str,
+    content_type: str,
+    schedule_render_and_suggest_retry,
+):
+    """
+    Serve the whole cached table as `format`, from the export cache.
 
-        # Raises OSError
-        self.process = subprocess.Popen(
-            args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
-        )
-        # Wait for subprocess to begin outputting data. After that, the caller
-        # may delete input files safely, assuming the subprocess already has
-        # them open and thus can continue reading from them after they're
-        # deleted.
-        self._await_stdout_ready()
+    The export is materialized once per cached render result (see
+    `cjwstate.rendercache.export`). We answer `If-None-Match` with 304 and a
+    single `Range` with 206; and we serve gzip to clients that accept it.
+    """
+    cached_result = wf_module.cached_render_result
+    if not cached_result:
+        return schedule_render_and_suggest_retry()
 
-    def _await_stdout_ready(self):
-        """
-        Wait until `self.process.stdout.read()` is guaranteed not to block.
-        """
-        with selectors.DefaultSelector() as selector:
-            selector.register(self.process.stdout, selectors.EVENT_READ)
-            while len(selector.select()) == 0:
-                pass
+    gzipped = _accepts_gzip(request)
+    etag = export_etag(cached_result, format, gzipped)
+    if _etag_matches(request, etag):
+        response = HttpResponse(status=304)
+        response["ETag"] = etag
+        response["Vary"] = "Accept-Encoding"
+        return response
 
-    def readable(self):
-        return True
+    # Materialize outside of the lock: it can take as long as reading the
+    # whole table, and we mustn't stall edits and renders meanwhile.
+    try:
+        size = materialize_export(cached_result, format, gzipped)
+    except CorruptCacheError:
+        return schedule_render_and_suggest_retry()
 
-    def fileno(self):
-        return self.process.stdout.fileno()
+    # If a render replaced `cached_result` meanwhile, it may have deleted the
+    # step's cache before we uploaded. Don't let our export outlive it.
+    with wf_module.workflow.cooperative_lock():
+        wf_module.refresh_from_db()  # raise WfModule.DoesNotExist
+        is_fresh = wf_module.cached_render_result_delta_id == cached_result.delta_id
+    if not is_fresh:
+        discard_export(cached_result, format, gzipped)
+        return schedule_render_and_suggest_retry()
 
-    def readinto(self, b):
-        ret = self.process.stdout.readinto(b)
-        return ret
+    try:
+        byte_range = _parse_range(request, size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = "bytes */%d" % size
+        return response
 
-    def close(self):
-        if self.closed:
-            return
+    if byte_range is None:
+        start, stop = 0, size
+        response_status = 200
+    else:
+        start, stop = byte_range
+        response_status = 206
 
-        self.process.stdout.close()
-        self.process.kill()
-        # wait() should not deadlock, because process will certainly die.
-        self.process.wait()  # ignore exit code
-        super().close()  # sets self.closed
+    response = StreamingHttpResponse(
+        iter_export_bytes(cached_result, format, gzipped, start, stop),
+        status=response_status,
+        content_type=content_type,
+    )
+    response["Content-Length"] = str(stop - start)
+    if response_status == 206:
+        response["Content-Range"] = "bytes %d-%d/%d" % (start, stop - 1, size)
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Vary"] = "Accept-Encoding"
+    if gzipped:
+        response["Content-Encoding"] = "gzip"
+    response["Content-Disposition"] = minio.encode_content_disposition(
+        "Workflow %d - %s-%d.%s"
+        % (cached_result.workflow_id, wf_module.module_id_name, wf_module.id, format)
+    )
+    return response
 
 
 @api_view(["GET"])
@@ -335,27 +452,12 @@ def wfmodule_public_json(request: HttpRequest, wf_module: WfModule):
         response["Retry-After"] = "30"
         return response
 
-    cached_result = wf_module.cached_render_result
-    if not cached_result:
-        return schedule_render_and_suggest_retry()
-
-    try:
-        with downloaded_parquet_file(cached_result) as parquet_path:
-            output = SubprocessOutputFileLike(
-                ["/usr/bin/parquet-to-text-stream", str(parquet_path), "json"]
-            )
-            # It's okay to delete the file now (i.e., exit the context manager)
-    except CorruptCacheError:
-        return schedule_render_and_suggest_retry()
-
-    return FileResponse(
-        output,
-        as_attachment=True,
-        filename=(
-            "Workflow %d - %s-%d.json"
-            % (cached_result.workflow_id, wf_module.module_id_name, wf_module.id)
-        ),
-        content_type="application/json",
+    return _public_export(
+        request,
+        wf_module,
+        "json",
+        "application/json",
+        schedule_render_and_suggest_retry,
     )
 
 
@@ -378,25 +480,10 @@ def wfmodule_public_csv(request: HttpRequest, wf_module: WfModule):
         response["Retry-After"] = "30"
         return response
 
-    cached_result = wf_module.cached_render_result
-    if not cached_result:
-        return schedule_render_and_suggest_retry()
-
-    try:
-        with downloaded_parquet_file(cached_result) as parquet_path:
-            output = SubprocessOutputFileLike(
-                ["/usr/bin/parquet-to-text-stream", str(parquet_path), "csv"]
-            )
-            # It's okay to delete the file now (i.e., exit the context manager)
-    except CorruptCacheError:
-        return schedule_render_and_suggest_retry()
-
-    return FileResponse(
-        output,
-        as_attachment=True,
-        filename=(
-            "Workflow %d - %s-%d.csv"
-            % (cached_result.workflow_id, wf_module.module_id_name, wf_module.id)
-        ),
-        content_type="text/csv; charset=utf-8; header=present",
+    return _public_export(
+        request,
+        wf_module,
+        "csv",
+        "text/csv; charset=utf-8; header=present",
+        schedule_render_and_suggest_retry,
     )